@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+adaptive_io.py
+
+Concurrencia adaptativa (AIMD) para el tráfico con Cloud Storage y Firestore.
+
+AdaptiveLimiter reparte "huecos" de peticiones en curso entre los hilos de los executors:
+- crecimiento aditivo: si en la última ventana el límite estuvo saturado y el rendimiento
+  (MB/s o peticiones/s) mejoró, el límite sube en 1; si la subida no mejoró nada, se deshace y
+  se mantiene unas ventanas antes de volver a sondear,
+- decrecimiento multiplicativo: un error de saturación (429/503) reduce el límite a la mitad
+  (como mucho una vez por ventana, para que una ráfaga de 429 no lo hunda hasta el mínimo),
+- reintentos con backoff exponencial y jitter completo ante 429/5xx.
+
+status() da la concurrencia actual y el rendimiento efectivo para las líneas de progreso. El reloj
+y la espera del backoff se pueden inyectar (clock/sleep) para probar el limitador sin tiempo real.
+
+Modo demo: un bucket local de sustitución con latencia, ancho de banda compartido y 429 por
+encima de un umbral de peticiones simultáneas, para comparar concurrencia fija y adaptativa:
+  python tools/adaptive_io.py --files 300 --size-kb 256 --bandwidth-mbps 80 --throttle-above 12
+"""
+import argparse
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+THROTTLE_CODES = {429, 503}            # el servidor pide bajar el ritmo: se reduce el límite
+RETRY_CODES = THROTTLE_CODES | {500, 502, 504}
+
+
+def error_code(exc: BaseException) -> Optional[int]:
+    """Código HTTP de una excepción de google.api_core (o del bucket de sustitución)."""
+    code = getattr(exc, 'code', None)
+    if isinstance(code, int):
+        return code
+    response = getattr(exc, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+class AdaptiveLimiter:
+    """Límite de peticiones en curso ajustado por AIMD según el rendimiento observado."""
+
+    def __init__(self, name: str, *, initial: int = 4, minimum: int = 1, maximum: int = 32, adaptive: bool = True,
+                 window: float = 1.0, gain: float = 0.05, probe_every: int = 5, retries: int = 6,
+                 backoff_base: float = 0.5, backoff_cap: float = 30.0, unit: str = 'MB/s',
+                 clock: Callable[[], float] = time.perf_counter, sleep: Callable[[float], None] = time.sleep):
+        self.name = name
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.adaptive = adaptive
+        self.window = window
+        self.gain = gain
+        self.probe_every = probe_every
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.unit = unit   # 'MB/s' (se cuentan bytes) u 'ops/s' (se cuentan peticiones)
+        self.clock = clock
+        self.sleep = sleep
+        self.in_flight = 0
+        self.throttled = 0
+        self.retried = 0
+        self.rate = 0.0
+        self.total_units = 0.0
+        self._cond = threading.Condition()
+        self._t0 = self.clock()
+        self._window_start = self._t0
+        self._window_units = 0.0
+        self._window_done = 0
+        self._saturated = False
+        self._last_rate = 0.0          # rendimiento de la ventana anterior
+        self._increased = False        # la ventana anterior terminó con una subida del límite
+        self._hold = 0                 # ventanas sin sondear tras una subida inútil
+        self._last_decrease = float('-inf')
+
+    # --- huecos ---
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._saturated = True
+                self._cond.wait()
+            self.in_flight += 1
+            if self.in_flight >= int(self.limit):
+                self._saturated = True
+
+    def release(self, units: float = 0.0):
+        with self._cond:
+            self.in_flight -= 1
+            self.total_units += units
+            self._window_units += units
+            self._window_done += 1
+            self._maybe_adjust()
+            self._cond.notify_all()
+
+    def _maybe_adjust(self):
+        now = self.clock()
+        elapsed = now - self._window_start
+        # Ventanas de al menos `window` segundos y 2 x límite peticiones terminadas, para no decidir sobre ruido
+        if elapsed < self.window or self._window_done < 2 * int(self.limit):
+            return
+        rate = self._window_units / elapsed
+        self.rate = rate
+        if self.adaptive:
+            improved = rate > self._last_rate * (1.0 + self.gain)
+            if self._increased and not improved:
+                # La última subida no aportó: se deshace y se espera antes de volver a probar
+                self.limit = max(self.minimum, self.limit - 1)
+                self._hold = self.probe_every
+                self._increased = False
+            elif self._saturated and self.limit < self.maximum and (improved or self._hold <= 0):
+                self.limit += 1
+                self._increased = True
+            else:
+                self._increased = False
+                self._hold -= 1
+        self._last_rate = rate
+        self._window_start = now
+        self._window_units = 0.0
+        self._window_done = 0
+        self._saturated = self.in_flight >= int(self.limit)
+
+    def on_throttle(self):
+        with self._cond:
+            self.throttled += 1
+            now = self.clock()
+            if self.adaptive and now - self._last_decrease >= self.window:
+                self.limit = max(self.minimum, self.limit / 2.0)
+                self._last_decrease = now
+                self._increased = False
+                self._hold = self.probe_every
+                # Ventana nueva: el rendimiento de antes del 429 ya no es la referencia
+                self._last_rate = 0.0
+                self._window_start, self._window_units, self._window_done = now, 0.0, 0
+
+    # --- llamadas ---
+    def call(self, fn: Callable, *args, nbytes: Union[int, Callable, None] = None, **kwargs):
+        """Ejecuta fn dentro de un hueco, con reintentos y jitter ante 429/5xx.
+
+        nbytes: bytes transferidos (para MB/s); puede ser una función del resultado, p.ej. el tamaño
+        del archivo descargado. En modo 'ops/s' cada llamada cuenta 1.
+        """
+        attempt = 0
+        while True:
+            self.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self.release()
+                code = error_code(e)
+                if code not in RETRY_CODES or attempt >= self.retries:
+                    raise
+                if code in THROTTLE_CODES:
+                    self.on_throttle()
+                with self._cond:
+                    self.retried += 1
+                # Backoff exponencial con jitter completo: los hilos no reintentan todos a la vez
+                self.sleep(random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt))))
+                attempt += 1
+                continue
+            if self.unit == 'ops/s':
+                units = 1.0
+            else:
+                units = (nbytes(result) if callable(nbytes) else (nbytes or 0)) / 1e6
+            self.release(units)
+            return result
+
+    def status(self) -> str:
+        avg = self.total_units / max(1e-9, self.clock() - self._t0)
+        extra = f', {self.throttled} x 429/503' if self.throttled else ''
+        return (f'{self.name}: concurrencia {int(self.limit)} ({self.in_flight} en curso), '
+                f'{self.rate:.1f} {self.unit} (media {avg:.1f}){extra}')
+
+
+def storage_limiter(args) -> AdaptiveLimiter:
+    """Limitador de Storage según --max-inflight / --no-adaptive (mismos flags en todas las herramientas)."""
+    if args.no_adaptive:
+        return AdaptiveLimiter('storage', initial=args.max_inflight, maximum=args.max_inflight, adaptive=False)
+    return AdaptiveLimiter('storage', initial=min(4, args.max_inflight), maximum=args.max_inflight)
+
+
+def firestore_limiter(args) -> AdaptiveLimiter:
+    if args.no_adaptive:
+        return AdaptiveLimiter('firestore', initial=args.max_inflight, maximum=args.max_inflight, adaptive=False, unit='ops/s')
+    return AdaptiveLimiter('firestore', initial=min(4, args.max_inflight), maximum=args.max_inflight, unit='ops/s')
+
+
+def add_arguments(parser: argparse.ArgumentParser, default_max: int = 32):
+    parser.add_argument('--max-inflight', type=int, default=default_max,
+                        help='Máximo de peticiones simultáneas a Storage/Firestore (la concurrencia se adapta hasta ahí)')
+    parser.add_argument('--no-adaptive', action='store_true', help='Concurrencia fija en --max-inflight (sin AIMD; reintentos igualmente)')
+
+
+# --- Bucket local de sustitución (modo demo) ---
+
+class ThrottledError(Exception):
+    def __init__(self, code: int):
+        super().__init__(f'HTTP {code} (simulado)')
+        self.code = code
+
+
+class LocalBucket:
+    """Imita bucket.blob(path).upload_from_filename/download_to_filename sobre un directorio local.
+
+    Cada petición tarda rtt + tamaño / (ancho de banda / peticiones en curso), así que el rendimiento
+    total crece con la concurrencia hasta saturar el enlace; por encima de `throttle_above`
+    peticiones simultáneas responde 429 con probabilidad `throttle_p`.
+    """
+
+    def __init__(self, root: Path, *, rtt_ms: float = 80.0, bandwidth_mbps: float = 80.0,
+                 throttle_above: int = 12, throttle_p: float = 0.5):
+        self.root = root
+        self.name = 'local'
+        self.rtt = rtt_ms / 1000.0
+        self.bandwidth = bandwidth_mbps * 1e6 / 8.0
+        self.throttle_above = throttle_above
+        self.throttle_p = throttle_p
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def blob(self, path: str) -> 'LocalBlob':
+        return LocalBlob(self, path)
+
+    def _transfer(self, nbytes: int):
+        with self._lock:
+            self.in_flight += 1
+            n = self.in_flight
+        try:
+            if n > self.throttle_above and random.random() < self.throttle_p:
+                time.sleep(self.rtt / 2)
+                raise ThrottledError(429)
+            time.sleep(self.rtt + nbytes * n / self.bandwidth)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class LocalBlob:
+    def __init__(self, bucket: LocalBucket, name: str):
+        self.bucket = bucket
+        self.name = name
+        self.public_url = f'file://{bucket.root / name}'
+
+    def upload_from_filename(self, filename: str, content_type: Optional[str] = None):
+        data = Path(filename).read_bytes()
+        self.bucket._transfer(len(data))
+        dest = self.bucket.root / self.name
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_bytes(data)
+
+    def download_to_filename(self, filename: str):
+        data = (self.bucket.root / self.name).read_bytes()
+        self.bucket._transfer(len(data))
+        Path(filename).write_bytes(data)
+
+    def make_public(self):
+        pass
+
+
+def run_demo(files, bucket: LocalBucket, limiter: AdaptiveLimiter, threads: int) -> dict:
+    from backends import GcsStorage
+    from prepare_and_upload_videos import upload_object
+
+    storage = GcsStorage(bucket)   # LocalBucket imita la API de google.cloud.storage
+
+    trace = []
+    t0 = time.perf_counter()
+
+    def one(i_f):
+        i, f = i_f
+        limiter.call(upload_object, storage, f, f'demo/{limiter.name}/{f.name}', nbytes=f.stat().st_size)
+        if i % 25 == 0:
+            trace.append(int(limiter.limit))
+            print(f'  [{i}/{len(files)}] {limiter.status()}')
+
+    with ThreadPoolExecutor(max_workers=threads) as ex:
+        list(ex.map(one, enumerate(files)))
+    elapsed = time.perf_counter() - t0
+    total_mb = sum(f.stat().st_size for f in files) / 1e6
+    return {'mode': limiter.name, 'seconds': round(elapsed, 2), 'MB/s': round(total_mb / elapsed, 2),
+            'limit': int(limiter.limit), 'throttled': limiter.throttled, 'retries': limiter.retried,
+            'trace': ' '.join(map(str, trace))}
+
+
+def main(argv=None):
+    from tflite_bench import print_table
+
+    ap = argparse.ArgumentParser(description='Demo de concurrencia adaptativa contra un bucket local con latencia y 429 simulados.')
+    ap.add_argument('--files', type=int, default=300, help='Archivos a "subir"')
+    ap.add_argument('--size-kb', type=int, default=256, help='Tamaño de cada archivo')
+    ap.add_argument('--rtt-ms', type=float, default=80.0, help='Latencia fija por petición')
+    ap.add_argument('--bandwidth-mbps', type=float, default=80.0, help='Ancho de banda del enlace simulado (Mbit/s)')
+    ap.add_argument('--throttle-above', type=int, default=12, help='Peticiones simultáneas a partir de las que responde 429')
+    ap.add_argument('--throttle-p', type=float, default=0.5, help='Probabilidad de 429 por encima del umbral')
+    ap.add_argument('--fixed', type=int, nargs='*', default=[4, 32], help='Concurrencias fijas con las que comparar')
+    ap.add_argument('--max-inflight', type=int, default=64, help='Techo del modo adaptativo')
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix='adaptive_io_') as tmp:
+        src = Path(tmp) / 'src'
+        src.mkdir()
+        files = []
+        for i in range(args.files):
+            p = src / f'{i:05d}.bin'
+            p.write_bytes(random.randbytes(args.size_kb * 1024))
+            files.append(p)
+        rows = []
+        for n in args.fixed:
+            bucket = LocalBucket(Path(tmp) / 'bucket', rtt_ms=args.rtt_ms, bandwidth_mbps=args.bandwidth_mbps,
+                                 throttle_above=args.throttle_above, throttle_p=args.throttle_p)
+            print(f'Concurrencia fija {n}:')
+            rows.append(run_demo(files, bucket, AdaptiveLimiter(f'fija-{n}', initial=n, maximum=n, adaptive=False,
+                                                                backoff_base=0.05, retries=12), n))
+        bucket = LocalBucket(Path(tmp) / 'bucket', rtt_ms=args.rtt_ms, bandwidth_mbps=args.bandwidth_mbps,
+                             throttle_above=args.throttle_above, throttle_p=args.throttle_p)
+        print('Adaptativa (AIMD):')
+        rows.append(run_demo(files, bucket, AdaptiveLimiter('aimd', initial=4, maximum=args.max_inflight,
+                                                            window=0.5, backoff_base=0.05, retries=12), args.max_inflight))
+    print_table(rows, ['mode', 'seconds', 'MB/s', 'limit', 'throttled', 'retries', 'trace'])
+
+
+if __name__ == '__main__':
+    main()
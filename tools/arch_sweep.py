@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+arch_sweep.py
+
+Barrido de arquitecturas con restricción de latencia para los modelos exportados:
+
+- mlp:        capas ocultas del MLP de landmarks (dataset X.npy/y.npy de extract_landmarks_and_train.py)
+- mobilenet:  alpha de MobileNetV2 x tamaño de entrada (build_model de train_letters_from_coco.py)
+- cnn:        multiplicador de filtros x tamaño de entrada (build_model de train_letters_from_pickle.py)
+
+Cada variante se entrena en un proceso aparte (spawn, TensorFlow con hilos repartidos) y devuelve su
+.tflite. La precisión se mide sobre el propio .tflite, y el tamaño y la latencia se miden después en
+el proceso principal, de una en una, para que el entrenamiento en paralelo no contamine la latencia.
+
+Salida: tabla de variantes, frente de Pareto precisión/latencia y el modelo elegido con la regla
+"máxima precisión con latencyMsP90 <= --budget-ms; a igualdad, el menor". El elegido se guarda en
+<workdir>/models/<hash>/ (y pasa a latest.json); todas las filas van a reports/sweep-<familia>.jsonl.
+
+Uso:
+  python tools/arch_sweep.py mlp --hidden 32 64,32 128,64 256,128 --budget-ms 0.5
+  python tools/arch_sweep.py mobilenet --coco-dir ... --alphas 0.35,0.5,1.0 --sizes 96,128,160 --budget-ms 15
+  python tools/arch_sweep.py cnn --pickle ABECEDARIOIMAGENES.pickle --widths 0.5,1.0 --sizes 64,96 --budget-ms 5
+
+Dependencias: tensorflow, numpy (+ pillow para mobilenet/cnn)
+"""
+import argparse
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from artifacts import store_model
+from deps import require
+
+
+def _train_variant(payload) -> bytes:
+    # Proceso independiente (spawn): TensorFlow se inicializa aquí
+    family, params, data_path, num_classes, opts = payload
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(opts['threads'])
+    tf.keras.utils.set_random_seed(opts['seed'])
+    data = np.load(data_path)
+    # Sin split de parada (clases de una sola muestra) el early stopping vigila la loss de entrenamiento
+    stop = (data['X_stop'], data['y_stop']) if len(data['y_stop']) else None
+    early = tf.keras.callbacks.EarlyStopping(monitor='val_loss' if stop else 'loss', patience=opts['patience'],
+                                             restore_best_weights=True)
+    if family == 'mlp':
+        from extract_landmarks_and_train import fit_mlp
+        model = fit_mlp(data['X_fit'], data['y_fit'], data['X_stop'], data['y_stop'], num_classes,
+                        epochs=opts['epochs'], patience=opts['patience'], hidden=tuple(params['hidden']),
+                        seed=opts['seed'], verbose=0)
+    else:
+        if family == 'mobilenet':
+            from train_letters_from_coco import build_model
+            model = build_model(params['imgSize'], num_classes, alpha=params['alpha'])
+        else:
+            from train_letters_from_pickle import build_model
+            model = build_model(params['imgSize'], num_classes, width=params['width'])
+        model.fit(data['X_fit'], data['y_fit'], validation_data=stop,
+                  epochs=opts['epochs'], batch_size=32, callbacks=[early], verbose=0)
+    from train_letters_from_pickle import to_tflite
+    return to_tflite(model)
+
+
+def pareto_front(rows: List[dict], x: str = 'latencyMsP90', y: str = 'valAccuracy') -> List[dict]:
+    """Filas no dominadas: ninguna otra es a la vez más rápida (o igual) y más precisa (o igual), con alguna mejora estricta."""
+    front = []
+    for r in sorted(rows, key=lambda r: (r[x], -r[y])):
+        if not front or r[y] > front[-1][y]:
+            front.append(r)
+    return front
+
+
+def pick_within_budget(rows: List[dict], budget_ms: float, key: str = 'latencyMsP90') -> Optional[dict]:
+    """Máxima precisión con latencia <= presupuesto; a igualdad de precisión, la más rápida y luego la más pequeña."""
+    ok = [r for r in rows if r[key] <= budget_ms]
+    if not ok:
+        return None
+    return max(ok, key=lambda r: (r['valAccuracy'], -r[key], -r['sizeKB']))
+
+
+def mlp_data(args, cache_dir: Path):
+    """Splits fit/stop/val del dataset de landmarks, guardados en un .npz que leen los procesos."""
+    from extract_landmarks_and_train import stratified_split
+    X = np.load(args.workdir / 'X.npy').astype(np.float32)
+    y_raw = [str(v) for v in np.load(args.workdir / 'y.npy')]
+    counts = {c: y_raw.count(c) for c in set(y_raw)}
+    classes = sorted(c for c, n in counts.items() if n >= args.min_per_class)
+    idx = {c: i for i, c in enumerate(classes)}
+    keep = [i for i, c in enumerate(y_raw) if c in idx]
+    X, y = X[keep], np.array([idx[y_raw[i]] for i in keep], dtype=np.int32)
+    train_idx, val_idx = stratified_split(y, 0.2, seed=args.seed)
+    if not len(val_idx):
+        print('ERROR: ninguna clase tiene 2 o más muestras; no hay holdout para comparar variantes '
+              '(sube --min_per_class)', file=sys.stderr)
+        sys.exit(1)
+    fit_idx, stop_idx = stratified_split(y[train_idx], 0.15, seed=args.seed + 1)
+    fit_idx, stop_idx = train_idx[fit_idx], train_idx[stop_idx]
+    path = cache_dir / 'mlp.npz'
+    np.savez(path, X_fit=X[fit_idx], y_fit=y[fit_idx], X_stop=X[stop_idx], y_stop=y[stop_idx])
+    return classes, {None: path}, {None: (X[val_idx], y[val_idx])}
+
+
+def image_data(args, sizes: List[int], cache_dir: Path):
+    """Un .npz por tamaño de entrada con los splits fit/stop (de train) y el valid de los datasets de letras."""
+    from distill_letters import to_array
+    from extract_landmarks_and_train import stratified_split
+    from train_letters_landmarks import load_all_letter_images
+    train_imgs, train_labels, val_imgs, val_labels = load_all_letter_images(args)
+    classes = sorted(set(train_labels))
+    idx = {c: i for i, c in enumerate(classes)}
+    y_train = np.array([idx[c] for c in train_labels], dtype=np.int32)
+    val = [(im, idx[c]) for im, c in zip(val_imgs, val_labels) if c in idx]
+    y_val = np.array([v[1] for v in val], dtype=np.int32)
+    fit_idx, stop_idx = stratified_split(y_train, 0.15, seed=args.seed)
+    paths, holdout = {}, {}
+    for size in sizes:
+        X = to_array(train_imgs, size)
+        paths[size] = cache_dir / f'images-{size}.npz'
+        np.savez(paths[size], X_fit=X[fit_idx], y_fit=y_train[fit_idx], X_stop=X[stop_idx], y_stop=y_train[stop_idx])
+        holdout[size] = (to_array([v[0] for v in val], size), y_val)
+    return classes, paths, holdout
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Barrido de arquitecturas: precisión vs latencia TFLite y elección bajo un presupuesto.')
+    ap.add_argument('family', choices=['mlp', 'mobilenet', 'cnn'])
+    ap.add_argument('--hidden', nargs='+', default=['32', '64,32', '128,64', '256,128'], help='MLP: capas ocultas por variante (p.ej. 64,32)')
+    ap.add_argument('--alphas', default='0.35,0.5,0.75,1.0', help='MobileNetV2: multiplicadores de ancho')
+    ap.add_argument('--widths', default='0.25,0.5,1.0', help='CNN: multiplicadores de filtros')
+    ap.add_argument('--sizes', default='96,128,160', help='mobilenet/cnn: tamaños de entrada')
+    ap.add_argument('--coco-dir', help='Dataset COCO (mobilenet/cnn)')
+    ap.add_argument('--folder-dataset', help='Dataset en carpetas (mobilenet/cnn)')
+    ap.add_argument('--pickle', help='Pickle de imágenes y labels (mobilenet/cnn)')
+    ap.add_argument('--allow-classes', type=str, default='A,B,C,D,E,F,G,H,I,L,M,N,O,P,R,S,T,U,V,W,Y,0,1,2,3,4,5,6,7,8,9', help='Lista de clases permitidas separadas por coma')
+    ap.add_argument('--min_per_class', type=int, default=5, help='MLP: mínimas muestras por clase')
+    ap.add_argument('--epochs', type=int, default=30, help='Épocas máximas por variante (early stopping)')
+    ap.add_argument('--patience', type=int, default=5, help='Épocas sin mejora de val_loss antes de parar')
+    ap.add_argument('--seed', type=int, default=42)
+    ap.add_argument('--workers', type=int, default=2, help='Variantes entrenando a la vez')
+    ap.add_argument('--budget-ms', type=float, help='Presupuesto de latencia por frame (p90, CPU 1 hilo) para elegir modelo')
+    ap.add_argument('--workdir', type=Path, default=Path('tools/work'), help='Directorio de trabajo (X.npy/y.npy, models/, reports/)')
+    args = ap.parse_args(argv)
+    if args.family != 'mlp' and not (args.coco_dir or args.folder_dataset or args.pickle):
+        ap.error('mobilenet/cnn necesitan --coco-dir, --folder-dataset o --pickle')
+    if args.family == 'mlp' and not (args.workdir / 'X.npy').exists():
+        ap.error(f"No existe {args.workdir / 'X.npy'}: genera el dataset con extract_landmarks_and_train.py")
+    require('tensorflow', 'numpy', *(['PIL'] if args.family != 'mlp' else []))
+    from tflite_bench import append_report, describe_model, print_table, tflite_predict
+
+    cache_dir = args.workdir / 'cache' / 'sweep'
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    if args.family == 'mlp':
+        grid = [{'hidden': [int(h) for h in spec.split(',')]} for spec in args.hidden]
+        classes, data_paths, holdout = mlp_data(args, cache_dir)
+    else:
+        name, values = ('alpha', args.alphas) if args.family == 'mobilenet' else ('width', args.widths)
+        grid = [{name: float(v), 'imgSize': s} for v, s in itertools.product(values.split(','), sizes)]
+        classes, data_paths, holdout = image_data(args, sizes, cache_dir)
+    print(f'{len(grid)} variantes de {args.family}, {len(classes)} clases, {args.workers} procesos')
+
+    opts = {'epochs': args.epochs, 'patience': args.patience, 'seed': args.seed,
+            'threads': max(1, (os.cpu_count() or 1) // max(1, args.workers))}
+    payloads = [(args.family, p, str(data_paths[p.get('imgSize')]), len(classes), opts) for p in grid]
+    ctx = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx) as ex:
+        models = list(ex.map(_train_variant, payloads))
+
+    # Medición secuencial, sin entrenamientos compitiendo por la CPU
+    rows = []
+    for params, tflite_model in zip(grid, models):
+        X_val, y_val = holdout[params.get('imgSize')]
+        acc = float(np.mean(tflite_predict(tflite_model, X_val).argmax(axis=1) == y_val))
+        row = describe_model(tflite_model, source=f'sweep-{args.family}', **params, valAccuracy=round(acc, 4))
+        rows.append(row)
+        row['_model'] = tflite_model
+
+    variant_cols = ['hidden'] if args.family == 'mlp' else [name, 'imgSize']
+    columns = [*variant_cols, 'valAccuracy', 'sizeKB', 'latencyMsP50', 'latencyMsP90']
+    print('\nVariantes (CPU, 1 hilo):')
+    print_table(rows, columns)
+    front = pareto_front(rows)
+    print('\nFrente de Pareto precisión / latencia p90:')
+    print_table(front, columns)
+
+    chosen = pick_within_budget(rows, args.budget_ms) if args.budget_ms is not None else (front[-1] if front else None)
+    for r in rows:
+        r['pareto'] = any(r is f for f in front)
+        r['chosen'] = r is chosen
+        model = r.pop('_model')
+        if r is chosen:
+            out_dir = store_model(args.workdir, model, classes, meta={k: v for k, v in r.items() if k not in ('pareto', 'chosen')})
+            r['hash'] = out_dir.name
+        append_report(args.workdir, f'sweep-{args.family}', r)
+    if chosen is None:
+        print(f'ERROR: ninguna variante cumple latencyMsP90 <= {args.budget_ms} ms', file=sys.stderr)
+        sys.exit(1)
+    rule = f'máxima precisión con p90 <= {args.budget_ms} ms' if args.budget_ms is not None else 'la más precisa del frente'
+    print(f"\nElegido ({rule}): {', '.join(f'{c}={chosen[c]}' for c in columns)} -> models/{chosen['hash']}/")
+
+
+if __name__ == '__main__':
+    main()
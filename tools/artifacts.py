@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+artifacts.py
+
+Almacén direccionado por contenido para los modelos exportados.
+
+Cada modelo se guarda en <workdir>/models/<hash>/ con el .tflite, su labels.json y un
+meta.json; el hash es el SHA-256 (16 hex) del .tflite + labels, así que entrenar con
+otro script ya no sobrescribe el modelo anterior. <workdir>/models/latest.json apunta
+al último modelo publicado y es lo que usa upload_artifacts.py por defecto.
+"""
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import List, Optional
+
+MODEL_FILE = 'gesture_frame_mlp.tflite'
+LABELS_FILE = 'labels.json'
+META_FILE = 'meta.json'
+LATEST_FILE = 'latest.json'
+
+
+def sha256_bytes(*chunks: bytes) -> str:
+    h = hashlib.sha256()
+    for c in chunks:
+        h.update(c)
+    return h.hexdigest()
+
+
+def sha256_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def models_root(workdir: Path) -> Path:
+    return Path(workdir) / 'models'
+
+
+def store_model(workdir: Path, tflite_model: bytes, classes: List[str], meta: Optional[dict] = None) -> Path:
+    """Guarda el modelo bajo su hash y actualiza latest.json. Devuelve el directorio del artefacto."""
+    labels_bytes = json.dumps(list(classes), ensure_ascii=False, indent=2).encode('utf-8')
+    digest = sha256_bytes(tflite_model, labels_bytes)[:16]
+    out_dir = models_root(workdir) / digest
+    out_dir.mkdir(parents=True, exist_ok=True)
+    (out_dir / MODEL_FILE).write_bytes(tflite_model)
+    (out_dir / LABELS_FILE).write_bytes(labels_bytes)
+    info = {
+        'hash': digest,
+        'createdAt': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'sizeBytes': len(tflite_model),
+        'numClasses': len(classes),
+        **(meta or {}),
+    }
+    (out_dir / META_FILE).write_text(json.dumps(info, ensure_ascii=False, indent=2), encoding='utf-8')
+    (models_root(workdir) / LATEST_FILE).write_text(json.dumps({'hash': digest}), encoding='utf-8')
+    return out_dir
+
+
+def resolve_model_dir(workdir: Path, ref: Optional[str] = None) -> Optional[Path]:
+    """Resuelve un hash (o prefijo) o, sin ref, el último modelo publicado."""
+    root = models_root(workdir)
+    if ref:
+        p = Path(ref)
+        if p.is_dir():
+            return p
+        matches = sorted(root.glob(f'{ref}*')) if root.is_dir() else []
+        return matches[0] if len(matches) == 1 else None
+    latest = root / LATEST_FILE
+    if latest.exists():
+        digest = json.loads(latest.read_text(encoding='utf-8')).get('hash')
+        if digest and (root / digest).is_dir():
+            return root / digest
+    return None
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+backends.py
+
+Backends de objetos (Storage) y de documentos (metadatos) para las herramientas de tools/.
+
+- gcs: Cloud Storage + Firestore. Los clientes los sigue creando cada herramienta con sus
+  credenciales (init_firebase / ensure_gcloud_clients) y aquí solo se envuelven.
+- local:<dir>: objetos en <dir>/objects/<ruta remota> y documentos e índice de objetos (tamaño,
+  md5) en <dir>/metadata.sqlite. Es el formato que deja mirror.py, así que un espejo se usa
+  directamente como backend sin red; también sirve de destino de prepare_and_upload_videos.py
+  en desarrollo y CI.
+
+Interfaz común (duck typing, como los propios clientes de Google):
+  storage.upload_file(local, path, content_type=None, public=False) -> url
+  storage.upload_bytes(data, path, content_type=None, cache_control=None)
+  storage.exists(path), storage.describe(path)
+  storage.fetch(path, out_dir) -> archivo local (gcs descarga; local devuelve el del espejo sin copiar)
+  storage.list(prefix) -> ObjectInfo(path, size, md5, crc32c)
+  meta.set_doc(collection, doc_id, data, touch=True)   touch: updatedAt con la hora del servidor
+  meta.iter_docs(collection, fields=None, since=None, page_size=300) -> (doc_id, data)
+Los updatedAt se entregan siempre como texto ISO 8601, el formato de catalog_cursor.json.
+"""
+import base64
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+OBJECTS_DIR = 'objects'
+DB_FILE = 'metadata.sqlite'
+
+
+class ObjectInfo(NamedTuple):
+    path: str
+    size: int
+    md5: Optional[str]       # base64 del digest, como blob.md5_hash (None en objetos compuestos de GCS)
+    crc32c: Optional[str] = None
+
+
+def md5_file(path: Path) -> str:
+    h = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return base64.b64encode(h.digest()).decode('ascii')
+
+
+def _iso(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _json_default(value):
+    # Tipos de Firestore sin equivalente JSON (timestamps, referencias, GeoPoint...)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'path'):
+        return value.path
+    return str(value)
+
+
+# --- Cloud Storage + Firestore ---
+
+class GcsStorage:
+    is_local = False
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.name = bucket.name
+
+    def describe(self, path: str) -> str:
+        return f'gs://{self.name}/{path}'
+
+    def upload_file(self, local_path: Path, path: str, content_type: Optional[str] = None, public: bool = False) -> str:
+        blob = self.bucket.blob(path)
+        blob.upload_from_filename(str(local_path), content_type=content_type)
+        if public:
+            blob.make_public()
+            return blob.public_url
+        return self.describe(path)
+
+    def upload_bytes(self, data: bytes, path: str, content_type: Optional[str] = None, cache_control: Optional[str] = None):
+        blob = self.bucket.blob(path)
+        if cache_control:
+            blob.cache_control = cache_control
+        blob.upload_from_string(data, content_type=content_type)
+
+    def exists(self, path: str) -> bool:
+        return self.bucket.blob(path).exists()
+
+    def download(self, path: str, dest: Path):
+        self.bucket.blob(path).download_to_filename(str(dest))
+
+    def fetch(self, path: str, out_dir: Path) -> Path:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        out_path = out_dir / path.split('/')[-1]
+        self.download(path, out_path)
+        return out_path
+
+    def list(self, prefix: str = '') -> Iterator[ObjectInfo]:
+        for blob in self.bucket.list_blobs(prefix=prefix):
+            if not blob.name.endswith('/'):
+                yield ObjectInfo(blob.name, int(blob.size or 0), blob.md5_hash, blob.crc32c)
+
+
+class FirestoreMetadata:
+    def __init__(self, fs):
+        self.fs = fs
+
+    def set_doc(self, collection: str, doc_id: str, data: dict, touch: bool = True):
+        from google.cloud import firestore
+        if touch:
+            # Permite lecturas incrementales (extract_landmarks_and_train.py --since-last-sync)
+            data = {**data, 'updatedAt': firestore.SERVER_TIMESTAMP}
+        self.fs.collection(collection).document(doc_id).set(data)
+
+    def iter_docs(self, collection: str, fields: Optional[List[str]] = None, since: Optional[str] = None,
+                  page_size: int = 300) -> Iterator[Tuple[str, dict]]:
+        """Documentos por páginas (proyección de campos opcional); con `since`, solo updatedAt posterior."""
+        from google.cloud import firestore
+
+        query = self.fs.collection(collection)
+        if fields:
+            query = query.select(fields)
+        if since:
+            # Requiere updatedAt en los documentos (lo escribe set_doc)
+            query = query.where(filter=firestore.FieldFilter('updatedAt', '>', datetime.fromisoformat(since)))
+            query = query.order_by('updatedAt')
+        query = query.order_by('__name__').limit(page_size)
+        last = None
+        while True:
+            page = query.start_after(last) if last is not None else query
+            docs = list(page.stream())
+            for d in docs:
+                data = d.to_dict() or {}
+                if 'updatedAt' in data:
+                    data['updatedAt'] = _iso(data['updatedAt'])
+                yield d.id, data
+            if len(docs) < page_size:
+                break
+            last = docs[-1]
+
+
+# --- Directorio local + SQLite ---
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    collection TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, updated_at TEXT,
+    PRIMARY KEY (collection, id));
+CREATE INDEX IF NOT EXISTS docs_updated ON docs (collection, updated_at, id);
+CREATE TABLE IF NOT EXISTS objects (
+    path TEXT PRIMARY KEY, size INTEGER NOT NULL, md5 TEXT NOT NULL, remote_hash TEXT,
+    content_type TEXT, updated_at TEXT);
+"""
+
+
+def _connect(root: Path) -> sqlite3.Connection:
+    # Una conexión por operación: los executors escriben desde varios hilos
+    root.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(root / DB_FILE), timeout=60)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class LocalStorage:
+    is_local = True
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.objects = self.root / OBJECTS_DIR
+        self.name = str(self.root)
+
+    def object_path(self, path: str) -> Path:
+        p = (self.objects / path).resolve()
+        if self.objects.resolve() not in p.parents:
+            raise ValueError(f'ruta fuera del espejo: {path}')
+        return p
+
+    def describe(self, path: str) -> str:
+        return str(self.object_path(path))
+
+    def record(self, path: str, size: int, md5: str, remote_hash: Optional[str] = None, content_type: Optional[str] = None):
+        with closing(_connect(self.root)) as conn, conn:
+            conn.execute('INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?)',
+                         (path, size, md5, remote_hash, content_type, _now()))
+
+    def remove(self, path: str):
+        self.object_path(path).unlink(missing_ok=True)
+        with closing(_connect(self.root)) as conn, conn:
+            conn.execute('DELETE FROM objects WHERE path = ?', (path,))
+
+    def upload_file(self, local_path: Path, path: str, content_type: Optional[str] = None, public: bool = False) -> str:
+        dest = self.object_path(path)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.name + '.part')
+        shutil.copyfile(local_path, tmp)
+        os.replace(tmp, dest)
+        self.record(path, dest.stat().st_size, md5_file(dest), content_type=content_type)
+        return dest.as_uri()
+
+    def upload_bytes(self, data: bytes, path: str, content_type: Optional[str] = None, cache_control: Optional[str] = None):
+        dest = self.object_path(path)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.name + '.part')
+        tmp.write_bytes(data)
+        os.replace(tmp, dest)
+        self.record(path, len(data), base64.b64encode(hashlib.md5(data).digest()).decode('ascii'), content_type=content_type)
+
+    def exists(self, path: str) -> bool:
+        return self.object_path(path).exists()
+
+    def download(self, path: str, dest: Path):
+        shutil.copyfile(self.object_path(path), dest)
+
+    def fetch(self, path: str, out_dir: Optional[Path] = None) -> Path:
+        """El archivo del espejo, sin copiarlo (out_dir solo se usa en gcs)."""
+        p = self.object_path(path)
+        if not p.exists():
+            raise FileNotFoundError(f'{path} no está en {self.objects} (¿falta ejecutar mirror?)')
+        return p
+
+    def list(self, prefix: str = '') -> Iterator[ObjectInfo]:
+        with closing(_connect(self.root)) as conn:
+            rows = conn.execute("SELECT path, size, md5 FROM objects WHERE path >= ? AND path < ? ORDER BY path",
+                                (prefix, prefix + '\U0010ffff')).fetchall()
+        for path, size, md5 in rows:
+            yield ObjectInfo(path, size, md5)
+
+    def remote_hashes(self) -> dict:
+        """path -> (tamaño, hash remoto) de lo ya espejado, para que mirror solo baje lo que cambió."""
+        with closing(_connect(self.root)) as conn:
+            return {p: (s, h) for p, s, h in conn.execute('SELECT path, size, remote_hash FROM objects')}
+
+
+class LocalMetadata:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def set_doc(self, collection: str, doc_id: str, data: dict, touch: bool = True):
+        data = {**data, 'updatedAt': _now()} if touch else dict(data)
+        with closing(_connect(self.root)) as conn, conn:
+            conn.execute('INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?)',
+                         (collection, doc_id, json.dumps(data, ensure_ascii=False, default=_json_default),
+                          _iso(data.get('updatedAt'))))
+
+    def replace_collection(self, collection: str, docs: List[Tuple[str, dict]]):
+        """Sustituye la colección entera en una transacción (los documentos borrados en origen desaparecen)."""
+        with closing(_connect(self.root)) as conn, conn:
+            conn.execute('DELETE FROM docs WHERE collection = ?', (collection,))
+            conn.executemany('INSERT INTO docs VALUES (?, ?, ?, ?)', [
+                (collection, doc_id, json.dumps(data, ensure_ascii=False, default=_json_default), _iso(data.get('updatedAt')))
+                for doc_id, data in docs])
+
+    def iter_docs(self, collection: str, fields: Optional[List[str]] = None, since: Optional[str] = None,
+                  page_size: int = 300) -> Iterator[Tuple[str, dict]]:
+        sql = 'SELECT id, data FROM docs WHERE collection = ?'
+        params: list = [collection]
+        if since:
+            sql += ' AND updated_at > ? ORDER BY updated_at, id'
+            params.append(since)
+        else:
+            sql += ' ORDER BY id'
+        with closing(_connect(self.root)) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        for doc_id, raw in rows:
+            data = json.loads(raw)
+            yield doc_id, ({k: v for k, v in data.items() if k in fields} if fields else data)
+
+
+def is_local(spec: str) -> bool:
+    return spec.startswith('local:')
+
+
+def open_backend(spec: str, gcs_clients: Callable[[], Tuple[object, object]]):
+    """(storage, meta) para --backend; gcs_clients() -> (firestore, bucket) solo se llama con 'gcs'."""
+    if is_local(spec):
+        root = Path(spec[len('local:'):])
+        return LocalStorage(root), LocalMetadata(root)
+    if spec == 'gcs':
+        fs, bucket = gcs_clients()
+        return GcsStorage(bucket), FirestoreMetadata(fs)
+    raise ValueError(f"backend desconocido: {spec} (usa 'gcs' o 'local:<dir>')")
+
+
+def add_arguments(parser):
+    parser.add_argument('--backend', default='gcs',
+                        help="Storage/metadatos: gcs (Cloud Storage + Firestore) o local:<dir> (p.ej. el espejo de mirror.py)")
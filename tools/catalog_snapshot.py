@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+catalog_snapshot.py
+
+Snapshot precalculado y comprimido del catálogo (videos + imágenes) a partir de los manifests
+de prepare_and_upload_videos.py, para que la app lea un único objeto de Storage en lugar de un
+documento de Firestore por seña.
+
+- El snapshot es JSON canónico (claves ordenadas) comprimido con gzip determinista; su versión
+  es el SHA-256 (16 hex) del JSON, así que solo se sube cuando el contenido cambia.
+- Se sube a catalog/snapshot-<version>.json.gz (inmutable, cacheable) y se escribe el documento
+  puntero meta/catalog { version, storagePath, sizeBytes, videos, images, updatedAt }.
+- Se regenera siempre desde los manifests, que están completos en cada ejecución: una seña que
+  desaparece de ellos desaparece del snapshot publicado. Si el contenido no cambia, la versión
+  tampoco y el archivo no se reescribe ni se sube.
+
+Uso:
+  python tools/catalog_snapshot.py build  --manifest tools/videos_manifest.jsonl --images-manifest tools/images_manifest.jsonl
+  python tools/catalog_snapshot.py verify --manifest tools/videos_manifest.jsonl --images-manifest tools/images_manifest.jsonl
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+SCHEMA_VERSION = 1
+SNAPSHOT_FIELDS = ['id', 'title', 'category', 'level', 'storagePath', 'sizeBytes', 'variants', 'posterPath', 'sprite']
+DEFAULT_OUT = Path('tools/work/catalog_snapshot.json.gz')
+
+
+def read_manifest(path: Optional[Path]) -> List[dict]:
+    if not path or not Path(path).exists():
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _entry(rec: dict) -> dict:
+    return {k: rec.get(k) for k in SNAPSHOT_FIELDS if rec.get(k) is not None or k == 'sizeBytes'}
+
+
+def build_snapshot(videos: List[dict], images: List[dict]) -> dict:
+    """Snapshot de los registros de los manifests (si un id se repite gana el último, como en Firestore)."""
+    merged: Dict[str, Dict[str, dict]] = {'videos': {}, 'images': {}}
+    for kind, records in (('videos', videos), ('images', images)):
+        for rec in records:
+            merged[kind][rec['id']] = _entry(rec)
+    return {
+        'schema': SCHEMA_VERSION,
+        'videos': [merged['videos'][k] for k in sorted(merged['videos'])],
+        'images': [merged['images'][k] for k in sorted(merged['images'])],
+    }
+
+
+def encode_snapshot(snapshot: dict) -> Tuple[bytes, str]:
+    """(bytes gzip, versión). gzip con mtime=0 para que el mismo contenido dé los mismos bytes."""
+    canonical = json.dumps(snapshot, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    version = hashlib.sha256(canonical).hexdigest()[:16]
+    return gzip.compress(canonical, compresslevel=9, mtime=0), version
+
+
+def decode_snapshot(data: bytes) -> Tuple[dict, str]:
+    canonical = gzip.decompress(data)
+    return json.loads(canonical), hashlib.sha256(canonical).hexdigest()[:16]
+
+
+def write_snapshot(videos: List[dict], images: List[dict], out_path: Path = DEFAULT_OUT) -> Tuple[Path, str, bool]:
+    """Regenera el snapshot local. Devuelve (ruta, versión, cambió)."""
+    data, version = encode_snapshot(build_snapshot(videos, images))
+    old_version = decode_snapshot(out_path.read_bytes())[1] if out_path.exists() else None
+    changed = version != old_version
+    if changed:
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out_path.with_suffix('.tmp')
+        tmp.write_bytes(data)
+        tmp.replace(out_path)
+    return out_path, version, changed
+
+
+def upload_snapshot(storage, meta, out_path: Path, *, prefix: str = 'catalog', write_pointer: bool = True) -> str:
+    """Sube el snapshot versionado (si no existe ya) y actualiza el documento puntero meta/catalog.
+
+    storage/meta: backends de backends.py (Cloud Storage + Firestore o directorio local + SQLite).
+    """
+    data = out_path.read_bytes()
+    snapshot, version = decode_snapshot(data)
+    storage_path = f'{prefix}/snapshot-{version}.json.gz'
+    if not storage.exists(storage_path):
+        # Contenido inmutable: la versión está en el nombre del objeto
+        storage.upload_bytes(data, storage_path, content_type='application/gzip',
+                             cache_control='public, max-age=31536000, immutable')
+        print(f'Snapshot subido: {storage.describe(storage_path)} ({len(data)} bytes)')
+    if write_pointer and meta is not None:
+        meta.set_doc('meta', 'catalog', {
+            'version': version,
+            'storagePath': storage_path,
+            'sizeBytes': len(data),
+            'schema': snapshot.get('schema'),
+            'videos': len(snapshot.get('videos', [])),
+            'images': len(snapshot.get('images', [])),
+            'updatedAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        }, touch=False)
+        print(f'Puntero meta/catalog -> {version}')
+    return storage_path
+
+
+def verify_snapshot(data: bytes, videos: List[dict], images: List[dict]) -> List[str]:
+    """Errores de consistencia entre el snapshot y los manifests (lista vacía si es válido)."""
+    errors: List[str] = []
+    try:
+        snapshot, version = decode_snapshot(data)
+    except (OSError, ValueError) as e:
+        return [f'snapshot ilegible: {e}']
+    if snapshot.get('schema') != SCHEMA_VERSION:
+        errors.append(f"schema {snapshot.get('schema')} != {SCHEMA_VERSION}")
+    if encode_snapshot(snapshot)[1] != version:
+        errors.append('el JSON no está en forma canónica')
+    for kind, records in (('videos', videos), ('images', images)):
+        entries = snapshot.get(kind, [])
+        ids = [e.get('id') for e in entries]
+        if ids != sorted(ids) or len(ids) != len(set(ids)):
+            errors.append(f'{kind}: ids desordenados o duplicados')
+        by_id = {e.get('id'): e for e in entries}
+        # Igual que en Firestore, si un id se repite en el manifest gana el último registro
+        latest = {r['id']: r for r in records}
+        for rec in latest.values():
+            e = by_id.get(rec['id'])
+            if e is None:
+                errors.append(f"{kind}/{rec['id']}: falta en el snapshot")
+                continue
+            for k in SNAPSHOT_FIELDS:
+                if rec.get(k) is not None and e.get(k) != rec.get(k):
+                    errors.append(f"{kind}/{rec['id']}: {k}={e.get(k)!r} != manifest {rec.get(k)!r}")
+        for e in entries:
+            if e.get('id') not in latest:
+                errors.append(f"{kind}/{e.get('id')}: no está en el manifest (seña borrada o renombrada)")
+            if not e.get('storagePath'):
+                errors.append(f"{kind}/{e.get('id')}: sin storagePath")
+    return errors
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Genera o valida el snapshot comprimido del catálogo.')
+    ap.add_argument('cmd', choices=['build', 'verify'])
+    ap.add_argument('--manifest', type=Path, default=Path('tools/videos_manifest.jsonl'), help='Manifest de videos')
+    ap.add_argument('--images-manifest', type=Path, default=Path('tools/images_manifest.jsonl'), help='Manifest de imágenes')
+    ap.add_argument('--out', type=Path, default=DEFAULT_OUT, help='Ruta local del snapshot .json.gz')
+    args = ap.parse_args(argv)
+
+    videos = read_manifest(args.manifest)
+    images = read_manifest(args.images_manifest)
+    if args.cmd == 'build':
+        out, version, changed = write_snapshot(videos, images, args.out)
+        print(f"Snapshot {'actualizado' if changed else 'sin cambios'}: {out} (versión {version}, {out.stat().st_size} bytes)")
+        return
+    if not args.out.exists():
+        print(f'No existe el snapshot: {args.out}', file=sys.stderr)
+        sys.exit(1)
+    errors = verify_snapshot(args.out.read_bytes(), videos, images)
+    for e in errors[:50]:
+        print(f'ERROR: {e}', file=sys.stderr)
+    if errors:
+        sys.exit(1)
+    print(f'Snapshot válido: {len(videos)} videos, {len(images)} imágenes')
+
+
+if __name__ == '__main__':
+    main()
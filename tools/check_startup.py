@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+check_startup.py
+
+Presupuesto de arranque de las herramientas de tools/. Ejecuta cada CLI con
+`python -X importtime <script> --help` y falla (exit 1) si:
+- se importa alguna dependencia pesada (cv2, mediapipe, tensorflow, sklearn, google.cloud, firebase_admin), o
+- el tiempo acumulado de imports supera el presupuesto (--budget-ms).
+
+Uso:
+  python tools/check_startup.py --budget-ms 300
+  python -m pytest tools/tests   (tests/test_startup.py ejecuta la misma comprobación por CLI)
+"""
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+TOOLS_DIR = Path(__file__).resolve().parent
+
+CLIS = [
+    'signlearn_tools.py',
+    'extract_landmarks_and_train.py',
+    'prepare_and_upload_videos.py',
+    'train_letters_from_coco.py',
+    'train_letters_from_pickle.py',
+    'train_letters_landmarks.py',
+    'distill_letters.py',
+    'arch_sweep.py',
+    'upload_artifacts.py',
+    'catalog_snapshot.py',
+    'dedupe.py',
+    'image_variants.py',
+    'video_decode.py',
+    'replay_bench.py',
+    'inspect_pickle.py',
+    'adaptive_io.py',
+    'landmark_augment.py',
+    'mirror.py',
+]
+
+BUDGET_MS = 300.0
+HEAVY = ['cv2', 'mediapipe', 'tensorflow', 'keras', 'sklearn', 'google.cloud', 'firebase_admin', 'torch']
+
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def parse_importtime(stderr: str) -> Tuple[int, List[str]]:
+    """Devuelve (microsegundos acumulados de imports de primer nivel, módulos importados)."""
+    total_us = 0
+    modules: List[str] = []
+    for line in stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        cumulative, indent, name = int(m.group(2)), m.group(3), m.group(4)
+        modules.append(name)
+        # Los imports de primer nivel llevan un único espacio tras '|'
+        if len(indent) == 1:
+            total_us += cumulative
+    return total_us, modules
+
+
+def measure(script: str) -> Tuple[int, List[str], int]:
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', str(TOOLS_DIR / script), '--help'],
+        cwd=TOOLS_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    total_us, modules = parse_importtime(proc.stderr)
+    return total_us, modules, proc.returncode
+
+
+# Ejecuta la CLI con --help como __main__ e imprime los módulos cargados al terminar
+_PROBE = '''
+import runpy, sys
+sys.argv = [sys.argv[1], '--help']
+sys.path.insert(0, '.')
+try:
+    runpy.run_path(sys.argv[0], run_name='__main__')
+except SystemExit:
+    pass
+sys.stdout.flush()
+print('\\n'.join(sorted(sys.modules)), file=sys.stderr)
+'''
+
+
+def loaded_modules(script: str) -> List[str]:
+    """sys.modules tras `script --help`: independiente de la carga de la máquina, a diferencia del tiempo."""
+    proc = subprocess.run([sys.executable, '-c', _PROBE, str(TOOLS_DIR / script)], cwd=TOOLS_DIR,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    return proc.stderr.split()
+
+
+def heavy_modules(modules: List[str]) -> List[str]:
+    return sorted({m for m in modules if any(m == h or m.startswith(h + '.') for h in HEAVY)})
+
+
+def check(script: str, budget_ms: float) -> Tuple[float, str]:
+    """(ms de imports, 'OK' o motivo del fallo) de una CLI."""
+    total_us, modules, rc = measure(script)
+    ms = total_us / 1000.0
+    heavy = heavy_modules(modules)
+    if rc != 0:
+        return ms, f'FALLO (exit {rc})'
+    if heavy:
+        return ms, f"FALLO (importa {', '.join(heavy[:5])})"
+    if ms > budget_ms:
+        return ms, f'FALLO (> {budget_ms:.0f} ms)'
+    return ms, 'OK'
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Comprueba el presupuesto de arranque (imports) de las CLIs de tools/.')
+    ap.add_argument('--budget-ms', type=float, default=BUDGET_MS, help='Tiempo máximo de imports por CLI en ms')
+    ap.add_argument('scripts', nargs='*', default=CLIS, help='Scripts a medir (default: todas las CLIs)')
+    args = ap.parse_args(argv)
+
+    failures = 0
+    for script in args.scripts:
+        ms, status = check(script, args.budget_ms)
+        if status != 'OK':
+            failures += 1
+        print(f'{script:36s} {ms:8.1f} ms  {status}')
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
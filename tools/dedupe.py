@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+dedupe.py
+
+Detección de duplicados antes de transcodificar/subir (prepare_and_upload_videos.py).
+
+- Colisiones de slug: archivos distintos que slugify(build_title(...)) convierte en el mismo id de
+  documento (en Firestore el último en escribirse gana).
+- Casi-duplicados perceptuales: dHash de 64 bits para imágenes y pHash (DCT 32x32) de N frames
+  muestreados para videos, calculados en paralelo y cacheados por (ruta, tamaño, mtime). Se indexan
+  en un BK-tree por distancia de Hamming para buscar vecinos cercanos sin comparar todos contra todos.
+  Los de la misma seña ya son colisiones de slug; lo que aporta el hash es el mismo clip o imagen
+  con otro nombre. Solo cuentan como duplicados (nearDuplicates, se omiten en modo skip) los de la
+  misma categoría a distancia muy corta (*_SKIP_THRESHOLD: prácticamente idénticos); el resto de
+  parecidos (p.ej. señas distintas grabadas con el mismo fondo, o en otra categoría) se informan en
+  similarMatches y nunca se omiten.
+
+Uso:
+  python tools/dedupe.py --base-path /ruta/LSM --include-images --report tools/work/dedupe_report.json
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+VIDEO_SAMPLES = 5
+IMAGE_THRESHOLD = 6       # bits distintos (de 64) para considerar dos imágenes casi iguales
+VIDEO_THRESHOLD = 8       # bits distintos por frame muestreado (media) para videos
+IMAGE_SKIP_THRESHOLD = 2  # por debajo, el mismo archivo (recomprimido o renombrado): se puede omitir
+VIDEO_SKIP_THRESHOLD = 2
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def image_dhash(path: Path, size: int = 8) -> int:
+    from PIL import Image
+    with Image.open(path) as im:
+        g = im.convert('L').resize((size + 1, size), Image.BILINEAR)
+        px = g.tobytes()
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = px[row * (size + 1) + col]
+            right = px[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+    return bits
+
+
+def _dct_matrix(n: int):
+    import numpy as np
+    k = np.arange(n)
+    m = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n))
+    m[0] *= 1 / np.sqrt(2)
+    return m * np.sqrt(2 / n)
+
+
+def phash_gray32(frame) -> int:
+    """pHash de 64 bits de un frame gris 32x32 (bloque 8x8 de baja frecuencia de la DCT vs mediana)."""
+    import numpy as np
+    d = _dct_matrix(32)
+    coeffs = d @ frame.astype(np.float64) @ d.T
+    low = coeffs[:8, :8].flatten()
+    med = np.median(low[1:])
+    bits = 0
+    for v in low:
+        bits = (bits << 1) | (1 if v > med else 0)
+    return bits
+
+
+def video_duration(path: Path) -> float:
+    out = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=nw=1:nk=1', str(path)],
+        check=True, capture_output=True, text=True,
+    ).stdout.strip()
+    return float(out or 0.0)
+
+
+def video_phash(path: Path, samples: int = VIDEO_SAMPLES) -> int:
+    """Concatena el pHash de `samples` frames equiespaciados; una sola decodificación con ffmpeg a 32x32 gris."""
+    import numpy as np
+    duration = max(video_duration(path), 0.1)
+    rate = samples / duration
+    raw = subprocess.run(
+        ['ffmpeg', '-v', 'error', '-i', str(path), '-an',
+         '-vf', f'fps={rate:.6f},scale=32:32:flags=area,format=gray',
+         '-frames:v', str(samples), '-f', 'rawvideo', '-'],
+        check=True, capture_output=True,
+    ).stdout
+    frames = np.frombuffer(raw, dtype=np.uint8)
+    n = len(frames) // (32 * 32)
+    bits = 0
+    for i in range(samples):
+        # Videos muy cortos pueden dar menos frames: se repite el último
+        frame = frames[min(i, n - 1) * 1024:(min(i, n - 1) + 1) * 1024].reshape(32, 32) if n else np.zeros((32, 32))
+        bits = (bits << 64) | phash_gray32(frame)
+    return bits
+
+
+def _hash_one(item: Tuple[str, str]) -> Tuple[str, Optional[int]]:
+    kind, path = item
+    try:
+        return path, (video_phash(Path(path)) if kind == 'video' else image_dhash(Path(path)))
+    except Exception:
+        return path, None
+
+
+class BKTree:
+    """Índice métrico para búsqueda por radio con distancia de Hamming."""
+
+    def __init__(self):
+        self.root = None  # (hash, payload, {distancia: hijo})
+
+    def add(self, h: int, payload):
+        if self.root is None:
+            self.root = (h, payload, {})
+            return
+        node = self.root
+        while True:
+            d = hamming(h, node[0])
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = (h, payload, {})
+                return
+            node = child
+
+    def query(self, h: int, radius: int) -> List[Tuple[int, object]]:
+        out = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= radius:
+                out.append((d, node[1]))
+            for dist, child in node[2].items():
+                if d - radius <= dist <= d + radius:
+                    stack.append(child)
+        return out
+
+
+def load_cache(path: Path) -> Dict[str, dict]:
+    return json.loads(path.read_text(encoding='utf-8')) if path.exists() else {}
+
+
+def compute_hashes(items: List[Tuple[str, Path]], cache_path: Path, workers: int) -> Dict[str, Optional[int]]:
+    """{ruta: hash} para items (kind, ruta); solo recalcula los que cambiaron desde la última vez."""
+    cache = load_cache(cache_path)
+    result: Dict[str, Optional[int]] = {}
+    todo = []
+    for kind, p in items:
+        st = p.stat()
+        key = f'{st.st_size}-{st.st_mtime_ns}'
+        c = cache.get(str(p))
+        if c and c.get('key') == key:
+            result[str(p)] = int(c['hash'], 16) if c.get('hash') else None
+        else:
+            todo.append((kind, str(p), key))
+    if todo:
+        print(f'Hash perceptual: {len(items) - len(todo)} en caché, {len(todo)} por calcular...')
+        keys = {p: key for _, p, key in todo}
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as ex:
+            for p, h in ex.map(_hash_one, [(k, p) for k, p, _ in todo], chunksize=4):
+                result[p] = h
+                cache[p] = {'key': keys[p], 'hash': format(h, 'x') if h is not None else None}
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(cache), encoding='utf-8')
+    return result
+
+
+def find_slug_collisions(entries: Iterable[Tuple[str, Path]]) -> Dict[str, List[str]]:
+    """{slug: [rutas]} para los slugs producidos por más de un archivo."""
+    by_slug: Dict[str, List[str]] = {}
+    for slug, p in entries:
+        by_slug.setdefault(slug, []).append(str(p))
+    return {s: ps for s, ps in by_slug.items() if len(ps) > 1}
+
+
+def find_near_duplicates(hashes: Dict[str, Optional[int]], radius: int, skip_radius: int,
+                         group_of: Callable[[str], str] = lambda p: '') -> Tuple[List[Tuple[str, str, int]], List[Tuple[str, str, int]]]:
+    """(duplicados, parecidos), ambos como pares (original, otro, distancia) a distancia <= radius.
+
+    El original es el primero en orden de recorrido. Un archivo solo es duplicado de otro del mismo
+    grupo (categoría) a distancia <= skip_radius; si no, es un parecido y se indexa como uno más.
+    """
+    tree = BKTree()
+    pairs, similar = [], []
+    for p, h in hashes.items():
+        if h is None:
+            continue
+        group = group_of(p)
+        matches = tree.query(h, radius)
+        same = [m for m in matches if m[0] <= skip_radius and group_of(m[1]) == group]
+        if same:
+            d, first = min(same, key=lambda m: m[0])
+            pairs.append((first, p, d))
+            continue
+        if matches:
+            d, first = min(matches, key=lambda m: m[0])
+            similar.append((first, p, d))
+        tree.add(h, p)
+    return pairs, similar
+
+
+def analyze(video_items, image_items, slug_of, *, perceptual: bool, cache_path: Path, workers: int) -> dict:
+    """Informe de colisiones de slug y casi-duplicados. `*_items` son listas (categoría, ruta)."""
+    report = {
+        'slugCollisions': {
+            'videos': find_slug_collisions((slug_of(f), f) for _, f in video_items),
+            'images': find_slug_collisions((slug_of(f), f) for _, f in image_items),
+        },
+        'nearDuplicates': {'videos': [], 'images': []},
+        'similarMatches': {'videos': [], 'images': []},
+    }
+    if perceptual:
+        hashes = compute_hashes([('video', f) for _, f in video_items] + [('image', f) for _, f in image_items], cache_path, workers)
+        vids = {str(f): hashes.get(str(f)) for _, f in video_items}
+        imgs = {str(f): hashes.get(str(f)) for _, f in image_items}
+        category_of = {str(f): c for c, f in list(video_items) + list(image_items)}.get
+        for kind, hs, radius, skip_radius in (
+                ('videos', vids, VIDEO_THRESHOLD * VIDEO_SAMPLES, VIDEO_SKIP_THRESHOLD * VIDEO_SAMPLES),
+                ('images', imgs, IMAGE_THRESHOLD, IMAGE_SKIP_THRESHOLD)):
+            report['nearDuplicates'][kind], report['similarMatches'][kind] = find_near_duplicates(hs, radius, skip_radius, category_of)
+    return report
+
+
+def paths_to_skip(report: dict) -> set:
+    """Rutas a omitir en modo skip: colisiones de slug y casi-idénticos de la misma categoría, salvo el primer archivo."""
+    skip = set()
+    for kind in ('videos', 'images'):
+        for paths in report['slugCollisions'][kind].values():
+            skip.update(paths[1:])
+        for _, dup, _ in report['nearDuplicates'][kind]:
+            skip.add(dup)
+    return skip
+
+
+def print_report(report: dict):
+    for kind in ('videos', 'images'):
+        for slug, paths in report['slugCollisions'][kind].items():
+            print(f'Colisión de slug ({kind}) "{slug}": ' + ' | '.join(paths))
+        for orig, dup, d in report['nearDuplicates'][kind]:
+            print(f'Casi-duplicado ({kind}, distancia {d}): {dup} ~ {orig}')
+        for orig, other, d in report.get('similarMatches', {}).get(kind, []):
+            print(f'Parecido ({kind}, distancia {d}, se conservan ambos): {other} ~ {orig}')
+    n_slug = sum(len(v) for v in report['slugCollisions'].values())
+    n_dup = sum(len(v) for v in report['nearDuplicates'].values())
+    n_similar = sum(len(v) for v in report.get('similarMatches', {}).values())
+    print(f'Dedupe: {n_slug} colisiones de slug, {n_dup} casi-duplicados, {n_similar} parecidos')
+
+
+def main(argv=None):
+    from prepare_and_upload_videos import build_title, iter_image_files, iter_video_files, slugify
+
+    ap = argparse.ArgumentParser(description='Informe de colisiones de slug y casi-duplicados perceptuales.')
+    ap.add_argument('--base-path', type=Path, required=True, help='Carpeta raíz con subcarpetas LSM_*_Web')
+    ap.add_argument('--include-images', action='store_true', help='Analizar también imágenes')
+    ap.add_argument('--no-perceptual', action='store_true', help='Solo colisiones de slug (sin ffmpeg ni hashes)')
+    ap.add_argument('--workers', type=int, default=max(1, os.cpu_count() or 1), help='Procesos para calcular hashes')
+    ap.add_argument('--cache', type=Path, default=Path('tools/work/cache/phash.json'), help='Caché de hashes perceptuales')
+    ap.add_argument('--report', type=Path, help='Escribe el informe en JSON')
+    args = ap.parse_args(argv)
+
+    videos = list(iter_video_files(args.base_path))
+    images = list(iter_image_files(args.base_path)) if args.include_images else []
+    report = analyze(videos, images, lambda f: slugify(build_title(f.name)),
+                     perceptual=not args.no_perceptual, cache_path=args.cache, workers=args.workers)
+    print_report(report)
+    if args.report:
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+if __name__ == '__main__':
+    main()
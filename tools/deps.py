@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+deps.py
+
+Comprobación ligera de dependencias para las herramientas de tools/.
+
+Usa importlib.util.find_spec para saber si un paquete está instalado sin importarlo,
+de modo que `--help`, errores de argumentos y ejecuciones desde caché no pagan el
+arranque de cv2/mediapipe/tensorflow/google-cloud. Cada etapa importa sus
+dependencias pesadas justo antes de usarlas.
+"""
+import importlib.util
+import sys
+from typing import Iterable, List
+
+# Paquetes por etapa del pipeline (nombre de import -> nombre pip para el mensaje)
+PIP_NAMES = {
+    'cv2': 'opencv-python',
+    'mediapipe': 'mediapipe',
+    'google.cloud.storage': 'google-cloud-storage',
+    'google.cloud.firestore': 'google-cloud-firestore',
+    'google.oauth2': 'google-auth',
+    'firebase_admin': 'firebase-admin',
+    'sklearn': 'scikit-learn',
+    'tensorflow': 'tensorflow',
+    'PIL': 'pillow',
+    'numpy': 'numpy',
+}
+
+FIREBASE = ['google.cloud.storage', 'google.cloud.firestore', 'google.oauth2', 'firebase_admin']
+STORAGE = ['google.cloud.storage', 'google.oauth2']
+EXTRACT = ['cv2', 'mediapipe', 'numpy']
+TRAIN = ['tensorflow', 'numpy']
+IMAGES = ['PIL', 'numpy']
+
+
+def is_installed(module_name: str) -> bool:
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        # find_spec importa los paquetes padre ('google' de 'google.cloud.storage')
+        return False
+
+
+def missing(modules: Iterable[str]) -> List[str]:
+    return [m for m in modules if not is_installed(m)]
+
+
+def require(*groups: Iterable[str]):
+    """Aborta con un mensaje claro si falta algún paquete de las etapas indicadas."""
+    wanted: List[str] = []
+    for g in groups:
+        for m in ([g] if isinstance(g, str) else g):
+            if m not in wanted:
+                wanted.append(m)
+    absent = missing(wanted)
+    if absent:
+        pkgs = ' '.join(sorted({PIP_NAMES.get(m, m.split('.')[0]) for m in absent}))
+        print(f"ERROR: Faltan paquetes: {', '.join(absent)}. Instálalos en tu venv: pip install {pkgs}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+distill_letters.py
+
+Destilación del clasificador de letras MobileNetV2 (train_letters_from_coco.py) a un alumno pequeño:
+el CNN de train_letters_from_pickle.py (--student cnn) o el MLP de landmarks (--student mlp).
+
+- Profesor: un modelo ya exportado en <workdir>/models/<hash>/ (su labels.json fija las clases).
+  Se ejecuta con el intérprete TFLite sobre la unión de datasets (COCO, carpetas, pickle) y sus
+  logits se cachean en <workdir>/cache/teacher_logits/<hash>.npz por contenido de imagen, así que
+  el profesor corre una sola vez aunque se repita la destilación con otros hiperparámetros.
+- Pérdida: alpha * CE(etiqueta real) + (1 - alpha) * T^2 * KL(profesor_T || alumno_T).
+- El alumno se exporta con to_tflite/store_model como cualquier otro modelo de letras y se
+  compara con el profesor: precisión en valid, tamaño y latencia en CPU.
+
+Uso:
+  python tools/distill_letters.py --teacher 3f2a9c --coco-dir tools/work/Lengua\\ de\\ Senas\\ Mexicana.v5i.coco --student cnn --img-size 96
+  python tools/distill_letters.py --teacher 3f2a9c --pickle ABECEDARIOIMAGENES.pickle --student mlp
+
+Dependencias: tensorflow, pillow, numpy (+ mediapipe con --student mlp)
+"""
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from artifacts import LABELS_FILE, META_FILE, MODEL_FILE, resolve_model_dir, store_model
+from deps import require
+
+
+def image_key(img) -> str:
+    return hashlib.sha1(img.tobytes()).hexdigest() + f'-{img.width}x{img.height}'
+
+
+def to_array(images, size: int) -> np.ndarray:
+    """Imágenes PIL -> (N, size, size, 3) float32 en [0, 1], el preprocesado de los trainers de letras."""
+    from PIL import Image
+    X = np.empty((len(images), size, size, 3), dtype=np.float32)
+    for i, img in enumerate(images):
+        X[i] = np.asarray(img.convert('RGB').resize((size, size), Image.BILINEAR), dtype=np.float32) / 255.0
+    return X
+
+
+def teacher_logits(teacher_bytes: bytes, cache_path: Path, images, chunk: int = 256) -> np.ndarray:
+    """Logits (log-probabilidades) del profesor por imagen; solo se ejecuta para las que no están en caché."""
+    from tflite_bench import make_interpreter, tflite_predict
+
+    cache = {}
+    if cache_path.exists():
+        data = np.load(cache_path)
+        cache = dict(zip(data['keys'].tolist(), data['logits']))
+    keys = [image_key(img) for img in images]
+    todo = [i for i, k in enumerate(keys) if k not in cache]
+    print(f'Profesor: {len(keys) - len(todo)} logits en caché, {len(todo)} por calcular')
+    if todo:
+        size = int(make_interpreter(teacher_bytes).get_input_details()[0]['shape'][1])
+        for start in range(0, len(todo), chunk):
+            idx = todo[start:start + chunk]
+            probs = tflite_predict(teacher_bytes, to_array([images[i] for i in idx], size))
+            for i, p in zip(idx, probs):
+                cache[keys[i]] = np.log(np.clip(p, 1e-7, 1.0)).astype(np.float32)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(cache_path, keys=np.array(list(cache.keys())), logits=np.stack(list(cache.values())))
+    return np.stack([cache[k] for k in keys]) if keys else np.zeros((0, 0), dtype=np.float32)
+
+
+def soft_targets(logits: np.ndarray, temperature: float) -> np.ndarray:
+    z = logits / temperature
+    z = z - z.max(axis=1, keepdims=True)
+    e = np.exp(z)
+    return (e / e.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def distill_loss(num_classes: int, temperature: float, alpha: float):
+    """y_true = [one-hot real | probabilidades del profesor a temperatura T]; y_pred = softmax del alumno."""
+    import tensorflow as tf
+
+    def loss(y_true, y_pred):
+        hard, soft = y_true[:, :num_classes], y_true[:, num_classes:]
+        log_p = tf.math.log(tf.clip_by_value(y_pred, 1e-7, 1.0))
+        ce = -tf.reduce_sum(hard * log_p, axis=1)
+        # log(softmax) difiere de los logits en una constante por fila, que se cancela en softmax(z / T)
+        student_t = tf.nn.log_softmax(log_p / temperature, axis=1)
+        kl = tf.reduce_sum(soft * (tf.math.log(tf.clip_by_value(soft, 1e-7, 1.0)) - student_t), axis=1)
+        return alpha * ce + (1.0 - alpha) * temperature ** 2 * kl
+    return loss
+
+
+def hard_accuracy(num_classes: int):
+    import tensorflow as tf
+
+    def accuracy(y_true, y_pred):
+        return tf.cast(tf.equal(tf.argmax(y_true[:, :num_classes], axis=1), tf.argmax(y_pred, axis=1)), tf.float32)
+    return accuracy
+
+
+def distill(model, X_train, y_train, T_train, X_val, y_val, T_val, num_classes: int, args):
+    import tensorflow as tf
+
+    def targets(y, logits):
+        return np.concatenate([np.eye(num_classes, dtype=np.float32)[y], soft_targets(logits, args.temperature)], axis=1)
+
+    model.compile(optimizer=tf.keras.optimizers.Adam(1e-3), loss=distill_loss(num_classes, args.temperature, args.alpha),
+                  metrics=[hard_accuracy(num_classes)])
+    early = tf.keras.callbacks.EarlyStopping(monitor='val_loss', patience=args.patience, restore_best_weights=True)
+    model.fit(X_train, targets(y_train, T_train), validation_data=(X_val, targets(y_val, T_val)),
+              epochs=args.epochs, batch_size=args.batch_size, callbacks=[early], verbose=2)
+    return model
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Destila el modelo de letras MobileNetV2 en un CNN pequeño o en el MLP de landmarks.')
+    ap.add_argument('--teacher', required=True, help='Hash (o prefijo) del modelo profesor en <workdir>/models/')
+    ap.add_argument('--student', choices=['cnn', 'mlp'], default='cnn', help='Alumno: CNN de train_letters_from_pickle o MLP de landmarks')
+    ap.add_argument('--coco-dir', help='Dataset COCO (train/valid con _annotations.coco.json)')
+    ap.add_argument('--folder-dataset', help='Dataset en carpetas (train/valid/<clase>/*.jpg)')
+    ap.add_argument('--pickle', help='Pickle de imágenes y labels (split 80/20)')
+    ap.add_argument('--allow-classes', type=str, default='A,B,C,D,E,F,G,H,I,L,M,N,O,P,R,S,T,U,V,W,Y,0,1,2,3,4,5,6,7,8,9', help='Lista de clases permitidas separadas por coma')
+    ap.add_argument('--img-size', type=int, default=96, help='Tamaño de entrada del alumno CNN')
+    ap.add_argument('--hidden', default='128,64', help='Capas ocultas del alumno MLP')
+    ap.add_argument('--temperature', type=float, default=4.0, help='Temperatura T de los soft targets')
+    ap.add_argument('--alpha', type=float, default=0.3, help='Peso de la pérdida con la etiqueta real (1 - alpha para el profesor)')
+    ap.add_argument('--epochs', type=int, default=30, help='Épocas máximas (early stopping)')
+    ap.add_argument('--batch-size', type=int, default=64)
+    ap.add_argument('--patience', type=int, default=5, help='Épocas sin mejora de val_loss antes de parar')
+    ap.add_argument('--seed', type=int, default=42, help='Semilla del split del pickle y del entrenamiento')
+    ap.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1), help='Procesos de MediaPipe (alumno MLP)')
+    ap.add_argument('--workdir', type=Path, default=Path('tools/work'), help='Directorio de trabajo (models/, cache/, reports/)')
+    args = ap.parse_args(argv)
+    if not (args.coco_dir or args.folder_dataset or args.pickle):
+        ap.error('Indica al menos --coco-dir, --folder-dataset o --pickle')
+    teacher_dir = resolve_model_dir(args.workdir, args.teacher)
+    if teacher_dir is None:
+        ap.error(f'Modelo profesor no encontrado: {args.teacher}')
+    require('tensorflow', 'PIL', *(['mediapipe'] if args.student == 'mlp' else []))
+
+    import tensorflow as tf
+    from tflite_bench import append_report, describe_model, print_table, tflite_predict
+    from train_letters_from_pickle import to_tflite
+    from train_letters_landmarks import load_all_letter_images
+
+    tf.keras.utils.set_random_seed(args.seed)
+    teacher_bytes = (teacher_dir / MODEL_FILE).read_bytes()
+    classes: List[str] = json.loads((teacher_dir / LABELS_FILE).read_text(encoding='utf-8'))
+    teacher_meta = json.loads((teacher_dir / META_FILE).read_text(encoding='utf-8')) if (teacher_dir / META_FILE).exists() else {}
+    if teacher_meta.get('cropHands'):
+        print('AVISO: el profesor se entrenó con recortes de mano; aquí recibe las imágenes completas')
+    class_idx = {c: i for i, c in enumerate(classes)}
+
+    train_imgs, train_labels, val_imgs, val_labels = load_all_letter_images(args)
+    # Solo las clases que conoce el profesor (su labels.json fija el orden de salida del alumno)
+    train = [(im, class_idx[lab]) for im, lab in zip(train_imgs, train_labels) if lab in class_idx]
+    val = [(im, class_idx[lab]) for im, lab in zip(val_imgs, val_labels) if lab in class_idx]
+    if not train or not val:
+        raise RuntimeError('No hay imágenes de train/valid con clases del profesor')
+    train_imgs, y_train = [t[0] for t in train], np.array([t[1] for t in train], dtype=np.int32)
+    val_imgs, y_val = [v[0] for v in val], np.array([v[1] for v in val], dtype=np.int32)
+    print(f'Imágenes: train {len(train_imgs)}, valid {len(val_imgs)}, {len(classes)} clases')
+
+    cache_path = args.workdir / 'cache' / 'teacher_logits' / f'{teacher_dir.name}.npz'
+    T_train = teacher_logits(teacher_bytes, cache_path, train_imgs)
+    T_val = teacher_logits(teacher_bytes, cache_path, val_imgs)
+    teacher_acc = float(np.mean(T_val.argmax(axis=1) == y_val))
+
+    if args.student == 'cnn':
+        from train_letters_from_pickle import build_model
+        X_train, X_val = to_array(train_imgs, args.img_size), to_array(val_imgs, args.img_size)
+        model = build_model(args.img_size, len(classes))
+        keep_val = np.arange(len(y_val))
+    else:
+        from extract_landmarks_and_train import build_mlp
+        from train_letters_landmarks import extract_features
+        feats_dir = args.workdir / 'cache' / 'letter_landmarks'
+        f_train = extract_features(train_imgs, feats_dir, args.workers)
+        f_val = extract_features(val_imgs, feats_dir, args.workers)
+        keep_train = np.array([i for i, f in enumerate(f_train) if f is not None], dtype=np.int64)
+        keep_val = np.array([i for i, f in enumerate(f_val) if f is not None], dtype=np.int64)
+        if not len(keep_train) or not len(keep_val):
+            raise RuntimeError('MediaPipe no detectó manos suficientes para el alumno MLP')
+        X_train = np.array([f_train[i] for i in keep_train], dtype=np.float32)
+        X_val = np.array([f_val[i] for i in keep_val], dtype=np.float32)
+        y_train, T_train = y_train[keep_train], T_train[keep_train]
+        model = build_mlp(X_train, len(classes), tuple(int(h) for h in args.hidden.split(',') if h.strip()))
+
+    model = distill(model, X_train, y_train, T_train, X_val, y_val[keep_val], T_val[keep_val], len(classes), args)
+
+    student_bytes = to_tflite(model)
+    correct = int(np.sum(tflite_predict(student_bytes, X_val).argmax(axis=1) == y_val[keep_val]))
+    # Igual que train_letters_landmarks: sin mano detectada cuenta como fallo
+    student_acc = correct / len(y_val)
+    row = describe_model(student_bytes, source=f'distill-{args.student}', imgSize=args.img_size if args.student == 'cnn' else None,
+                         teacher=teacher_dir.name, temperature=args.temperature, alpha=args.alpha,
+                         valAccuracy=round(student_acc, 4))
+    out_dir = store_model(args.workdir, student_bytes, classes, meta=row)
+    row['hash'] = out_dir.name
+    append_report(args.workdir, 'letters', row)
+    print(f'Alumno TFLite exportado: {out_dir / MODEL_FILE}')
+
+    teacher_row = describe_model(teacher_bytes, source='teacher', imgSize=teacher_meta.get('imgSize'),
+                                 valAccuracy=round(teacher_acc, 4), hash=teacher_dir.name)
+    print(f'\nAlumno vs profesor (mismo valid de {len(y_val)} imágenes; CPU, 1 hilo):')
+    print_table([teacher_row, row], ['source', 'imgSize', 'valAccuracy', 'sizeKB', 'latencyMsP50', 'latencyMsP90', 'hash'])
+
+
+if __name__ == '__main__':
+    main()
@@ -2,10 +2,13 @@
 """
 Pipeline:
 - Conecta a Firebase con service account (JSON proporcionado por el usuario).
-- Lista colecciones de Firestore (videos, images) y/o Storage rutas públicas.
-- Descarga cada video/imagen, extrae landmarks de mano con MediaPipe (Python).
+- Lee las colecciones de Firestore (videos, images) por páginas con proyección de campos y procesa
+  cada elemento según llega; con --since-last-sync solo los cambiados desde el último cursor.
+- Descarga cada video/imagen, extrae landmarks de mano con MediaPipe (Python). Con
+  --backend local:<dir> (espejo de mirror.py) lee catálogo y archivos del disco, sin red.
 - Genera dataset (CSV/NPY) de landmarks por clase (slug).
-- Si hay suficientes muestras por clase, entrena un clasificador simple (MLP) frame-based.
+- Si hay suficientes muestras por clase, entrena un clasificador simple (MLP) frame-based una sola vez
+  (tf.data balanceado por clase + early stopping) y mide el holdout sobre el .tflite exportado.
 - Exporta un modelo TFLite (.tflite) y un mapeo de etiquetas.
 
 Notas:
@@ -14,49 +17,35 @@ Notas:
 """
 
 import argparse
+import collections
+import concurrent.futures
 import os
 import sys
-import tempfile
 from pathlib import Path
 import json
-import shutil
+from typing import List
 
 import numpy as np
 
-# Dependencias requeridas: mediapipe, opencv-python, google-cloud-storage, google-cloud-firestore, firebase-admin, scikit-learn, tensorflow
+import adaptive_io
+import backends
+from artifacts import MODEL_FILE, store_model
+from backends import is_local, open_backend
+from deps import require, EXTRACT, FIREBASE, TRAIN
+from landmark_augment import parse_augment
+from video_decode import BACKENDS, DEFAULT_WIDTH, iter_frames
 
-def require(module_name: str):
-    try:
-        __import__(module_name)
-    except ImportError:
-        print(f"ERROR: Falta el paquete '{module_name}'. Instálalo en tu venv.")
-        sys.exit(1)
-
-for m in [
-    'cv2',
-    'mediapipe',
-    'google.cloud.storage',
-    'google.cloud.firestore',
-    'firebase_admin',
-    'sklearn',
-    'tensorflow',
-]:
-    require(m.split('.')[0])
-
-import cv2
-import mediapipe as mp
-from firebase_admin import credentials as fb_credentials, initialize_app
-from google.cloud import storage
-from google.cloud import firestore
-from google.oauth2 import service_account
-from sklearn.model_selection import train_test_split
-from sklearn.neural_network import MLPClassifier
-from sklearn.preprocessing import StandardScaler
-from sklearn.pipeline import Pipeline
-import tensorflow as tf
+# Las dependencias pesadas (mediapipe, opencv-python, google-cloud-storage, google-cloud-firestore,
+# firebase-admin, tensorflow) se importan dentro de cada etapa; main() solo comprueba
+# que estén instaladas para las etapas que se van a ejecutar.
 
 
 def init_firebase(service_account_path: str, storage_bucket: str):
+    from firebase_admin import credentials as fb_credentials, initialize_app
+    from google.cloud import storage
+    from google.cloud import firestore
+    from google.oauth2 import service_account
+
     # Firebase Admin for some operations (optional)
     fb_cred = fb_credentials.Certificate(service_account_path)
     app = initialize_app(fb_cred, {'storageBucket': storage_bucket})
@@ -71,33 +60,61 @@ def init_firebase(service_account_path: str, storage_bucket: str):
     return app, fs, bucket
 
 
-def list_media(fs):
-    videos = list(fs.collection('videos').stream())
-    images = list(fs.collection('images').stream())
-    def to_items(docs, kind):
-        items = []
-        for d in docs:
-            data = d.to_dict() or {}
-            slug = data.get('slug') or d.id
-            storage_path = data.get('storagePath') or data.get('videoStoragePath')
-            category = data.get('category') or 'unknown'
-            title = data.get('title') or slug
-            if storage_path:
-                items.append({'slug': slug, 'storagePath': storage_path, 'category': category, 'title': title, 'type': kind})
-        return items
-    return to_items(videos, 'video') + to_items(images, 'image')
-
-
-def download_from_storage(bucket, storage_path: str, out_dir: Path) -> Path:
-    out_dir.mkdir(parents=True, exist_ok=True)
-    filename = storage_path.split('/')[-1]
-    out_path = out_dir / filename
-    blob = bucket.blob(storage_path)
-    blob.download_to_filename(str(out_path))
-    return out_path
+MEDIA_FIELDS = ['slug', 'storagePath', 'videoStoragePath', 'category', 'title', 'updatedAt']
+CURSOR_FILE = 'catalog_cursor.json'
+
+
+def _doc_to_item(doc_id: str, data: dict, kind: str, collection: str):
+    slug = data.get('slug') or doc_id
+    storage_path = data.get('storagePath') or data.get('videoStoragePath')
+    if not storage_path:
+        return None
+    category = data.get('category') or 'unknown'
+    title = data.get('title') or slug
+    # source identifica el documento de origen de cada muestra (src.npy) para la sincronización incremental
+    return {'slug': slug, 'storagePath': storage_path, 'category': category, 'title': title, 'type': kind,
+            'updatedAt': data.get('updatedAt'), 'source': f'{collection}/{doc_id}'}
+
+
+def iter_media(meta, *, page_size: int = 300, since: dict | None = None, seen: dict | None = None):
+    """Recorre videos e imágenes por páginas con proyección de campos, produciendo items uno a uno.
+
+    Con `since` ({coleccion: ISO timestamp}) solo se leen los documentos con updatedAt posterior.
+    `seen` (si se pasa) acumula el mayor updatedAt visto por colección, para guardar el cursor.
+    `meta` es un backend de backends.py (Firestore o el SQLite de un espejo local).
+    """
+    for collection, kind in (('videos', 'video'), ('images', 'image')):
+        cutoff = (since or {}).get(collection)
+        for doc_id, data in meta.iter_docs(collection, MEDIA_FIELDS, since=cutoff, page_size=page_size):
+            item = _doc_to_item(doc_id, data, kind, collection)
+            iso = data.get('updatedAt')
+            if seen is not None and iso and iso > seen.get(collection, ''):
+                seen[collection] = iso
+            if item:
+                yield item
+
+
+def list_media(meta):
+    return list(iter_media(meta))
+
+
+def media_sources(meta, *, page_size: int = 300) -> set:
+    """Documentos del catálogo que hoy tienen archivo; lo que falte en el dataset se borró en origen."""
+    return {it['source'] for it in iter_media(meta, page_size=page_size)}
+
+
+def load_cursor(workdir: Path) -> dict:
+    path = workdir / CURSOR_FILE
+    return json.loads(path.read_text(encoding='utf-8')) if path.exists() else {}
+
+
+def save_cursor(workdir: Path, cursor: dict):
+    (workdir / CURSOR_FILE).write_text(json.dumps(cursor, indent=2), encoding='utf-8')
 
 
 def extract_landmarks_from_image(img_path: Path):
+    import cv2
+    import mediapipe as mp
     img = cv2.imread(str(img_path))
     if img is None:
         return []
@@ -114,21 +131,15 @@ def extract_landmarks_from_image(img_path: Path):
     return results_out
 
 
-def extract_landmarks_from_video(video_path: Path, max_frames: int = 32):
-    cap = cv2.VideoCapture(str(video_path))
-    if not cap.isOpened():
-        return []
+def extract_landmarks_from_video(video_path: Path, max_frames: int = 32, backend: str = 'auto', width: int | None = DEFAULT_WIDTH):
+    import mediapipe as mp
     mp_hands = mp.solutions.hands
     out = []
     with mp_hands.Hands(static_image_mode=False, max_num_hands=2) as hands:
-        frame_count = 0
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            frame_count += 1
-            if frame_count % 2 == 1:  # submuestreo ligero
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        # Submuestreo ligero (1 de cada 2 frames), escalado y RGB ya hechos por el backend de decodificación
+        frames = iter_frames(video_path, backend, width, step=2)
+        try:
+            for frame_rgb in frames:
                 result = hands.process(frame_rgb)
                 if result.multi_hand_landmarks and result.multi_handedness:
                     per_frame = []
@@ -137,9 +148,10 @@ def extract_landmarks_from_video(video_path: Path, max_frames: int = 32):
                         label = handed.classification[0].label
                         per_frame.append({'landmarks': points, 'handedness': label})
                     out.append(per_frame)
-            if len(out) >= max_frames:
-                break
-    cap.release()
+                if len(out) >= max_frames:
+                    break
+        finally:
+            frames.close()
     return out
 
 
@@ -154,44 +166,52 @@ def landmarks_to_features(points):
     return pts.flatten()  # 21*2 = 42 features
 
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--service_account', required=True, help='Ruta al JSON de service account')
-    parser.add_argument('--storage_bucket', required=True, help='ID del bucket de Storage, ej. signlanguage-XXXX.appspot.com')
-    parser.add_argument('--workdir', default='tools/work', help='Directorio de trabajo')
-    parser.add_argument('--min_per_class', type=int, default=5, help='Mínimas muestras por clase para entrenar')
-    args = parser.parse_args()
-
-    workdir = Path(args.workdir)
-    workdir.mkdir(parents=True, exist_ok=True)
-
-    print('Inicializando Firebase...')
-    _, fs, bucket = init_firebase(args.service_account, args.storage_bucket)
-    items = list_media(fs)
-    print(f'Total media items: {len(items)}')
+def build_dataset(args, workdir: Path):
+    if not is_local(args.backend):
+        print('Inicializando Firebase...')
+    storage, meta = open_backend(args.backend, lambda: init_firebase(args.service_account, args.storage_bucket)[1:])
 
     dataset_X = []
     dataset_y = []
-    class_counts = {}
+    dataset_src = []
+
+    # Incremental: parte del dataset guardado y solo procesa los documentos cambiados desde el cursor.
+    # src.npy guarda el documento de origen de cada muestra; un dataset sin él se reconstruye entero.
+    cursor = load_cursor(workdir) if args.since_last_sync else {}
+    x_path, y_path, src_path = workdir / 'X.npy', workdir / 'y.npy', workdir / 'src.npy'
+    if cursor and x_path.exists() and y_path.exists() and src_path.exists():
+        print(f'Sincronización incremental desde {cursor}')
+    else:
+        if cursor:
+            print(f'AVISO: falta {src_path.name}; se reconstruye el dataset completo')
+        cursor = {}
+    seen = dict(cursor)
+    changed = set()
 
     tmpdir = workdir / 'downloads'
     tmpdir.mkdir(parents=True, exist_ok=True)
 
-    for it in items:
+    storage_io = adaptive_io.storage_limiter(args)
+
+    def download(it):
+        # Subcarpeta por ruta remota: descargas simultáneas de slugs iguales en categorías distintas no chocan.
+        # Con un espejo local (--backend local:<dir>) no se descarga nada: se lee el archivo del espejo.
+        dest = tmpdir / Path(it['storagePath']).parent
+        return storage_io.call(storage.fetch, it['storagePath'], dest, nbytes=lambda p: p.stat().st_size)
+
+    def process(it, local_path: Path):
         slug = it['slug']
-        storage_path = it['storagePath']
-        typ = it['type']
-        local_path = download_from_storage(bucket, storage_path, tmpdir)
-        print(f'Descargado: {storage_path} -> {local_path}')
-        if typ == 'image':
+        print(f"{'Leído' if storage.is_local else 'Descargado'}: {it['storagePath']} -> {local_path}  [{storage_io.status()}]")
+        if it['type'] == 'image':
             hands = extract_landmarks_from_image(local_path)
             for h in hands:
                 feats = landmarks_to_features(h['landmarks'])
                 if feats is not None:
                     dataset_X.append(feats)
                     dataset_y.append(slug)
+                    dataset_src.append(it['source'])
         else:
-            frames = extract_landmarks_from_video(local_path)
+            frames = extract_landmarks_from_video(local_path, backend=args.decode_backend, width=args.decode_width or None)
             # Agrega algunos frames muestreados por clase
             for per_frame in frames:
                 # Usa la primera mano si hay múltiples
@@ -200,71 +220,300 @@ def main():
                     if feats is not None:
                         dataset_X.append(feats)
                         dataset_y.append(slug)
+                        dataset_src.append(it['source'])
+
+    failures = []
+
+    def handle(it, fut):
+        # Un elemento que falla (tras los reintentos de la descarga) no aborta la extracción del resto
+        try:
+            process(it, fut.result())
+        except Exception as e:
+            failures.append(it['storagePath'])
+            print(f"ERROR: {it['storagePath']}: {e}", file=sys.stderr)
+            return
+        changed.add(it['source'])
+
+    # Las descargas van por delante de MediaPipe (concurrencia adaptativa) y se procesan en orden
+    total = 0
+    pending = collections.deque()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.max_inflight) as ex:
+        for it in iter_media(meta, page_size=args.page_size, since=cursor or None, seen=seen):
+            total += 1
+            pending.append((it, ex.submit(download, it)))
+            while len(pending) > 2 * args.max_inflight:
+                handle(*pending.popleft())
+        while pending:
+            handle(*pending.popleft())
+    print(f'Total media items procesados: {total - len(failures)} de {total}  [{storage_io.status()}]')
+    if failures:
+        # Los documentos fallidos conservan sus muestras anteriores y el cursor no avanza: se reintentan en la próxima ejecución
+        print(f'AVISO: {len(failures)} elementos fallaron; el cursor de sincronización no avanza')
+
+    if cursor:
+        # Sustituye por documento: conserva las muestras previas de los documentos que no cambiaron
+        # y quita las de los reprocesados y las de los borrados del catálogo
+        live = media_sources(meta, page_size=args.page_size)
+        old_X = np.load(x_path)
+        old_y = [str(v) for v in np.load(y_path)]
+        old_src = [str(v) for v in np.load(src_path)]
+        removed = {s for s in old_src if s not in live}
+        if removed:
+            print(f'Documentos borrados en origen: {len(removed)}; se quitan sus muestras')
+        keep = [i for i, s in enumerate(old_src) if s not in changed and s not in removed]
+        dataset_X = [old_X[i] for i in keep] + dataset_X
+        dataset_y = [old_y[i] for i in keep] + dataset_y
+        dataset_src = [old_src[i] for i in keep] + dataset_src
+
+    # Guarda siempre el dataset para poder reentrenar con --from-dataset sin volver a extraer
+    np.save(x_path, np.array(dataset_X))
+    np.save(y_path, np.array(dataset_y))
+    np.save(src_path, np.array(dataset_src))
+    save_cursor(workdir, cursor if failures else seen)
+    return dataset_X, dataset_y
+
+
+def build_mlp(X_train, num_classes: int, hidden=(128, 64)):
+    """MLP sobre features de landmarks con Normalization adaptada a X_train (entrada vectorial en la app)."""
+    from tensorflow import keras
+    from tensorflow.keras import layers
 
+    norm_layer = layers.Normalization()
+    norm_layer.adapt(np.asarray(X_train, dtype=np.float32))
+    model = keras.Sequential([
+        layers.Input(shape=(np.asarray(X_train).shape[1],)),
+        norm_layer,
+        *[layers.Dense(units, activation='relu') for units in hidden],
+        layers.Dense(num_classes, activation='softmax')
+    ])
+    model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+def stratified_split(y, test_size: float, seed: int = 42):
+    """Índices (train, test) estratificados por clase; cada clase conserva al menos 1 muestra en train.
+
+    Las clases con una sola muestra no aportan test, así que `test` puede salir vacío.
+    """
+    y = np.asarray(y)
+    rng = np.random.RandomState(seed)
+    train_idx, test_idx = [], []
+    for c in np.unique(y):
+        idx = rng.permutation(np.flatnonzero(y == c))
+        n_test = min(len(idx) - 1, max(1, int(round(len(idx) * test_size))))
+        test_idx.extend(idx[:n_test])
+        train_idx.extend(idx[n_test:])
+    return np.array(sorted(train_idx), dtype=np.int64), np.array(sorted(test_idx), dtype=np.int64)
+
+
+def balanced_dataset(X, y, num_classes: int, batch_size: int, seed: int = 42, augment: dict | None = None):
+    """tf.data que muestrea las clases de forma uniforme, en lotes y con prefetch (repetición infinita).
+
+    Con `augment` (ver landmark_augment.DEFAULTS) cada lote pasa por el aumento vectorizado de landmarks.
+    """
+    import tensorflow as tf
+
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y, dtype=np.int32)
+    per_class = []
+    for c in range(num_classes):
+        idx = np.flatnonzero(y == c)
+        if len(idx):
+            per_class.append(tf.data.Dataset.from_tensor_slices((X[idx], y[idx])).shuffle(len(idx), seed=seed).repeat())
+    ds = tf.data.Dataset.sample_from_datasets(per_class, seed=seed).batch(batch_size)
+    if augment:
+        from landmark_augment import tf_augment_fn
+        # El índice del lote fija su generador: mismo aumento con la misma semilla aunque el map sea paralelo
+        ds = ds.enumerate().map(tf_augment_fn(augment, seed), num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def fit_mlp(X_train, y_train, X_val, y_val, num_classes: int, *, epochs: int = 100, batch_size: int = 64,
+            patience: int = 10, hidden=(128, 64), seed: int = 42, verbose: int = 2, augment: dict | None = None):
+    """Entrena el MLP una sola vez: entrada balanceada por clase y early stopping sobre val_loss.
+
+    Con la validación vacía (clases de una sola muestra) el early stopping vigila la loss de entrenamiento.
+    """
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(seed)
+    model = build_mlp(X_train, num_classes, hidden)
+    steps = max(1, int(np.ceil(len(X_train) / batch_size)))
+    validation = (np.asarray(X_val, dtype=np.float32), np.asarray(y_val)) if len(y_val) else None
+    if validation is None and verbose:
+        print('AVISO: validación vacía; el early stopping usa la loss de entrenamiento')
+    early = tf.keras.callbacks.EarlyStopping(monitor='val_loss' if validation else 'loss', patience=patience,
+                                             restore_best_weights=True)
+    model.fit(
+        balanced_dataset(X_train, y_train, num_classes, batch_size, seed, augment),
+        steps_per_epoch=steps,
+        validation_data=validation,
+        epochs=epochs, callbacks=[early], verbose=verbose,
+    )
+    return model
+
+
+def evaluate_tflite(tflite_model: bytes, X, y, classes) -> dict:
+    """Métricas de holdout del .tflite exportado (no del modelo Keras), en una sola invocación por lotes."""
+    from tflite_bench import make_interpreter
+
+    X = np.asarray(X, dtype=np.float32)
+    y = np.asarray(y)
+    interp = make_interpreter(tflite_model)
+    inp = interp.get_input_details()[0]
+    interp.resize_tensor_input(inp['index'], [len(X), X.shape[1]])
+    interp.allocate_tensors()
+    interp.set_tensor(inp['index'], X)
+    interp.invoke()
+    pred = interp.get_tensor(interp.get_output_details()[0]['index']).argmax(axis=1)
+    per_class = {}
+    f1s = []
+    for i, c in enumerate(classes):
+        tp = int(np.sum((pred == i) & (y == i)))
+        support = int(np.sum(y == i))
+        predicted = int(np.sum(pred == i))
+        recall = tp / support if support else 0.0
+        precision = tp / predicted if predicted else 0.0
+        f1s.append(2 * precision * recall / (precision + recall) if precision + recall else 0.0)
+        per_class[c] = round(recall, 4)
+    return {
+        'holdoutAccuracy': round(float(np.mean(pred == y)), 4),
+        'holdoutMacroF1': round(float(np.mean(f1s)), 4),
+        'holdoutSamples': int(len(y)),
+        'perClassRecall': per_class,
+    }
+
+
+def _run_fold(payload):
+    # Proceso independiente (spawn): TensorFlow se inicializa en cada fold
+    X, y, train_idx, val_idx, num_classes, params = payload
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(params.pop('threads', 1))
+    model = fit_mlp(X[train_idx], y[train_idx], X[val_idx], y[val_idx], num_classes, verbose=0, **params)
+    _, acc = model.evaluate(X[val_idx], y[val_idx], verbose=0)
+    return float(acc)
+
+
+def kfold_scores(X, y, num_classes: int, k: int, workers: int, **params) -> List[float]:
+    """Validación cruzada estratificada con los folds en procesos paralelos."""
+    import multiprocessing
+
+    rng = np.random.RandomState(params.get('seed', 42))
+    fold_of = np.empty(len(y), dtype=np.int32)
+    for c in np.unique(y):
+        idx = rng.permutation(np.flatnonzero(y == c))
+        fold_of[idx] = np.arange(len(idx)) % k
+    threads = max(1, (os.cpu_count() or 1) // max(1, workers))
+    payloads = [(X, y, np.flatnonzero(fold_of != f), np.flatnonzero(fold_of == f), num_classes, dict(params, threads=threads))
+                for f in range(k)]
+    ctx = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as ex:
+        return list(ex.map(_run_fold, payloads))
+
+
+def train_and_export(X_all, y_all, workdir: Path, min_per_class: int, *, epochs: int = 100, batch_size: int = 64,
+                     patience: int = 10, kfold: int = 0, kfold_workers: int = 1, hidden=(128, 64), augment: dict | None = None):
     # Estadísticas por clase
-    for c in dataset_y:
+    class_counts = {}
+    for c in y_all:
         class_counts[c] = class_counts.get(c, 0) + 1
     print('Muestras por clase:', json.dumps(class_counts, indent=2, ensure_ascii=False))
 
     # Verifica mínimos
-    ok_classes = {c for c, n in class_counts.items() if n >= args.min_per_class}
+    ok_classes = {c for c, n in class_counts.items() if n >= min_per_class}
     if not ok_classes:
-        print('No hay suficientes muestras por clase para entrenar (min_per_class=%d). Exporto solo el dataset.' % args.min_per_class)
-        np.save(workdir / 'X.npy', np.array(dataset_X))
-        np.save(workdir / 'y.npy', np.array(dataset_y))
-        return
+        print('No hay suficientes muestras por clase para entrenar (min_per_class=%d). Exporto solo el dataset.' % min_per_class)
+        return None
 
-    X = np.array([x for x, y in zip(dataset_X, dataset_y) if y in ok_classes])
-    y = np.array([y for y in dataset_y if y in ok_classes])
+    import tensorflow as tf
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    X = np.array([x for x, y in zip(X_all, y_all) if y in ok_classes], dtype=np.float32)
+    classes = sorted(ok_classes)
+    class_to_idx = {c: i for i, c in enumerate(classes)}
+    y = np.array([class_to_idx[y] for y in y_all if y in ok_classes], dtype=np.int32)
+    params = {'epochs': epochs, 'batch_size': batch_size, 'patience': patience, 'hidden': tuple(hidden), 'augment': augment}
+
+    if kfold > 1:
+        print(f'Validación cruzada {kfold}-fold en {kfold_workers} procesos...')
+        scores = kfold_scores(X, y, len(classes), kfold, kfold_workers, **params)
+        print(f'Accuracy k-fold: {np.mean(scores):.3f} ± {np.std(scores):.3f} ({", ".join(f"{s:.3f}" for s in scores)})')
+
+    # holdout (test) intacto; del resto sale la validación para early stopping
+    train_idx, test_idx = stratified_split(y, 0.2)
+    if not len(test_idx):
+        print('Ninguna clase tiene 2 o más muestras: no queda holdout con el que medir el modelo. '
+              'Sube --min_per_class (>= 2) o añade datos. Exporto solo el dataset.')
+        return None
+    fit_idx, val_idx = stratified_split(y[train_idx], 0.15, seed=43)
+    fit_idx, val_idx = train_idx[fit_idx], train_idx[val_idx]
 
     print('Entrenando MLP (frame-based)...')
-    clf = Pipeline([
-        ('scaler', StandardScaler()),
-        ('mlp', MLPClassifier(hidden_layer_sizes=(128, 64), activation='relu', max_iter=200))
-    ])
-    clf.fit(X_train, y_train)
-    acc = clf.score(X_test, y_test)
-    print(f'Accuracy holdout: {acc:.3f}')
+    model = fit_mlp(X[fit_idx], y[fit_idx], X[val_idx], y[val_idx], len(classes), **params)
 
-    # Exporta como TFLite (simple) mediante un modelo Keras equivalente
     print('Exportando modelo TFLite...')
-    classes = sorted(set(y))
-    with open(workdir / 'labels.json', 'w') as f:
-        json.dump(classes, f, ensure_ascii=False, indent=2)
-
-    # Construye red equivalente en Keras con Normalization adaptada
-    from tensorflow import keras
-    from tensorflow.keras import layers
-    input_dim = X.shape[1]
-    num_classes = len(classes)
-    norm_layer = layers.Normalization()
-    norm_layer.adapt(X_train)
-    model = keras.Sequential([
-        layers.Input(shape=(input_dim,)),
-        norm_layer,
-        layers.Dense(128, activation='relu'),
-        layers.Dense(64, activation='relu'),
-        layers.Dense(num_classes, activation='softmax')
-    ])
-    model.compile(optimizer='adam', loss='sparse_categorical_crossentropy', metrics=['accuracy'])
-    # Mapea labels a índices
-    class_to_idx = {c: i for i, c in enumerate(classes)}
-    y_train_idx = np.array([class_to_idx[v] for v in y_train])
-    y_test_idx = np.array([class_to_idx[v] for v in y_test])
-    model.fit(X_train, y_train_idx, validation_data=(X_test, y_test_idx), epochs=10, batch_size=32, verbose=2)
-
     converter = tf.lite.TFLiteConverter.from_keras_model(model)
     tflite_model = converter.convert()
-    out_path = workdir / 'gesture_frame_mlp.tflite'
-    with open(out_path, 'wb') as f:
-        f.write(tflite_model)
-    print(f'Modelo TFLite escrito en {out_path}')
+    metrics = evaluate_tflite(tflite_model, X[test_idx], y[test_idx], classes)
+    print(f"Holdout del .tflite exportado: accuracy {metrics['holdoutAccuracy']:.3f}, macro-F1 {metrics['holdoutMacroF1']:.3f} "
+          f"({metrics['holdoutSamples']} muestras)")
+    if kfold > 1:
+        metrics['kfoldAccuracy'] = [round(s, 4) for s in scores]
+    out_dir = store_model(workdir, tflite_model, classes, meta={'source': 'landmarks', 'hidden': list(hidden), 'augment': augment, **metrics})
+    print(f'Modelo TFLite escrito en {out_dir / MODEL_FILE}')
+
+    print('Listo. Sube el artefacto con upload_artifacts.py para integrarlo en la app.')
+    return model, out_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    backends.add_arguments(parser)
+    parser.add_argument('--service_account', help='Ruta al JSON de service account')
+    parser.add_argument('--storage_bucket', help='ID del bucket de Storage, ej. signlanguage-XXXX.appspot.com')
+    parser.add_argument('--workdir', default='tools/work', help='Directorio de trabajo')
+    parser.add_argument('--min_per_class', type=int, default=5, help='Mínimas muestras por clase para entrenar')
+    parser.add_argument('--from-dataset', action='store_true', help='Reentrena desde X.npy/y.npy del workdir sin descargar ni extraer')
+    parser.add_argument('--since-last-sync', action='store_true', help='Solo procesa documentos con updatedAt posterior al cursor guardado (catalog_cursor.json); las muestras se sustituyen por documento (src.npy) y se quitan las de los borrados')
+    parser.add_argument('--page-size', type=int, default=300, help='Documentos por página al leer Firestore')
+    parser.add_argument('--decode-backend', choices=BACKENDS, default='auto', help='Decodificación de video: ffmpeg (escala y RGB en el decodificador) u opencv; auto usa ffmpeg si está en el PATH')
+    parser.add_argument('--decode-width', type=int, default=DEFAULT_WIDTH, help='Ancho al que se decodifican los videos para MediaPipe (0 = resolución original)')
+    adaptive_io.add_arguments(parser, default_max=16)
+    parser.add_argument('--epochs', type=int, default=100, help='Épocas máximas (early stopping sobre val_loss)')
+    parser.add_argument('--batch-size', type=int, default=64, help='Tamaño de lote del tf.data balanceado')
+    parser.add_argument('--patience', type=int, default=10, help='Épocas sin mejora antes de parar')
+    parser.add_argument('--hidden', default='128,64', help='Unidades de las capas ocultas del MLP, separadas por coma')
+    parser.add_argument('--kfold', type=int, default=0, help='Validación cruzada k-fold adicional (0 = desactivada)')
+    parser.add_argument('--kfold-workers', type=int, default=2, help='Procesos paralelos para los folds')
+    parser.add_argument('--augment', nargs='?', const='default', default='none',
+                        help="Aumento de landmarks por lote en el tf.data: 'default' o clave=valor,... (rotation, scale, shear, mirror, jitter)")
+    args = parser.parse_args(argv)
+    try:
+        augment = parse_augment(args.augment)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if not args.from_dataset and not is_local(args.backend) and not (args.service_account and args.storage_bucket):
+        parser.error('--service_account y --storage_bucket son obligatorios salvo con --from-dataset o --backend local:<dir>')
+
+    workdir = Path(args.workdir)
+    workdir.mkdir(parents=True, exist_ok=True)
 
-    print('Listo. Sube labels y el .tflite a Storage para integrarlo en la app.')
+    if args.from_dataset:
+        x_path, y_path = workdir / 'X.npy', workdir / 'y.npy'
+        if not x_path.exists() or not y_path.exists():
+            parser.error(f'No existe el dataset en caché: {x_path} / {y_path}')
+        require(TRAIN)
+        dataset_X = list(np.load(x_path))
+        dataset_y = [str(v) for v in np.load(y_path)]
+        print(f'Dataset cargado desde caché: {len(dataset_y)} muestras')
+    else:
+        require([] if is_local(args.backend) else FIREBASE, EXTRACT, TRAIN)
+        dataset_X, dataset_y = build_dataset(args, workdir)
+
+    train_and_export(dataset_X, dataset_y, workdir, args.min_per_class, epochs=args.epochs, batch_size=args.batch_size,
+                     patience=args.patience, kfold=args.kfold, kfold_workers=args.kfold_workers,
+                     hidden=tuple(int(h) for h in args.hidden.split(',') if h.strip()), augment=augment)
 
 
 if __name__ == '__main__':
     main()
-
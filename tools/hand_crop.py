@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+hand_crop.py
+
+Recorte de la región de la mano para los clasificadores de imagen de letras.
+
+La caja sale de la anotación COCO cuando existe o, para datasets en carpetas/pickle,
+de una única pasada de MediaPipe Hands. El recorte (cuadrado, con margen) se guarda ya
+redimensionado en una caché en disco, de modo que las siguientes ejecuciones no vuelven
+a decodificar la imagen original ni a ejecutar MediaPipe.
+"""
+import hashlib
+from pathlib import Path
+from typing import Optional, Sequence, Tuple
+
+from PIL import Image
+
+Box = Tuple[float, float, float, float]  # x, y, w, h en píxeles
+
+
+def square_box(box: Box, img_w: int, img_h: int, margin: float = 0.25) -> Tuple[int, int, int, int]:
+    """Caja cuadrada centrada en `box` y ampliada por `margin` (l, t, r, b).
+
+    Se desplaza para quedar dentro de la imagen; en un eje más estrecho que el lado, sobresale
+    centrada e Image.crop rellena con negro, así el recorte sigue siendo cuadrado y el resize
+    posterior no deforma la mano.
+    """
+    x, y, w, h = box
+    side = max(w, h) * (1.0 + 2 * margin)
+    side = int(round(min(side, max(img_w, img_h))))
+    cx, cy = x + w / 2.0, y + h / 2.0
+
+    def start(center: float, dim: int) -> int:
+        if side > dim:
+            return (dim - side) // 2
+        return int(round(min(max(0.0, center - side / 2.0), dim - side)))
+
+    left, top = start(cx, img_w), start(cy, img_h)
+    return left, top, left + side, top + side
+
+
+def union_box(boxes: Sequence[Sequence[float]]) -> Optional[Box]:
+    boxes = [b for b in boxes if b and len(b) == 4 and b[2] > 0 and b[3] > 0]
+    if not boxes:
+        return None
+    x0 = min(b[0] for b in boxes)
+    y0 = min(b[1] for b in boxes)
+    x1 = max(b[0] + b[2] for b in boxes)
+    y1 = max(b[1] + b[3] for b in boxes)
+    return x0, y0, x1 - x0, y1 - y0
+
+
+class HandCropper:
+    """Recorta manos a `size`x`size` con caché en disco; MediaPipe se carga solo si hace falta."""
+
+    def __init__(self, size: int, cache_dir: Optional[Path] = None, margin: float = 0.25):
+        self.size = size
+        self.margin = margin
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._hands = None
+        self.detected = 0
+        self.missed = 0
+        self.cache_hits = 0
+
+    def _cache_path(self, key: str) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        digest = hashlib.sha1(f'{key}|{self.size}|{self.margin}'.encode('utf-8')).hexdigest()
+        return self.cache_dir / f'{digest}.png'
+
+    def detect(self, img: Image.Image) -> Optional[Box]:
+        """Caja de la mano (unión si hay varias) con MediaPipe Hands en modo imagen estática."""
+        import numpy as np
+        if self._hands is None:
+            import mediapipe as mp
+            self._hands = mp.solutions.hands.Hands(static_image_mode=True, max_num_hands=2)
+        result = self._hands.process(np.asarray(img.convert('RGB')))
+        if not result.multi_hand_landmarks:
+            return None
+        w, h = img.size
+        boxes = []
+        for lm in result.multi_hand_landmarks:
+            xs = [p.x * w for p in lm.landmark]
+            ys = [p.y * h for p in lm.landmark]
+            boxes.append((min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)))
+        return union_box(boxes)
+
+    def crop(self, key: str, load, box: Optional[Box] = None) -> Optional[Image.Image]:
+        """Devuelve el recorte para `key`; `load()` solo se llama si no está en caché.
+
+        Sin `box` se detecta la mano con MediaPipe; si no se encuentra, se usa la imagen completa.
+        """
+        cached = self._cache_path(key)
+        if cached is not None and cached.exists():
+            self.cache_hits += 1
+            return Image.open(cached).convert('RGB')
+        img = load()
+        if img is None:
+            return None
+        if box is None:
+            box = self.detect(img)
+            if box is None:
+                self.missed += 1
+            else:
+                self.detected += 1
+        if box is not None:
+            img = img.crop(square_box(box, img.width, img.height, self.margin))
+        out = img.resize((self.size, self.size), Image.BILINEAR)
+        if cached is not None:
+            out.save(cached)
+        return out
+
+    def close(self):
+        if self._hands is not None:
+            self._hands.close()
+            self._hands = None
+
+    def summary(self) -> str:
+        return f'recortes: caché={self.cache_hits} detectados={self.detected} sin_mano={self.missed}'
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+image_variants.py
+
+Variantes optimizadas de las imágenes del catálogo para prepare_and_upload_videos.py: cada original
+se redimensiona a un conjunto de anchos (sin ampliar) y se codifica en WebP y, si Pillow lo soporta,
+AVIF. Las variantes no llevan EXIF/ICC/XMP: la orientación EXIF se aplica al píxel antes de descartarla
+y los colores se convierten a sRGB con el perfil ICC del original (sin perfil, el navegador asume sRGB;
+descartar un perfil P3 o AdobeRGB sin convertir desplaza los colores). Las rutas de las variantes
+incluyen la extensión del original (`variant_stem`): foto.jpg y foto.png no se pisan.
+
+La generación es CPU intensiva y se hace en un ProcessPoolExecutor. Cada imagen se identifica por
+el SHA-256 de su contenido más la configuración de variantes (`source_key`); si coincide con el
+registro del manifest anterior, la imagen no ha cambiado y se reutiliza el registro sin volver a
+codificar ni subir nada.
+
+Uso (solo local, para probar anchos/calidad):
+  python tools/image_variants.py foto.jpg --widths 160,320,640 --out tools/work/variants
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import importlib
+import io
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from deps import IMAGES, is_installed, require
+
+DEFAULT_WIDTHS = (160, 320, 640)
+DEFAULT_FORMATS = ('webp', 'avif')
+CONTENT_TYPES = {'webp': 'image/webp', 'avif': 'image/avif'}
+
+
+def parse_widths(text: str) -> List[int]:
+    return sorted({int(w) for w in text.split(',') if w.strip()})
+
+
+def supported_formats(formats: Sequence[str]) -> List[str]:
+    """Formatos que Pillow puede escribir aquí (AVIF necesita Pillow >= 11.2 o pillow-avif-plugin)."""
+    from PIL import features
+    out = []
+    for fmt in formats:
+        if fmt == 'avif' and is_installed('pillow_avif'):
+            importlib.import_module('pillow_avif')  # registra el plugin AVIF al importarse
+        if features.check(fmt):
+            out.append(fmt)
+    return out
+
+
+def source_key(path: Path, widths: Sequence[int], formats: Sequence[str], quality: int) -> str:
+    """Huella del original + configuración: cambia si cambia la imagen o cómo se generan las variantes."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    h.update(json.dumps([list(widths), list(formats), quality]).encode('ascii'))
+    return h.hexdigest()[:32]
+
+
+def variant_stem(name: str, src: Path) -> str:
+    """Stem de las variantes de `src`: `name` (p.ej. categoría/slug) más la extensión del original."""
+    return f"{name}-{src.suffix.lower().lstrip('.')}"
+
+
+# Espacio de color del perfil ICC -> modo de Pillow sobre el que se aplica
+_ICC_MODES = {'RGB': 'RGB', 'CMYK': 'CMYK', 'GRAY': 'L'}
+
+
+def to_srgb(im, mode: str):
+    """`im` en `mode` (RGB o RGBA) y en sRGB, aplicando su perfil ICC embebido si lo tiene."""
+    from PIL import ImageCms
+
+    alpha = im.convert('RGBA').getchannel('A') if mode == 'RGBA' else None
+    icc = im.info.get('icc_profile')
+    if icc:
+        try:
+            profile = ImageCms.ImageCmsProfile(io.BytesIO(icc))
+            base = _ICC_MODES.get(profile.profile.xcolor_space.strip())
+            if base:
+                color = im if im.mode == base else im.convert(base)
+                im = ImageCms.profileToProfile(color, profile, ImageCms.createProfile('sRGB'), outputMode='RGB')
+        except (OSError, ImageCms.PyCMSError) as e:
+            # Perfil ilegible: se trata como sRGB, como haría un navegador
+            print(f'AVISO: perfil ICC no válido ({e}); se asume sRGB')
+    im = im.convert('RGB')
+    if alpha is not None:
+        im.putalpha(alpha)
+    return im
+
+
+def make_variants(src: Path, out_dir: Path, stem: str, widths: Sequence[int], formats: Sequence[str],
+                  quality: int = 80) -> List[dict]:
+    """Escribe <out_dir>/<stem>-w<ancho>.<fmt> (stem puede incluir subcarpeta) y devuelve [{width, height, format, path, sizeBytes}]."""
+    from PIL import Image, ImageOps
+
+    variants = []
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)
+        im = to_srgb(im, 'RGBA' if im.mode in ('RGBA', 'LA', 'PA') or 'transparency' in im.info else 'RGB')
+        # Ya en sRGB; el codificador AVIF toma icc_profile/exif/xmp de im.info si no se le pasan: se vacía
+        im.info.clear()
+        # Nunca ampliar: los anchos mayores que el original se sustituyen por el ancho original
+        targets = sorted({min(w, im.width) for w in widths})
+        for w in targets:
+            h = max(1, round(im.height * w / im.width))
+            resized = im if w == im.width else im.resize((w, h), Image.LANCZOS)
+            for fmt in formats:
+                path = out_dir / f'{stem}-w{w}.{fmt}'
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Metadatos vacíos explícitos: ningún codificador hereda los del original
+                if fmt == 'webp':
+                    resized.save(path, 'WEBP', quality=quality, method=6, icc_profile=b'', exif=b'')
+                else:
+                    resized.save(path, 'AVIF', quality=quality, icc_profile=b'', exif=b'', xmp=b'')
+                variants.append({'width': w, 'height': h, 'format': fmt, 'path': str(path), 'sizeBytes': path.stat().st_size})
+    return variants
+
+
+def _variants_job(job: Tuple[str, str, str, List[int], List[str], int]) -> Tuple[str, Optional[List[dict]], Optional[str]]:
+    src, out_dir, stem, widths, formats, quality = job
+    try:
+        return src, make_variants(Path(src), Path(out_dir), stem, widths, formats, quality), None
+    except Exception as e:
+        return src, None, str(e)
+
+
+def generate_all(jobs: List[Tuple[Path, str]], out_dir: Path, widths: Sequence[int], formats: Sequence[str],
+                 quality: int, workers: int) -> Dict[str, List[dict]]:
+    """{ruta original: variantes} para jobs (ruta, stem) en paralelo; las que fallan se omiten con aviso."""
+    result: Dict[str, List[dict]] = {}
+    if not jobs:
+        return result
+    payload = [(str(p), str(out_dir), stem, list(widths), list(formats), quality) for p, stem in jobs]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as ex:
+        for src, variants, err in ex.map(_variants_job, payload, chunksize=4):
+            if err is not None:
+                print(f'AVISO: no se pudieron generar variantes de {src}: {err}')
+                continue
+            result[src] = variants
+    return result
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Genera variantes WebP/AVIF redimensionadas y sin metadatos de imágenes.')
+    ap.add_argument('images', nargs='+', type=Path, help='Imágenes de entrada')
+    ap.add_argument('--widths', default=','.join(str(w) for w in DEFAULT_WIDTHS), help='Anchos separados por coma')
+    ap.add_argument('--formats', default=','.join(DEFAULT_FORMATS), help='Formatos (webp, avif)')
+    ap.add_argument('--quality', type=int, default=80, help='Calidad del codificador (0-100)')
+    ap.add_argument('--out', type=Path, default=Path('tools/work/variants'), help='Carpeta de salida')
+    ap.add_argument('--workers', type=int, default=None, help='Procesos de codificación')
+    args = ap.parse_args(argv)
+    require(IMAGES)
+
+    formats = supported_formats([f.strip() for f in args.formats.split(',') if f.strip()])
+    results = generate_all([(p, variant_stem(p.stem, p)) for p in args.images], args.out, parse_widths(args.widths), formats,
+                           args.quality, args.workers)
+    for src, variants in results.items():
+        original = Path(src).stat().st_size
+        for v in variants:
+            print(f"{src} -> {v['path']} ({v['width']}x{v['height']} {v['format']}, {v['sizeBytes']} bytes, "
+                  f"{100.0 * v['sizeBytes'] / max(1, original):.1f}% del original)")
+
+
+if __name__ == '__main__':
+    main()
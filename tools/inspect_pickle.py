@@ -1,22 +1,452 @@
 #!/usr/bin/env python3
-import pickle, sys
-from PIL import Image
-
-path = sys.argv[1]
-with open(path, 'rb') as f:
-    obj = pickle.load(f)
-print('Top-level type:', type(obj))
-if isinstance(obj, dict):
-    print('Dict keys:', list(obj.keys())[:10])
-    for k, v in list(obj.items())[:3]:
-        print('Key:', k, 'Value type:', type(v))
-elif isinstance(obj, list):
-    print('List length:', len(obj))
-    for i, v in enumerate(obj[:3]):
-        print('Item', i, 'type:', type(v))
-        if isinstance(v, (list, tuple)):
-            print('  tuple/list lengths:', len(v))
-        if isinstance(v, dict):
-            print('  dict keys:', list(v.keys()))
-else:
-    print('Single object:', obj)
+"""
+inspect_pickle.py
+
+Inspección de pickles de imágenes (p.ej. ABECEDARIOIMAGENES.pickle) sin pickle.load: recorre el
+flujo de opcodes como pickletools y simula la pila con resúmenes ligeros, sin construir objetos ni
+ejecutar código del pickle. Los payloads grandes (bytes/str) se saltan con seek y solo se lee su
+cabecera para reconocer imágenes codificadas (PNG/JPEG/GIF/BMP/WebP), así que la memoria no depende
+del tamaño del archivo.
+
+Informa: tipo raíz, número de elementos por nivel y tipo, muestra de claves, bytes por tipo,
+tamaños de imagen embebidos (PNG/JPEG..., PIL.Image y arrays NumPy) y, con --sample N, una vista
+previa de los N primeros elementos (como mucho KEEP_ITEMS). La raíz es lo que queda en la pila al
+llegar a STOP, p.ej. la tupla de pickle.dumps((imagenes, etiquetas)).
+
+Uso:
+  python tools/inspect_pickle.py ABECEDARIOIMAGENES.pickle --sample 5
+"""
+import argparse
+import io
+import os
+import pickletools
+import struct
+import sys
+from collections import Counter
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+HEAD_BYTES = 64 * 1024   # cabecera leída de cada payload grande (alcanza el SOF de JPEG con EXIF)
+KEEP_ITEMS = 8           # hijos que se conservan por contenedor para vistas previas / formas
+KEEP_KEYS = 10
+MAX_SIZES = 50           # tamaños de imagen distintos que se listan
+MAX_DEPTH = 2            # niveles bajo la raíz que se desglosan por tipo
+MAX_MEMO = 10000         # entradas del memo (globals y cadenas cortas) que se recuerdan para resolver GET
+
+# Opcodes con payload prefijado por longitud: (bytes del prefijo, formato struct, tipo)
+LENGTH_PREFIXED = {
+    'BINSTRING': (4, '<i', 'bytes'), 'SHORT_BINSTRING': (1, '<B', 'bytes'),
+    'BINBYTES': (4, '<I', 'bytes'), 'SHORT_BINBYTES': (1, '<B', 'bytes'), 'BINBYTES8': (8, '<Q', 'bytes'),
+    'BYTEARRAY8': (8, '<Q', 'bytearray'),
+    'BINUNICODE': (4, '<I', 'str'), 'SHORT_BINUNICODE': (1, '<B', 'str'), 'BINUNICODE8': (8, '<Q', 'str'),
+}
+SCALARS = {
+    'INT': 'int', 'BININT': 'int', 'BININT1': 'int', 'BININT2': 'int', 'LONG': 'int', 'LONG1': 'int', 'LONG4': 'int',
+    'FLOAT': 'float', 'BINFLOAT': 'float', 'NONE': 'NoneType', 'NEWTRUE': 'bool', 'NEWFALSE': 'bool',
+    'STRING': 'bytes', 'UNICODE': 'str',
+}
+EMPTY = {'EMPTY_LIST': 'list', 'EMPTY_DICT': 'dict', 'EMPTY_TUPLE': 'tuple', 'EMPTY_SET': 'set'}
+FROM_MARK = {'LIST': 'list', 'DICT': 'dict', 'TUPLE': 'tuple', 'FROZENSET': 'frozenset'}
+
+
+class Node:
+    """Resumen de un valor del pickle: tipo, nº de hijos, bytes de payload y unos pocos hijos/claves.
+
+    `stats` cuenta los descendientes por (profundidad relativa, tipo) mientras el nodo está en la pila;
+    al engancharlo a su padre se vuelca en él y se libera, así que solo ocupa memoria lo que está abierto.
+    """
+    __slots__ = ('type', 'count', 'nbytes', 'items', 'keys', 'value', 'image', 'is_container', 'stats')
+
+    def __init__(self, type_: str, nbytes: int = 0, value=None, is_container: bool = False):
+        self.type = type_
+        self.count = 0
+        self.nbytes = nbytes
+        self.items: List['Node'] = []
+        self.keys: List[object] = []
+        self.value = value
+        self.image: Optional[Tuple[int, int]] = None
+        self.is_container = is_container
+        self.stats: Optional[Counter] = Counter() if is_container else None
+
+    def add(self, child: 'Node'):
+        self.count += 1
+        self.nbytes += child.nbytes
+        if len(self.items) < KEEP_ITEMS:
+            self.items.append(child)
+
+
+MARK = Node('<mark>')
+
+
+def encoded_image_size(head: bytes) -> Optional[Tuple[str, int, int]]:
+    """(formato, ancho, alto) a partir de la cabecera de una imagen codificada, o None."""
+    try:
+        if head[:8] == b'\x89PNG\r\n\x1a\n':
+            w, h = struct.unpack('>II', head[16:24])
+            return 'png', w, h
+        if head[:6] in (b'GIF87a', b'GIF89a'):
+            w, h = struct.unpack('<HH', head[6:10])
+            return 'gif', w, h
+        if head[:2] == b'BM' and len(head) >= 26:
+            w, h = struct.unpack('<ii', head[18:26])
+            return 'bmp', w, abs(h)
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            chunk = head[12:16]
+            if chunk == b'VP8 ':
+                w, h = struct.unpack('<HH', head[26:30])
+                return 'webp', w & 0x3FFF, h & 0x3FFF
+            if chunk == b'VP8L':
+                b = head[21:25]
+                return 'webp', 1 + (((b[1] & 0x3F) << 8) | b[0]), 1 + (((b[3] & 0xF) << 10) | (b[2] << 2) | ((b[1] & 0xC0) >> 6))
+            if chunk == b'VP8X':
+                return 'webp', 1 + int.from_bytes(head[24:27], 'little'), 1 + int.from_bytes(head[27:30], 'little')
+        if head[:2] == b'\xff\xd8':
+            i = 2
+            while i + 9 <= len(head):
+                if head[i] != 0xFF:
+                    i += 1
+                    continue
+                marker = head[i + 1]
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    h, w = struct.unpack('>HH', head[i + 5:i + 9])
+                    return 'jpeg', w, h
+                if marker in (0xD8, 0x01, 0xFF) or 0xD0 <= marker <= 0xD7:
+                    i += 2 if marker != 0xFF else 1
+                    continue
+                i += 2 + struct.unpack('>H', head[i + 2:i + 4])[0]
+    except (struct.error, IndexError):
+        return None
+    return None
+
+
+def read_payload(f: BinaryIO, length: int) -> bytes:
+    """Lee como mucho HEAD_BYTES del payload y salta el resto sin cargarlo."""
+    head = f.read(min(length, HEAD_BYTES))
+    rest = length - len(head)
+    if rest > 0:
+        if f.seekable():
+            f.seek(rest, io.SEEK_CUR)
+        else:
+            while rest > 0:
+                rest -= len(f.read(min(rest, 1 << 20)))
+    return head
+
+
+def _small_tuple(node: Optional[Node]) -> Optional[Tuple[int, ...]]:
+    if node is None or node.type != 'tuple' or node.count != len(node.items):
+        return None
+    vals = tuple(c.value for c in node.items)
+    return vals if all(isinstance(v, int) for v in vals) else None
+
+
+def _image_from_state(obj: Node, state: Node) -> bool:
+    """Tamaño de imagen de un PIL.Image ([info, mode, size, palette, data]) o de un numpy.ndarray (shape)."""
+    if obj.type.startswith('PIL.') and state.type == 'list' and len(state.items) >= 3:
+        size = _small_tuple(state.items[2])
+        if size and len(size) == 2:
+            obj.image = (size[0], size[1])
+    elif obj.type == 'numpy.ndarray' and state.type == 'tuple' and len(state.items) >= 2:
+        shape = _small_tuple(state.items[1])
+        if shape and (len(shape) == 2 or (len(shape) == 3 and shape[2] in (1, 3, 4))):
+            obj.image = (shape[1], shape[0])
+    return obj.image is not None
+
+
+class Inspector:
+    def __init__(self):
+        self.stack: List[Node] = []
+        self.memo: Dict[int, Node] = {}   # solo globals y escalares cortos: el resto de referencias es <ref>
+        self.root: Optional[Node] = None
+        self.protocol = 0
+        self.memo_count = 0   # MEMOIZE usa como índice el nº de entradas, aunque aquí no se guarden todas
+        self.leaf_bytes: Counter = Counter()
+        self.leaf_count: Counter = Counter()
+        self.image_sizes: Counter = Counter()
+
+    # --- utilidades de pila ---
+    def pop_mark(self) -> List[Node]:
+        items = []
+        while self.stack:
+            n = self.stack.pop()
+            if n is MARK:
+                break
+            items.append(n)
+        items.reverse()
+        return items
+
+    def push(self, node: Node):
+        self.stack.append(node)
+
+    @staticmethod
+    def merge_stats(container: Node, stats: Optional[Counter], shift: int):
+        if container.stats is None or not stats:
+            return
+        for (depth, type_, field), n in stats.items():
+            if depth + shift <= MAX_DEPTH:
+                container.stats[(depth + shift, type_, field)] += n
+
+    def attach(self, container: Node, children: List[Node]):
+        for child in children:
+            container.add(child)
+            if container.stats is not None:
+                container.stats[(1, child.type, 'n')] += 1
+                container.stats[(1, child.type, 'bytes')] += child.nbytes
+            self.merge_stats(container, child.stats, 1)
+            child.stats = None   # ya volcado en el padre (y un GET posterior no lo duplica)
+
+    def attach_pairs(self, container: Node, flat: List[Node]):
+        keys, values = flat[0::2], flat[1::2]
+        for k in keys:
+            if len(container.keys) < KEEP_KEYS:
+                container.keys.append(k.value if k.value is not None else f'<{k.type}>')
+            container.nbytes += k.nbytes
+        self.attach(container, values)
+
+    def leaf(self, type_: str, nbytes: int, value=None, head: bytes = b'') -> Node:
+        node = Node(type_, nbytes, value)
+        self.leaf_bytes[type_] += nbytes
+        self.leaf_count[type_] += 1
+        if head:
+            # Protocolos 0-2 guardan bytes como _codecs.encode(str, 'latin1'): se prueba también esa decodificación
+            img = encoded_image_size(head) or (encoded_image_size(head.decode('utf-8', 'ignore').encode('latin-1', 'ignore'))
+                                               if type_ == 'str' else None)
+            if img:
+                node.type = f'{type_} ({img[0]})'
+                node.image = (img[1], img[2])
+                self.count_image(node)
+        return node
+
+    def count_image(self, node: Node):
+        # Al crear el valor, no al engancharlo: las referencias compartidas (GET) no se cuentan dos veces
+        self.image_sizes[f'{node.image[0]}x{node.image[1]}'] += 1
+
+    # --- recorrido ---
+    def run(self, f: BinaryIO):
+        code2op = {op.code: op for op in pickletools.opcodes}
+        while True:
+            code = f.read(1)
+            if not code:
+                raise ValueError('fin de archivo inesperado (falta STOP)')
+            op = code2op.get(code.decode('latin-1'))
+            if op is None:
+                raise ValueError(f'opcode desconocido {code!r} en la posición {f.tell() - 1}')
+            name = op.name
+            if name in LENGTH_PREFIXED:
+                size, fmt, type_ = LENGTH_PREFIXED[name]
+                length = struct.unpack(fmt, f.read(size))[0]
+                head = read_payload(f, length)
+                value = None
+                if type_ == 'str' and length <= 200:
+                    value = head.decode('utf-8', 'replace')
+                    value = value if value.isprintable() else None
+                elif type_ == 'bytes' and length <= 64:
+                    value = head
+                self.push(self.leaf(type_, length, value, head if length > 64 else b''))
+                continue
+            arg = op.arg.reader(f) if op.arg is not None else None
+            if name == 'STOP':
+                # La raíz es el objeto que devolvería pickle.load, no el primer contenedor abierto
+                self.root = self.stack[-1] if self.stack else None
+                break
+            self.step(name, arg)
+
+    def step(self, name: str, arg):
+        st = self.stack
+        if name == 'PROTO':
+            self.protocol = arg
+        elif name in ('FRAME', 'READONLY_BUFFER'):
+            pass
+        elif name in SCALARS:
+            value = arg if name not in ('NEWTRUE', 'NEWFALSE') else name == 'NEWTRUE'
+            nbytes = len(arg) if isinstance(arg, (str, bytes)) else 8
+            self.push(self.leaf(SCALARS[name], nbytes, value if not isinstance(value, (str, bytes)) or len(value) <= 200 else None))
+        elif name == 'NEXT_BUFFER':
+            self.push(self.leaf('buffer', 0))
+        elif name == 'MARK':
+            st.append(MARK)
+        elif name == 'POP':
+            st.pop()
+        elif name == 'POP_MARK':
+            self.pop_mark()
+        elif name == 'DUP':
+            st.append(st[-1])
+        elif name in EMPTY:
+            self.push(Node(EMPTY[name], is_container=True))
+        elif name in FROM_MARK:
+            items = self.pop_mark()
+            node = Node(FROM_MARK[name], is_container=True)
+            if name == 'DICT':
+                self.push(node)
+                self.attach_pairs(node, items)
+            else:
+                self.push(node)
+                self.attach(node, items)
+        elif name in ('TUPLE1', 'TUPLE2', 'TUPLE3'):
+            n = int(name[-1])
+            items = st[-n:]
+            del st[-n:]
+            node = Node('tuple', is_container=True)
+            self.push(node)
+            self.attach(node, items)
+        elif name == 'APPEND':
+            value = st.pop()
+            self.attach(st[-1], [value])
+        elif name in ('APPENDS', 'ADDITEMS'):
+            items = self.pop_mark()
+            self.attach(st[-1], items)
+        elif name == 'SETITEM':
+            value, key = st.pop(), st.pop()
+            self.attach_pairs(st[-1], [key, value])
+        elif name == 'SETITEMS':
+            items = self.pop_mark()
+            self.attach_pairs(st[-1], items)
+        elif name == 'GLOBAL':
+            self.push(Node('global', value=arg.replace(' ', '.')))
+        elif name == 'STACK_GLOBAL':
+            qual, module = st.pop(), st.pop()
+            self.push(Node('global', value=f'{module.value}.{qual.value}'))
+        elif name in ('EXT1', 'EXT2', 'EXT4'):
+            self.push(Node('global', value=f'<ext {arg}>'))
+        elif name in ('REDUCE', 'NEWOBJ', 'NEWOBJ_EX', 'OBJ', 'INST'):
+            if name == 'REDUCE' or name == 'NEWOBJ':
+                args, cls = st.pop(), st.pop()
+            elif name == 'NEWOBJ_EX':
+                st.pop()
+                args, cls = st.pop(), st.pop()
+            elif name == 'OBJ':
+                items = self.pop_mark()
+                cls, args = items[0], Node('tuple')
+                for it in items[1:]:
+                    args.add(it)
+            else:
+                items = self.pop_mark()
+                cls, args = Node('global', value=arg.replace(' ', '.')), Node('tuple')
+                for it in items:
+                    args.add(it)
+            type_ = str(cls.value) if cls.type == 'global' else f'<{cls.type}>'
+            if type_ == '_codecs.encode' and args.items:
+                type_ = 'bytes'  # bytes en protocolo <= 2
+            if type_.endswith('._reconstruct') and args.items and args.items[0].value:
+                type_ = str(args.items[0].value)  # numpy: _reconstruct(ndarray, ...)
+            if type_ == 'copyreg._reconstructor' and args.items and args.items[0].value:
+                type_ = str(args.items[0].value)
+            type_ = type_.replace('numpy.core.multiarray.', 'numpy.').replace('numpy._core.multiarray.', 'numpy.')
+            if type_ == 'bytes':
+                data = args.items[0]
+                node = Node('bytes', nbytes=data.nbytes)
+                if data.image:
+                    node.type, node.image = data.type.replace('str', 'bytes', 1), data.image
+                if data.value is None and data.type.startswith('str'):
+                    # Contabilizar el payload como bytes, que es lo que es
+                    self.leaf_bytes['str'] -= data.nbytes
+                    self.leaf_count['str'] -= 1
+                    self.leaf_bytes['bytes'] += data.nbytes
+                    self.leaf_count['bytes'] += 1
+            else:
+                node = Node(type_, nbytes=args.nbytes, is_container=True)
+                node.items = args.items[:KEEP_ITEMS]
+                # Los argumentos del constructor cuentan como hijos del objeto
+                self.merge_stats(node, args.stats, 0)
+            self.push(node)
+        elif name == 'BUILD':
+            state = st.pop()
+            obj = st[-1]
+            obj.nbytes += state.nbytes
+            if _image_from_state(obj, state):
+                self.count_image(obj)
+            self.merge_stats(obj, state.stats, 0)
+            state.stats = None
+            if not obj.items:
+                obj.items = [state]
+        elif name in ('PERSID', 'BINPERSID'):
+            if name == 'BINPERSID':
+                st.pop()
+            self.push(Node('persid'))
+        elif name in ('PUT', 'BINPUT', 'LONG_BINPUT', 'MEMOIZE'):
+            idx = self.memo_count if name == 'MEMOIZE' else arg
+            top = st[-1]
+            if len(self.memo) < MAX_MEMO and (top.type == 'global' or (not top.is_container and top.value is not None)):
+                self.memo[idx] = top
+            self.memo_count = max(self.memo_count, idx + 1)
+        elif name in ('GET', 'BINGET', 'LONG_BINGET'):
+            self.push(self.memo.get(arg, Node('<ref>')))
+        else:
+            raise ValueError(f'opcode no soportado: {name}')
+
+
+def describe(node: Node, depth: int = 0) -> str:
+    """Vista previa de un nodo sin materializarlo."""
+    if node.image:
+        return f'{node.type} {node.image[0]}x{node.image[1]} ({fmt_bytes(node.nbytes)})'
+    if node.value is not None and not node.is_container and node.type != 'global':
+        return repr(node.value)
+    if node.is_container:
+        inner = ', '.join(describe(c, depth + 1) for c in node.items[:4]) if depth < 2 else '…'
+        more = ', …' if node.count > 4 and depth < 2 else ''
+        return f'{node.type}[{node.count}]({inner}{more})' if node.type in ('list', 'tuple', 'set', 'frozenset', 'dict') \
+            else f'{node.type}({fmt_bytes(node.nbytes)})'
+    return f'<{node.type} {fmt_bytes(node.nbytes)}>'
+
+
+def fmt_bytes(n: int) -> str:
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024 or unit == 'GB':
+            return f'{n:.0f} {unit}' if unit == 'B' else f'{n:.1f} {unit}'
+        n /= 1024.0
+    return f'{n} B'
+
+
+def samples(root: Node, n: int) -> List[str]:
+    """Vista previa de los primeros n hijos de la raíz (pares clave: valor en diccionarios)."""
+    items = root.items[:n]
+    if root.type == 'dict':
+        return [f'{k!r}: {describe(v)}' for k, v in zip(root.keys, items)]
+    return [describe(c) for c in items]
+
+
+def print_report(path: str, insp: Inspector, sample: int = 3):
+    root = insp.root
+    print(f'Archivo: {path} ({fmt_bytes(os.path.getsize(path))}), protocolo {insp.protocol}')
+    if root is None or not root.is_container:
+        print(f"Objeto raíz: {describe(root) if root else '(vacío)'}")
+        return
+    print(f'Tipo raíz: {root.type} con {root.count} elementos ({fmt_bytes(root.nbytes)} de payload)')
+    if root.keys:
+        print(f'Claves (muestra): {root.keys}')
+    print('Elementos por nivel y tipo:')
+    # Sin stats si la raíz es una referencia a un contenedor ya volcado en otro (GET)
+    stats = root.stats or Counter()
+    for (level, type_, field), n in sorted(stats.items()):
+        if field == 'n':
+            print(f'  nivel {level}: {n} x {type_}  ({fmt_bytes(stats[(level, type_, "bytes")])})')
+    print('Bytes por tipo (valores hoja):')
+    for type_, n in insp.leaf_bytes.most_common():
+        print(f'  {type_}: {fmt_bytes(n)} en {insp.leaf_count[type_]} valores')
+    if insp.image_sizes:
+        print('Tamaños de imagen (ancho x alto):')
+        for size, n in insp.image_sizes.most_common(MAX_SIZES):
+            print(f'  {size}: {n}')
+    preview = samples(root, sample)
+    if preview:
+        print(f'Muestra ({len(preview)}):')
+        for line in preview:
+            print(f'  {line}')
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Resume un pickle sin cargarlo (opcodes en streaming, memoria constante).')
+    ap.add_argument('path', help='Archivo .pickle')
+    ap.add_argument('--sample', type=int, default=3, help=f'Elementos a mostrar como vista previa (0 = ninguno, máx. {KEEP_ITEMS})')
+    args = ap.parse_args(argv)
+
+    insp = Inspector()
+    with open(args.path, 'rb') as f:
+        try:
+            insp.run(f)
+        except (ValueError, IndexError, struct.error) as e:
+            print(f'ERROR: pickle no válido o truncado: {e}', file=sys.stderr)
+            sys.exit(1)
+    print_report(args.path, insp, args.sample)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+landmark_augment.py
+
+Aumento de datos de landmarks de mano por lotes, dentro del tf.data del MLP (balanced_dataset en
+extract_landmarks_and_train.py), sin volver a pasar MediaPipe ni escribir nada en disco.
+
+Opera sobre arrays (N, 21, 2|3) ya normalizados por landmarks_to_features (origen en la muñeca,
+escala muñeca->dedo medio = 1), o sobre secuencias (N, T, 21, 2|3). Cada lote se transforma con una
+sola llamada NumPy vectorizada, con parámetros aleatorios por muestra (en secuencias, los mismos
+para todos sus frames):
+- rotación alrededor de la muñeca (grados),
+- cizalla horizontal,
+- espejo de lateralidad (x -> -x, mano izquierda <-> derecha),
+- jitter gaussiano por punto (salvo la muñeca, que es el origen),
+- frame dropout (solo secuencias): un frame perdido repite el último detectado, como el tracker.
+El resultado se vuelve a normalizar (muñeca->dedo medio = 1), como lo que produce la app: por eso no
+hay aumento de escala, que la normalización anula.
+
+En tf.data cada lote usa un generador derivado de (seed, índice del lote): el aumento es el mismo en
+dos entrenamientos con la misma semilla aunque el map corra en paralelo.
+
+Spec: 'default', 'none' o pares clave=valor sobre los valores por defecto, p.ej.
+'rotation=10,mirror=0'.
+
+Uso (muestras/s del aumento y del tf.data balanceado con y sin aumento):
+  python tools/landmark_augment.py --workdir tools/work --batch-size 64
+"""
+import argparse
+import time
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+DEFAULTS = {
+    'rotation': 15.0,       # grados, uniforme en [-r, r]
+    'shear': 0.10,          # x += k*y, k uniforme en [-k, k]
+    'mirror': 0.5,          # probabilidad de espejo
+    'jitter': 0.02,         # desviación del ruido por coordenada (unidades de la escala muñeca->medio)
+    'frame_dropout': 0.1,   # probabilidad de perder cada frame (secuencias)
+}
+NUM_LANDMARKS = 21
+WRIST, MIDDLE_MCP = 0, 9   # puntos de la normalización de landmarks_to_features
+
+
+def parse_augment(spec: Optional[str]) -> Optional[dict]:
+    """Spec de la línea de comandos -> parámetros (None = sin aumento)."""
+    if not spec or spec == 'none':
+        return None
+    cfg = dict(DEFAULTS)
+    if spec == 'default':
+        return cfg
+    for part in spec.split(','):
+        key, _, value = part.partition('=')
+        key = key.strip().replace('-', '_')
+        if key not in DEFAULTS or not value:
+            raise ValueError(f"aumento no válido: '{part}' (claves: {', '.join(DEFAULTS)})")
+        cfg[key] = float(value)
+    return cfg
+
+
+def augment_landmarks(points: np.ndarray, rng: np.random.Generator, *, rotation: float = DEFAULTS['rotation'],
+                      shear: float = DEFAULTS['shear'], mirror: float = DEFAULTS['mirror'],
+                      jitter: float = DEFAULTS['jitter'], frame_dropout: float = DEFAULTS['frame_dropout']) -> np.ndarray:
+    """Transforma un lote (N, 21, C) o (N, T, 21, C) con parámetros aleatorios por muestra."""
+    points = np.asarray(points, dtype=np.float32)
+    n = points.shape[0]
+    bshape = (n,) + (1,) * (points.ndim - 2)   # parámetros por muestra, difundidos sobre frames y puntos
+
+    theta = np.deg2rad(rng.uniform(-rotation, rotation, n)).reshape(bshape)
+    k = rng.uniform(-shear, shear, n).reshape(bshape)
+    f = np.where(rng.random(n) < mirror, -1.0, 1.0).reshape(bshape)
+    cos, sin = np.cos(theta), np.sin(theta)
+    # M = R(theta) @ [[1, k], [0, 1]] @ diag(f, 1), compuesta por muestra
+    m00, m01 = cos * f, cos * k - sin
+    m10, m11 = sin * f, sin * k + cos
+
+    x, y = points[..., 0], points[..., 1]
+    out = np.empty_like(points)
+    out[..., 0] = m00 * x + m01 * y
+    out[..., 1] = m10 * x + m11 * y
+    out[..., 2:] = points[..., 2:]
+    if jitter:
+        # La muñeca es el origen de la normalización: no se mueve
+        out[..., WRIST + 1:, :] += rng.normal(0.0, jitter, out[..., WRIST + 1:, :].shape).astype(np.float32)
+    # Cizalla y jitter cambian la distancia muñeca->dedo medio: se vuelve a 1 como en landmarks_to_features
+    norm = np.linalg.norm(out[..., MIDDLE_MCP, :] - out[..., WRIST, :], axis=-1)
+    out /= (norm + 1e-6)[..., None, None]
+
+    if points.ndim == 4 and frame_dropout:
+        t = points.shape[1]
+        keep = rng.random((n, t)) >= frame_dropout
+        keep[:, 0] = True
+        # Índice del último frame conservado hasta t (máximo acumulado), sin bucles por muestra
+        last = np.maximum.accumulate(np.where(keep, np.arange(t), 0), axis=1)
+        out = np.take_along_axis(out, last[:, :, None, None], axis=1)
+    return out
+
+
+def augment_features(X: np.ndarray, rng: np.random.Generator, **cfg) -> np.ndarray:
+    """Igual que augment_landmarks sobre features aplanados (N, 42|63) o (N, T, 42|63)."""
+    X = np.asarray(X, dtype=np.float32)
+    dims = X.shape[-1] // NUM_LANDMARKS
+    pts = X.reshape(X.shape[:-1] + (NUM_LANDMARKS, dims))
+    return augment_landmarks(pts, rng, **cfg).reshape(X.shape)
+
+
+def batch_rng(seed: int, index: int) -> np.random.Generator:
+    """Generador del lote `index`: no depende del orden en que los hilos de tf.data ejecuten el map."""
+    return np.random.default_rng([seed, index])
+
+
+def tf_augment_fn(cfg: dict, seed: int = 42):
+    """Función para Dataset.enumerate().map sobre lotes (índice, (x, y)): un tf.numpy_function por lote."""
+    import tensorflow as tf
+
+    def _np(index, x):
+        return augment_features(x, batch_rng(seed, int(index)), **cfg)
+
+    def _map(index, batch):
+        x, y = batch
+        out = tf.numpy_function(_np, [index, x], tf.float32, stateful=False)
+        out.set_shape(x.shape)
+        return out, y
+
+    return _map
+
+
+def bench_numpy(X: np.ndarray, cfg: dict, batch_size: int, seconds: float = 2.0) -> float:
+    """Muestras/s de augment_features sobre lotes de batch_size."""
+    rng = np.random.default_rng(0)
+    idx = rng.integers(0, len(X), batch_size)
+    batch = X[idx]
+    done = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        augment_features(batch, rng, **cfg)
+        done += batch_size
+    return done / (time.perf_counter() - t0)
+
+
+def bench_pipeline(X: np.ndarray, y: np.ndarray, cfg: Optional[dict], batch_size: int, batches: int = 300) -> float:
+    """Muestras/s del tf.data balanceado de entrenamiento (con o sin aumento), tras calentar."""
+    from extract_landmarks_and_train import balanced_dataset
+
+    ds = balanced_dataset(X, y, int(y.max()) + 1, batch_size, augment=cfg)
+    it = iter(ds)
+    for _ in range(20):
+        next(it)
+    t0 = time.perf_counter()
+    for _ in range(batches):
+        next(it)
+    return batches * batch_size / (time.perf_counter() - t0)
+
+
+def main(argv=None):
+    from deps import is_installed
+    from tflite_bench import print_table
+
+    ap = argparse.ArgumentParser(description='Mide el aumento de landmarks por lotes (muestras/s).')
+    ap.add_argument('--workdir', type=Path, default=Path('tools/work'), help='Usa X.npy/y.npy del workdir si existen')
+    ap.add_argument('--samples', type=int, default=20000, help='Muestras sintéticas si no hay dataset')
+    ap.add_argument('--batch-size', type=int, default=64, help='Tamaño de lote')
+    ap.add_argument('--augment', default='default', help="Spec del aumento ('default' o clave=valor,...)")
+    ap.add_argument('--seq-len', type=int, default=32, help='Frames por secuencia en la medición de secuencias')
+    args = ap.parse_args(argv)
+    # 'none' mide la transformación identidad (mismo coste de cómputo)
+    cfg = parse_augment(args.augment) or dict.fromkeys(DEFAULTS, 0.0)
+
+    x_path, y_path = args.workdir / 'X.npy', args.workdir / 'y.npy'
+    if x_path.exists() and y_path.exists():
+        X = np.load(x_path).astype(np.float32)
+        _, y = np.unique(np.load(y_path), return_inverse=True)
+        print(f'Dataset: {x_path} ({len(X)} muestras)')
+    else:
+        rng = np.random.default_rng(0)
+        X = rng.normal(0, 0.5, (args.samples, NUM_LANDMARKS * 2)).astype(np.float32)
+        y = rng.integers(0, 30, args.samples)
+        print(f'Sin dataset en {args.workdir}: {args.samples} muestras sintéticas')
+    y = y.astype(np.int32)
+
+    rows = [{'stage': f'numpy (N, 21, {X.shape[1] // NUM_LANDMARKS})', 'samples/s': round(bench_numpy(X, cfg, args.batch_size))}]
+    seq = np.repeat(X[:args.batch_size, None, :], args.seq_len, axis=1)
+    rows.append({'stage': f'numpy (N, {args.seq_len}, 21, {X.shape[1] // NUM_LANDMARKS})',
+                 'samples/s': round(bench_numpy(seq, cfg, args.batch_size))})
+    if is_installed('tensorflow'):
+        rows.append({'stage': 'tf.data balanceado', 'samples/s': round(bench_pipeline(X, y, None, args.batch_size))})
+        rows.append({'stage': 'tf.data balanceado + aumento', 'samples/s': round(bench_pipeline(X, y, cfg, args.batch_size))})
+    else:
+        print('AVISO: tensorflow no está instalado; solo se mide el aumento NumPy')
+    print_table(rows, ['stage', 'samples/s'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+mirror.py
+
+Espejo local de Cloud Storage + Firestore para trabajar sin red (desarrollo, CI y reentrenos que
+hoy vuelven a bajar los mismos bytes). El espejo es un backend local de backends.py:
+
+  python tools/mirror.py --service_account sa.json --storage_bucket b --dest tools/work/mirror
+  python tools/extract_landmarks_and_train.py --backend local:tools/work/mirror
+  python tools/signlearn_tools.py build --backend local:tools/work/mirror
+
+- Colecciones (--collections, por defecto videos,images,meta): se copian enteras al SQLite del
+  espejo (lo borrado en origen desaparece), con updatedAt en ISO 8601 para --since-last-sync.
+- Objetos (--prefixes, por defecto todo el bucket): se listan con tamaño y md5 (crc32c en objetos
+  compuestos) y solo se bajan los nuevos o cambiados, en paralelo con la concurrencia adaptativa de
+  adaptive_io. Cada archivo se descarga a <ruta>.part, se comprueba su checksum contra el del
+  bucket y se renombra; un checksum distinto se reintenta como un 5xx y, si persiste, es un error.
+- --delete borra del espejo los objetos que ya no están en origen.
+- --verify (sin red) recalcula el md5 de todo el espejo contra su índice y quita lo corrupto,
+  que el siguiente mirror vuelve a descargar.
+"""
+import argparse
+import base64
+import concurrent.futures
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import adaptive_io
+from backends import LocalMetadata, LocalStorage, ObjectInfo, is_local, md5_file, open_backend
+from deps import FIREBASE, is_installed, require
+
+
+class ChecksumMismatch(Exception):
+    code = 500   # AdaptiveLimiter lo reintenta como un error transitorio del servidor
+
+
+def remote_hash(obj: ObjectInfo) -> Optional[str]:
+    if obj.md5:
+        return f'md5:{obj.md5}'
+    return f'crc32c:{obj.crc32c}' if obj.crc32c else None
+
+
+def crc32c_file(path: Path) -> Optional[str]:
+    if not is_installed('google_crc32c'):
+        return None
+    import google_crc32c
+    h = google_crc32c.Checksum()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return base64.b64encode(h.digest()).decode('ascii')
+
+
+def download_verified(source, local: LocalStorage, obj: ObjectInfo) -> str:
+    """Descarga obj al espejo de forma atómica tras verificar tamaño y checksum; devuelve el md5 local."""
+    dest = local.object_path(obj.path)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + '.part')
+    try:
+        source.download(obj.path, tmp)
+        size = tmp.stat().st_size
+        if size != obj.size:
+            raise ChecksumMismatch(f'{obj.path}: {size} bytes, se esperaban {obj.size}')
+        md5 = md5_file(tmp)
+        if obj.md5 and md5 != obj.md5:
+            raise ChecksumMismatch(f'{obj.path}: md5 {md5} != {obj.md5}')
+        if not obj.md5 and obj.crc32c:
+            crc = crc32c_file(tmp)
+            if crc is not None and crc != obj.crc32c:
+                raise ChecksumMismatch(f'{obj.path}: crc32c {crc} != {obj.crc32c}')
+        os.replace(tmp, dest)
+        return md5
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def sync_collections(source_meta, local_meta: LocalMetadata, collections: List[str]) -> dict:
+    counts = {}
+    for collection in collections:
+        docs = list(source_meta.iter_docs(collection, page_size=500))
+        local_meta.replace_collection(collection, docs)
+        counts[collection] = len(docs)
+        print(f'Colección {collection}: {len(docs)} documentos')
+    return counts
+
+
+def sync_objects(source, local: LocalStorage, prefixes: List[str], limiter: adaptive_io.AdaptiveLimiter,
+                 threads: int, delete: bool) -> dict:
+    remote = {}
+    for prefix in prefixes:
+        for obj in source.list(prefix):
+            remote[obj.path] = obj
+    known = local.remote_hashes()
+    todo = [o for o in remote.values()
+            if known.get(o.path) != (o.size, remote_hash(o)) or not local.object_path(o.path).exists()]
+    total_bytes = sum(o.size for o in todo)
+    print(f'Objetos en origen: {len(remote)}; al día: {len(remote) - len(todo)}; '
+          f'por descargar: {len(todo)} ({total_bytes / 1e6:.1f} MB)')
+
+    errors = []
+    done = done_bytes = 0
+    t0 = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as ex:
+        futures = {ex.submit(limiter.call, download_verified, source, local, o, nbytes=o.size): o for o in todo}
+        for fut in concurrent.futures.as_completed(futures):
+            obj = futures[fut]
+            try:
+                md5 = fut.result()
+            except Exception as e:
+                errors.append(obj.path)
+                print(f'ERROR: {obj.path}: {e}', file=sys.stderr)
+                continue
+            # El índice se escribe desde este hilo: un archivo solo cuenta como espejado tras verificarlo
+            local.record(obj.path, obj.size, md5, remote_hash(obj))
+            done += 1
+            done_bytes += obj.size
+            if done % 25 == 0 or done == len(todo):
+                print(f'  [{done}/{len(todo)}] {done_bytes / 1e6:.1f}/{total_bytes / 1e6:.1f} MB  [{limiter.status()}]')
+    elapsed = time.perf_counter() - t0
+
+    deleted = 0
+    if delete:
+        for prefix in prefixes:
+            for obj in list(local.list(prefix)):
+                if obj.path not in remote:
+                    local.remove(obj.path)
+                    deleted += 1
+        print(f'Borrados del espejo (ya no están en origen): {deleted}')
+    return {'objects': len(remote), 'downloaded': done, 'downloadedBytes': done_bytes, 'deleted': deleted,
+            'errors': len(errors), 'seconds': round(elapsed, 2)}
+
+
+def verify_mirror(local: LocalStorage, threads: int) -> List[str]:
+    """Rutas del índice cuyo archivo falta o no coincide con el md5 registrado (se quitan del espejo)."""
+    objs = list(local.list(''))
+
+    def check(obj: ObjectInfo) -> Optional[str]:
+        p = local.object_path(obj.path)
+        if not p.exists() or p.stat().st_size != obj.size or md5_file(p) != obj.md5:
+            return obj.path
+        return None
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as ex:
+        bad = [p for p in ex.map(check, objs) if p]
+    print(f'Verificados {len(objs)} objetos: {len(bad)} con errores')
+    for p in bad[:20]:
+        print(f'  {p}')
+    for p in bad:
+        # Fuera del índice, el siguiente mirror lo vuelve a descargar
+        local.remove(p)
+    return bad
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Sincroniza bucket y colecciones a un espejo local (objetos + SQLite).')
+    ap.add_argument('--dest', type=Path, default=Path('tools/work/mirror'), help='Directorio del espejo (--backend local:<dest>)')
+    ap.add_argument('--source', default='gcs', help="Origen: gcs (con --service_account/--storage_bucket) u otro espejo local:<dir>")
+    ap.add_argument('--service_account', help='Ruta al JSON de service account')
+    ap.add_argument('--storage_bucket', help='Bucket de Storage')
+    ap.add_argument('--prefixes', default='', help='Prefijos a espejar separados por coma (vacío = todo el bucket)')
+    ap.add_argument('--collections', default='videos,images,meta', help='Colecciones a copiar (vacío = ninguna)')
+    ap.add_argument('--delete', action='store_true', help='Borra del espejo los objetos que ya no existen en origen')
+    ap.add_argument('--verify', action='store_true', help='Solo comprueba los checksums del espejo (sin red)')
+    ap.add_argument('--verify-threads', type=int, default=os.cpu_count() or 4, help='Hilos para recalcular checksums')
+    adaptive_io.add_arguments(ap)
+    args = ap.parse_args(argv)
+
+    local, local_meta = LocalStorage(args.dest), LocalMetadata(args.dest)
+    if args.verify:
+        sys.exit(1 if verify_mirror(local, args.verify_threads) else 0)
+
+    if is_local(args.source):
+        if Path(args.source[len('local:'):]).resolve() == args.dest.resolve():
+            ap.error('--source y --dest son el mismo directorio')
+    elif not (args.service_account and args.storage_bucket):
+        ap.error('--service_account y --storage_bucket son obligatorios con --source gcs')
+    else:
+        require(FIREBASE)
+
+    def gcs_clients():
+        from extract_landmarks_and_train import init_firebase
+        return init_firebase(args.service_account, args.storage_bucket)[1:]
+
+    try:
+        source, source_meta = open_backend(args.source, gcs_clients)
+    except ValueError as e:
+        ap.error(str(e))
+
+    collections = [c.strip() for c in args.collections.split(',') if c.strip()]
+    prefixes = [p.strip() for p in args.prefixes.split(',') if p.strip()] or ['']
+    counts = sync_collections(source_meta, local_meta, collections)
+    stats = sync_objects(source, local, prefixes, adaptive_io.storage_limiter(args), args.max_inflight, args.delete)
+    mb_s = stats['downloadedBytes'] / 1e6 / stats['seconds'] if stats['seconds'] else 0.0
+    print(f"Espejo en {args.dest}: {stats['downloaded']} descargados ({stats['downloadedBytes'] / 1e6:.1f} MB, "
+          f"{mb_s:.1f} MB/s), {stats['errors']} errores")
+    (args.dest / 'mirror.json').write_text(json.dumps({
+        'source': args.source if is_local(args.source) else f'gs://{args.storage_bucket}',
+        'syncedAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'prefixes': prefixes,
+        'collections': counts,
+        **stats,
+    }, indent=2), encoding='utf-8')
+    if stats['errors']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
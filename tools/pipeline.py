@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+pipeline.py
+
+Motor mínimo de construcción incremental para las herramientas de tools/.
+
+Cada nodo declara sus dependencias, sus parámetros y una huella barata de sus entradas
+externas (p.ej. el listado del catálogo). La clave de un nodo es el SHA-256 de
+(nombre, parámetros, huella, hash de contenido de las salidas de sus dependencias) y su
+salida vive en <cache>/<nodo>/<clave>/. Un nodo solo se ejecuta si esa carpeta no existe
+todavía; si una dependencia se reejecuta pero produce exactamente el mismo contenido, los
+nodos posteriores siguen en caché. Los nodos cuyas dependencias ya terminaron se ejecutan
+en paralelo.
+"""
+import concurrent.futures
+import hashlib
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+DONE_FILE = '.done.json'
+
+
+@dataclass
+class Node:
+    name: str
+    run: Callable[[Path, Dict[str, Path]], None]
+    deps: List[str] = field(default_factory=list)
+    params: dict = field(default_factory=dict)
+    fingerprint: Optional[Callable[[], object]] = None
+
+
+def hash_dir(path: Path) -> str:
+    """Hash del contenido de una carpeta de salida (rutas relativas + bytes), sin el marcador."""
+    h = hashlib.sha256()
+    for p in sorted(path.rglob('*')):
+        if not p.is_file() or p.name == DONE_FILE:
+            continue
+        h.update(p.relative_to(path).as_posix().encode('utf-8') + b'\0')
+        with open(p, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    return h.hexdigest()
+
+
+def topo_order(nodes: Dict[str, Node], targets: Optional[Iterable[str]] = None) -> List[str]:
+    wanted: Set[str] = set()
+    stack = list(targets or nodes.keys())
+    while stack:
+        n = stack.pop()
+        if n not in nodes:
+            raise KeyError(f'Nodo desconocido: {n}')
+        if n not in wanted:
+            wanted.add(n)
+            stack.extend(nodes[n].deps)
+    order: List[str] = []
+    state: Dict[str, int] = {}
+
+    def visit(n: str):
+        if state.get(n) == 2:
+            return
+        if state.get(n) == 1:
+            raise ValueError(f'Ciclo en el grafo en {n}')
+        state[n] = 1
+        for d in nodes[n].deps:
+            visit(d)
+        state[n] = 2
+        order.append(n)
+
+    for n in sorted(wanted):
+        visit(n)
+    return order
+
+
+def node_key(node: Node, dep_hashes: Dict[str, str]) -> str:
+    payload = {
+        'name': node.name,
+        'params': node.params,
+        'fingerprint': node.fingerprint() if node.fingerprint else None,
+        'deps': dep_hashes,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+
+def _read_done(out_dir: Path) -> Optional[dict]:
+    marker = out_dir / DONE_FILE
+    if not marker.exists():
+        return None
+    return json.loads(marker.read_text(encoding='utf-8'))
+
+
+def run_graph(nodes: List[Node], cache_dir: Path, targets: Optional[Iterable[str]] = None, *,
+              jobs: int = 2, force: Iterable[str] = (), dry_run: bool = False) -> Dict[str, Path]:
+    """Ejecuta los nodos obsoletos necesarios para `targets`. Devuelve {nodo: carpeta de salida}."""
+    by_name = {n.name: n for n in nodes}
+    order = topo_order(by_name, targets)
+    force = set(force)
+    outputs: Dict[str, Path] = {}
+    content: Dict[str, str] = {}
+    pending = list(order)
+    running: Dict[concurrent.futures.Future, str] = {}
+
+    def prepare(name: str):
+        node = by_name[name]
+        key = node_key(node, {d: content[d] for d in node.deps})
+        out_dir = cache_dir / name / key
+        done = _read_done(out_dir)
+        if done is not None and name not in force:
+            print(f'[cache] {name} ({key})')
+            return out_dir, done['hash']
+        return out_dir, None
+
+    def execute(name: str, out_dir: Path) -> str:
+        node = by_name[name]
+        tmp = out_dir.with_name(out_dir.name + f'.tmp-{os.getpid()}')
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        t0 = time.time()
+        node.run(tmp, {d: outputs[d] for d in node.deps})
+        digest = hash_dir(tmp)
+        (tmp / DONE_FILE).write_text(json.dumps({'hash': digest, 'seconds': round(time.time() - t0, 2)}), encoding='utf-8')
+        shutil.rmtree(out_dir, ignore_errors=True)
+        tmp.rename(out_dir)
+        print(f'[hecho] {name} en {time.time() - t0:.1f}s ({out_dir})')
+        return digest
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, jobs)) as ex:
+        while pending or running:
+            launched = False
+            for name in list(pending):
+                if any(d not in content for d in by_name[name].deps):
+                    continue
+                pending.remove(name)
+                out_dir, cached = prepare(name)
+                outputs[name] = out_dir
+                if cached is not None:
+                    content[name] = cached
+                    launched = True
+                elif dry_run:
+                    print(f'[obsoleto] {name} ({out_dir.name}); los nodos que dependen de él no se evalúan')
+                else:
+                    print(f'[ejecutando] {name} ({out_dir.name})')
+                    running[ex.submit(execute, name, out_dir)] = name
+                    launched = True
+            if not running:
+                if launched:
+                    continue
+                break
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                content[name] = fut.result()
+    return outputs
@@ -8,16 +8,17 @@ import shutil
 import subprocess
 import sys
 import tempfile
+import threading
 from pathlib import Path
+from types import SimpleNamespace
 
-try:
-    from google.cloud import storage
-    from google.cloud import firestore
-    import firebase_admin
-    from firebase_admin import credentials
-except ImportError:
-    print("Missing packages. Run: pip install -r tools/requirements.txt", file=sys.stderr)
-    sys.exit(1)
+import adaptive_io
+import backends
+from backends import is_local, open_backend
+from catalog_snapshot import read_manifest, upload_snapshot, write_snapshot
+from deps import require, FIREBASE, IMAGES
+
+PREVIEW_CONTENT_TYPES = {'jpg': 'image/jpeg', 'webp': 'image/webp'}
 
 
 def slugify(text: str) -> str:
@@ -44,6 +45,11 @@ def build_title(file_name: str) -> str:
 
 
 def ensure_gcloud_clients(project_id: str, bucket_name: str | None):
+    from google.cloud import storage
+    from google.cloud import firestore
+    import firebase_admin
+    from firebase_admin import credentials
+
     # Initialize firebase_admin for Firestore
     if not firebase_admin._apps:
         cred_path = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')
@@ -68,66 +74,126 @@ def ensure_gcloud_clients(project_id: str, bucket_name: str | None):
     return fs, bucket
 
 
-def transcode_ffmpeg(src: Path, out_dir: Path, *, crf: int = 23, scale: str = '1280:-2', audio_bitrate: str = '128k') -> Path:
+def still_quality_args(path: Path) -> list:
+    """Calidad del póster/sprite según el codificador: -q:v es una escala 2-31 en mjpeg pero 0-100 en libwebp."""
+    if path.suffix.lower() == '.webp':
+        return ['-c:v', 'libwebp', '-quality', '80']
+    return ['-c:v', 'mjpeg', '-q:v', '3']
+
+
+def transcode_ffmpeg(src: Path, out_dir: Path, *, crf: int = 23, scale: str = '1280:-2', audio_bitrate: str = '128k',
+                     poster: Path | None = None, sprite: Path | None = None, poster_width: int = 480,
+                     sprite_fps: float = 2.0, sprite_tile: str = '4x2', sprite_width: int = 120) -> Path:
     out = out_dir / (src.stem + '.mp4')
-    cmd = [
-        'ffmpeg', '-y', '-i', str(src),
-        '-vf', f'scale={scale}',
-        '-c:v', 'libx264', '-preset', 'medium', '-crf', str(crf), '-pix_fmt', 'yuv420p',
-        '-c:a', 'aac', '-b:a', audio_bitrate,
-        str(out)
-    ]
+    if poster is None and sprite is None:
+        cmd = [
+            'ffmpeg', '-y', '-i', str(src),
+            '-vf', f'scale={scale}',
+            '-c:v', 'libx264', '-preset', 'medium', '-crf', str(crf), '-pix_fmt', 'yuv420p',
+            '-c:a', 'aac', '-b:a', audio_bitrate,
+            str(out)
+        ]
+    else:
+        # Una sola decodificación: split del video hacia el MP4, el póster y el sprite
+        outputs = ['[vout]'] + (['[poster]'] if poster else []) + (['[sprite]'] if sprite else [])
+        graph = [f"[0:v]split={len(outputs)}{''.join(f'[in{i}]' for i in range(len(outputs)))}", f'[in0]scale={scale}[vout]']
+        i = 1
+        if poster:
+            # thumbnail elige el frame más representativo de los primeros ~2 s (evita frames negros/transición)
+            graph.append(f'[in{i}]thumbnail=n=50,scale={poster_width}:-2[poster]')
+            i += 1
+        if sprite:
+            graph.append(f'[in{i}]fps={sprite_fps},scale={sprite_width}:-2,tile={sprite_tile}[sprite]')
+        cmd = [
+            'ffmpeg', '-y', '-i', str(src), '-filter_complex', ';'.join(graph),
+            '-map', '[vout]', '-map', '0:a?',
+            '-c:v', 'libx264', '-preset', 'medium', '-crf', str(crf), '-pix_fmt', 'yuv420p',
+            '-c:a', 'aac', '-b:a', audio_bitrate,
+            str(out),
+        ]
+        for label, path in (('[poster]', poster), ('[sprite]', sprite)):
+            if path:
+                cmd += ['-map', label, '-frames:v', '1', *still_quality_args(path), str(path)]
     subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
     return out
 
 
-def upload_object(bucket, local_path: Path, remote_path: str, public: bool = False) -> str:
-    blob = bucket.blob(remote_path)
-    blob.upload_from_filename(str(local_path))
-    if public:
-        blob.make_public()
-        return blob.public_url
-    return f"gs://{bucket.name}/{remote_path}"
+def upload_object(storage, local_path: Path, remote_path: str, public: bool = False, content_type: str | None = None) -> str:
+    """Sube un archivo al backend de objetos (backends.py: Cloud Storage o directorio local)."""
+    return storage.upload_file(local_path, remote_path, content_type=content_type, public=public)
 
 
-def create_firestore_video(fs, *, doc_id: str, title: str, description: str, storage_path: str, category: str, level: str):
-    fs.collection('videos').document(doc_id).set({
+def create_firestore_video(meta, *, doc_id: str, title: str, description: str, storage_path: str, category: str, level: str,
+                           previews: dict | None = None):
+    # meta.set_doc añade updatedAt (lecturas incrementales de extract_landmarks_and_train.py --since-last-sync)
+    meta.set_doc('videos', doc_id, {
         'id': doc_id,
         'title': title,
         'description': description,
         'storagePath': storage_path,
         'category': category,
         'level': level,
+        # posterPath / sprite {storagePath, columns, rows, intervalSec} para listas sin descargar el MP4
+        **(previews or {}),
     })
 
 
-def create_firestore_image(fs, *, doc_id: str, title: str, description: str, storage_path: str, category: str, level: str):
-    fs.collection('images').document(doc_id).set({
+def create_firestore_image(meta, *, doc_id: str, title: str, description: str, storage_path: str, category: str, level: str,
+                           variants: list | None = None):
+    doc = {
         'id': doc_id,
         'title': title,
         'description': description,
         'storagePath': storage_path,
         'category': category,
         'level': level,
-        'type': 'image'
-    })
+        'type': 'image',
+    }
+    if variants is not None:
+        # [{width, height, format, storagePath, sizeBytes}] para que la app pida el ancho que necesita
+        doc['variants'] = variants
+    meta.set_doc('images', doc_id, doc)
 
 
-def process_one(fs, bucket, src_file: Path, category: str, level: str, dest_prefix: str, tmpdir: Path, args) -> dict:
+def process_one(meta, storage, src_file: Path, category: str, level: str, dest_prefix: str, tmpdir: Path, args, limits) -> dict:
     title = build_title(src_file.name)
     slug = slugify(title)
-    out = transcode_ffmpeg(src_file, tmpdir, crf=args.crf, scale=args.scale, audio_bitrate=args.audio_bitrate)
+    ext = args.poster_format
+    poster = None if args.no_previews else tmpdir / f'{src_file.stem}-poster.{ext}'
+    sprite = None if args.no_previews else tmpdir / f'{src_file.stem}-sprite.{ext}'
+    # ffmpeg limitado a --workers; las subidas las regula limits.storage (más hilos que transcodificadores)
+    with limits.transcode_slots:
+        out = transcode_ffmpeg(src_file, tmpdir, crf=args.crf, scale=args.scale, audio_bitrate=args.audio_bitrate,
+                               poster=poster, sprite=sprite, poster_width=args.poster_width, sprite_fps=args.sprite_fps,
+                               sprite_tile=args.sprite_tile, sprite_width=args.sprite_width)
     storage_path = f"{dest_prefix}/{category}/{slug}.mp4"
-    url = upload_object(bucket, out, storage_path, public=args.public)
+    url = limits.storage.call(upload_object, storage, out, storage_path, public=args.public, nbytes=out.stat().st_size)
+    previews = {}
+    if poster and poster.exists():
+        previews['posterPath'] = f"{dest_prefix}/{category}/{slug}-poster.{ext}"
+        limits.storage.call(upload_object, storage, poster, previews['posterPath'], public=args.public,
+                        content_type=PREVIEW_CONTENT_TYPES[ext], nbytes=poster.stat().st_size)
+    if sprite and sprite.exists():
+        columns, rows = (int(v) for v in args.sprite_tile.split('x'))
+        previews['sprite'] = {
+            'storagePath': f"{dest_prefix}/{category}/{slug}-sprite.{ext}",
+            'columns': columns,
+            'rows': rows,
+            'intervalSec': round(1.0 / args.sprite_fps, 3),
+        }
+        limits.storage.call(upload_object, storage, sprite, previews['sprite']['storagePath'], public=args.public,
+                        content_type=PREVIEW_CONTENT_TYPES[ext], nbytes=sprite.stat().st_size)
     if not args.dry_run:
-        create_firestore_video(
-            fs,
+        limits.firestore.call(
+            create_firestore_video,
+            meta,
             doc_id=slug,
             title=title,
             description=f"Seña: {title}",
             storage_path=storage_path,
             category=category,
             level=level,
+            previews=previews,
         )
     return {
         'id': slug,
@@ -136,6 +202,8 @@ def process_one(fs, bucket, src_file: Path, category: str, level: str, dest_pref
         'category': category,
         'level': level,
         'url': url,
+        'sizeBytes': out.stat().st_size,
+        **previews,
     }
 
 
@@ -160,10 +228,10 @@ def iter_image_files(root: Path):
                 yield category, f
 
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser(description='Transcodifica/sube videos y sube imágenes LSM a Firebase Storage y Firestore.')
     parser.add_argument('--base-path', type=Path, required=True, help='Carpeta raíz con subcarpetas LSM_*_Web')
-    parser.add_argument('--project-id', required=True, help='ID de proyecto Firebase')
+    parser.add_argument('--project-id', help='ID de proyecto Firebase (obligatorio con --backend gcs)')
     parser.add_argument('--bucket', help='Nombre del bucket (por defecto <project-id>.appspot.com)')
     parser.add_argument('--dest-prefix', default='videos', help='Prefijo remoto en Storage (default: videos)')
     parser.add_argument('--images-dest-prefix', default='images', help='Prefijo remoto de imágenes en Storage (default: images)')
@@ -175,12 +243,37 @@ def main():
     parser.add_argument('--crf', type=int, default=23, help='Calidad H.264 CRF (menor = más calidad)')
     parser.add_argument('--scale', default='1280:-2', help='Escala de video ffmpeg, p.ej. 1280:-2 (720p) o 960:-2 (540p)')
     parser.add_argument('--audio-bitrate', default='128k', help='Bitrate de audio AAC')
-    parser.add_argument('--workers', type=int, default=max(1, os.cpu_count() or 1), help='Paralelismo de transcodificación/subida')
+    parser.add_argument('--no-previews', action='store_true', help='No generar póster ni sprite de miniaturas de los videos')
+    parser.add_argument('--poster-format', choices=['jpg', 'webp'], default='jpg', help='Formato del póster y del sprite (webp requiere ffmpeg con libwebp)')
+    parser.add_argument('--poster-width', type=int, default=480, help='Ancho del póster en píxeles')
+    parser.add_argument('--sprite-fps', type=float, default=2.0, help='Frames por segundo muestreados para el sprite')
+    parser.add_argument('--sprite-tile', default='4x2', help='Rejilla del sprite COLUMNASxFILAS')
+    parser.add_argument('--sprite-width', type=int, default=120, help='Ancho de cada miniatura del sprite')
+    parser.add_argument('--workers', type=int, default=max(1, os.cpu_count() or 1), help='Paralelismo de transcodificación (ffmpeg) y de variantes')
     parser.add_argument('--manifest', type=Path, default=Path('tools/videos_manifest.jsonl'), help='Ruta del manifest generado')
     parser.add_argument('--images-manifest', type=Path, default=Path('tools/images_manifest.jsonl'), help='Ruta del manifest de imágenes generado')
-    args = parser.parse_args()
+    parser.add_argument('--snapshot', type=Path, default=Path('tools/work/catalog_snapshot.json.gz'), help='Ruta local del snapshot comprimido del catálogo')
+    parser.add_argument('--dedupe', choices=['report', 'skip'], default='report', help='Colisiones de slug y casi-idénticos de la misma categoría (con --perceptual-dedupe): solo informar o omitirlos (se conserva el primero)')
+    parser.add_argument('--perceptual-dedupe', action='store_true', help='Detecta casi-duplicados con pHash (videos, requiere ffmpeg) y dHash (imágenes)')
+    parser.add_argument('--dedupe-cache', type=Path, default=Path('tools/work/cache/phash.json'), help='Caché de hashes perceptuales')
+    parser.add_argument('--image-widths', default='160,320,640', help='Anchos de las variantes de imagen (sin ampliar)')
+    parser.add_argument('--image-formats', default='webp,avif', help='Formatos de las variantes (AVIF solo si Pillow lo soporta)')
+    parser.add_argument('--image-quality', type=int, default=80, help='Calidad WebP/AVIF de las variantes')
+    parser.add_argument('--no-image-variants', action='store_true', help='Subir solo los originales de las imágenes')
+    parser.add_argument('--no-snapshot', action='store_true', help='No generar ni subir el snapshot del catálogo')
+    adaptive_io.add_arguments(parser)
+    backends.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if not is_local(args.backend) and not args.project_id:
+        parser.error('--project-id es obligatorio con --backend gcs')
+    require([] if is_local(args.backend) else FIREBASE, IMAGES if args.include_images and not args.no_image_variants else [])
 
-    fs, bucket = ensure_gcloud_clients(args.project_id, args.bucket)
+    try:
+        storage, meta = open_backend(args.backend, lambda: ensure_gcloud_clients(args.project_id, args.bucket))
+    except ValueError as e:
+        parser.error(str(e))
+    limits = SimpleNamespace(storage=adaptive_io.storage_limiter(args), firestore=adaptive_io.firestore_limiter(args),
+                             transcode_slots=threading.BoundedSemaphore(args.workers))
 
     base = args.base_path
     if not base.exists():
@@ -196,10 +289,10 @@ def main():
             title = build_title(f.name)
             slug = slugify(title)
             storage_path = f"{args.dest_prefix}/{category}/{slug}.mp4"
-            blob = bucket.blob(storage_path)
-            if blob.exists(storage.Client(project=args.project_id)):
-                create_firestore_video(
-                    fs,
+            if storage.exists(storage_path):
+                limits.firestore.call(
+                    create_firestore_video,
+                    meta,
                     doc_id=slug,
                     title=title,
                     description=f"Seña: {title}",
@@ -221,10 +314,10 @@ def main():
                 slug = slugify(title)
                 ext = f.suffix.lower().lstrip('.')
                 storage_path = f"{args.images_dest_prefix}/{category}/{slug}.{ext}"
-                blob = bucket.blob(storage_path)
-                if blob.exists(storage.Client(project=args.project_id)):
-                    create_firestore_image(
-                        fs,
+                if storage.exists(storage_path):
+                    limits.firestore.call(
+                        create_firestore_image,
+                        meta,
                         doc_id=slug,
                         title=title,
                         description=f"Imagen: {title}",
@@ -245,16 +338,29 @@ def main():
         records = []
         img_records = []
         items = list(iter_video_files(base))
+        img_items = list(iter_image_files(base)) if args.include_images else []
         print(f"Encontrados {len(items)} archivos de video…")
 
+        # Antes de cualquier ffmpeg/subida: colisiones de slug y (opcional) casi-duplicados perceptuales
+        from dedupe import analyze, paths_to_skip, print_report
+        report = analyze(items, img_items, lambda f: slugify(build_title(f.name)), perceptual=args.perceptual_dedupe,
+                         cache_path=args.dedupe_cache, workers=args.workers)
+        print_report(report)
+        if args.dedupe == 'skip':
+            skip = paths_to_skip(report)
+            items = [it for it in items if str(it[1]) not in skip]
+            img_items = [it for it in img_items if str(it[1]) not in skip]
+            print(f"Omitidos por dedupe: {len(skip)} archivos")
+
         def worker(item):
             category, f = item
-            return process_one(fs, bucket, f, category, args.level, args.dest_prefix, tmpdir, args)
+            return process_one(meta, storage, f, category, args.level, args.dest_prefix, tmpdir, args, limits)
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as ex:
+        # --workers hilos transcodifican y hasta --max-inflight más pueden estar subiendo a la vez
+        with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers + args.max_inflight) as ex:
             for rec in ex.map(worker, items):
                 records.append(rec)
-                print(f"Subido: {rec['title']} -> {rec['storagePath']}")
+                print(f"Subido: {rec['title']} -> {rec['storagePath']}  [{limits.storage.status()}]")
 
         args.manifest.parent.mkdir(parents=True, exist_ok=True)
         with args.manifest.open('w', encoding='utf-8') as w:
@@ -264,25 +370,58 @@ def main():
 
         # Procesar imágenes si procede (sin transcodificación; subida directa)
         if args.include_images:
-            img_items = list(iter_image_files(base))
             print(f"Encontrados {len(img_items)} archivos de imagen…")
+            from image_variants import CONTENT_TYPES, generate_all, parse_widths, source_key, supported_formats, variant_stem
+
+            widths = [] if args.no_image_variants else parse_widths(args.image_widths)
+            formats = supported_formats([f.strip() for f in args.image_formats.split(',') if f.strip()]) if widths else []
+            if widths and len(formats) < len(args.image_formats.split(',')):
+                print(f"AVISO: Pillow no soporta todos los formatos pedidos; se generan: {', '.join(formats) or 'ninguno'}")
+
+            # Detección de cambios: mismo contenido + misma configuración de variantes que en el manifest anterior
+            previous = {r['id']: r for r in read_manifest(args.images_manifest)}
+            pending = []
+            for category, f in img_items:
+                slug = slugify(build_title(f.name))
+                key = source_key(f, widths, formats, args.image_quality)
+                prev = previous.get(slug)
+                storage_path = f"{args.images_dest_prefix}/{category}/{slug}.{f.suffix.lower().lstrip('.')}"
+                if prev and prev.get('sourceKey') == key and prev.get('storagePath') == storage_path and prev.get('level') == args.level:
+                    img_records.append(prev)
+                else:
+                    pending.append((category, f, slug, key))
+            print(f"Imágenes sin cambios: {len(img_records)}, por procesar: {len(pending)}")
+
+            # Variantes por original: <slug>-<ext>, para que foto.jpg y foto.png no compartan rutas
+            jobs = [(f, variant_stem(f'{category}/{slug}', f)) for category, f, slug, _ in pending]
+            variants_by_src = generate_all(jobs, tmpdir / 'variants', widths, formats, args.image_quality, args.workers) if formats else {}
 
             def img_worker(item):
-                category, f = item
+                category, f, slug, key = item
                 title = build_title(f.name)
-                slug = slugify(title)
                 ext = f.suffix.lower().lstrip('.')
                 storage_path = f"{args.images_dest_prefix}/{category}/{slug}.{ext}"
-                url = upload_object(bucket, f, storage_path, public=args.public)
+                # Sin variantes cuando se pidieron = falló su generación: sin sourceKey se reintenta en la próxima ejecución
+                complete = not formats or str(f) in variants_by_src
+                url = limits.storage.call(upload_object, storage, f, storage_path, public=args.public, nbytes=f.stat().st_size)
+                variants = []
+                for v in variants_by_src.get(str(f), []):
+                    v_path = f"{args.images_dest_prefix}/{category}/{Path(v['path']).name}"
+                    limits.storage.call(upload_object, storage, Path(v['path']), v_path, public=args.public,
+                                        content_type=CONTENT_TYPES[v['format']], nbytes=v['sizeBytes'])
+                    variants.append({'width': v['width'], 'height': v['height'], 'format': v['format'],
+                                     'storagePath': v_path, 'sizeBytes': v['sizeBytes']})
                 if not args.dry_run:
-                    create_firestore_image(
-                        fs,
+                    limits.firestore.call(
+                        create_firestore_image,
+                        meta,
                         doc_id=slug,
                         title=title,
                         description=f"Imagen: {title}",
                         storage_path=storage_path,
                         category=category,
                         level=args.level,
+                        variants=variants,
                     )
                 return {
                     'id': slug,
@@ -291,19 +430,32 @@ def main():
                     'category': category,
                     'level': args.level,
                     'url': url,
-                    'type': 'image'
+                    'type': 'image',
+                    'sizeBytes': f.stat().st_size,
+                    'variants': variants,
+                    'sourceKey': key if complete else None,
                 }
 
-            with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as ex:
-                for rec in ex.map(img_worker, img_items):
+            with concurrent.futures.ThreadPoolExecutor(max_workers=args.max_inflight) as ex:
+                for rec in ex.map(img_worker, pending):
                     img_records.append(rec)
-                    print(f"Subida imagen: {rec['title']} -> {rec['storagePath']}")
+                    saved = rec['sizeBytes'] - min([v['sizeBytes'] for v in rec['variants']] or [rec['sizeBytes']])
+                    print(f"Subida imagen: {rec['title']} -> {rec['storagePath']} (+{len(rec['variants'])} variantes, "
+                          f"la más ligera ahorra {saved} bytes)  [{limits.storage.status()}]")
 
             args.images_manifest.parent.mkdir(parents=True, exist_ok=True)
             with args.images_manifest.open('w', encoding='utf-8') as w:
                 for r in img_records:
                     w.write(json.dumps(r, ensure_ascii=False) + '\n')
             print(f"Manifest de imágenes escrito en {args.images_manifest}")
+
+        print(f"Tráfico: {limits.storage.status()}; {limits.firestore.status()}")
+
+        if not args.no_snapshot:
+            # Snapshot único del catálogo a partir de ambos manifests (el de imágenes puede ser de una ejecución previa)
+            out, version, changed = write_snapshot(read_manifest(args.manifest), read_manifest(args.images_manifest), args.snapshot)
+            print(f"Snapshot del catálogo {'actualizado' if changed else 'sin cambios'}: {out} (versión {version})")
+            upload_snapshot(storage, meta, out, write_pointer=not args.dry_run)
     finally:
         shutil.rmtree(tmpdir, ignore_errors=True)
 
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+replay_bench.py
+
+Reproduce en escritorio el camino de GestureClassifier.classify(FloatArray) sobre el corpus local de
+videos: decodificación (video_decode) -> MediaPipe Hands -> landmarks_to_features -> intérprete
+TFLite (por lotes) -> argmax. La etiqueta esperada de cada clip es su slug, igual que en
+prepare_and_upload_videos.py / extract_landmarks_and_train.py.
+
+Informa:
+- latencia por etapa (p50/p90/p99 en ms por frame; la inferencia también por lote) y frames/s,
+- precisión top-1 por seña a nivel de frame y de clip (voto mayoritario),
+- matriz de confusión (solo celdas no nulas) y las confusiones más frecuentes.
+Los clips que ffmpeg no puede decodificar se omiten y se cuentan en clipsUndecodable.
+
+El informe completo va a <workdir>/reports/replay-<hash>.json, un resumen a reports/replay.jsonl y
+el veredicto a <workdir>/models/<hash>/replay.json. Con --min-accuracy / --min-fps el script sale
+con código 1 si el modelo no pasa; upload_artifacts.py --require-replay se niega a subir un modelo
+sin veredicto favorable.
+
+Uso:
+  python tools/replay_bench.py --media-dir /ruta/LSM --model 3f2a9c --min-accuracy 0.6 --min-fps 15
+
+Dependencias: mediapipe, tensorflow, numpy (+ ffmpeg u opencv para decodificar)
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from artifacts import LABELS_FILE, MODEL_FILE, resolve_model_dir
+from deps import require
+from video_decode import BACKENDS, DEFAULT_WIDTH, iter_frames
+
+REPLAY_FILE = 'replay.json'
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {'p50': None, 'p90': None, 'p99': None, 'n': 0}
+    arr = np.asarray(values)
+    return {'p50': round(float(np.percentile(arr, 50)), 3), 'p90': round(float(np.percentile(arr, 90)), 3),
+            'p99': round(float(np.percentile(arr, 99)), 3), 'n': int(arr.size)}
+
+
+class BatchedClassifier:
+    """Intérprete TFLite con lote fijo (el último se rellena) para no reasignar tensores por clip."""
+
+    def __init__(self, model_content: bytes, batch_size: int):
+        from tflite_bench import make_interpreter
+        self.interp = make_interpreter(model_content)
+        self.inp = self.interp.get_input_details()[0]
+        self.num_features = int(self.inp['shape'][-1])
+        self.batch_size = batch_size
+        self.interp.resize_tensor_input(self.inp['index'], [batch_size, self.num_features])
+        self.interp.allocate_tensors()
+        self.out_index = self.interp.get_output_details()[0]['index']
+        self.batch = np.zeros((batch_size, self.num_features), dtype=np.float32)
+
+    def predict(self, X: np.ndarray, stage_ms: Dict[str, List[float]]) -> np.ndarray:
+        preds = []
+        for start in range(0, len(X), self.batch_size):
+            chunk = X[start:start + self.batch_size]
+            self.batch[:len(chunk)] = chunk
+            self.batch[len(chunk):] = 0.0
+            t0 = time.perf_counter()
+            self.interp.set_tensor(self.inp['index'], self.batch)
+            self.interp.invoke()
+            out = self.interp.get_tensor(self.out_index)
+            ms = (time.perf_counter() - t0) * 1000.0
+            stage_ms['inferenceBatch'].append(ms)
+            stage_ms['inferencePerFrame'].append(ms / len(chunk))
+            preds.append(out[:len(chunk)].argmax(axis=1))
+        return np.concatenate(preds) if preds else np.zeros((0,), dtype=np.int64)
+
+
+def replay_clip(path: Path, hands, args, stage_ms: Dict[str, List[float]]) -> np.ndarray:
+    """Features (N, 42) de los frames con mano detectada; acumula la latencia de cada etapa."""
+    from extract_landmarks_and_train import landmarks_to_features
+    feats = []
+    frames = iter_frames(path, args.decode_backend, args.decode_width or None, step=args.step)
+    try:
+        while True:
+            t0 = time.perf_counter()
+            rgb = next(frames, None)
+            if rgb is None:
+                break
+            t1 = time.perf_counter()
+            result = hands.process(rgb)
+            t2 = time.perf_counter()
+            stage_ms['decode'].append((t1 - t0) * 1000.0)
+            stage_ms['landmarks'].append((t2 - t1) * 1000.0)
+            if result.multi_hand_landmarks:
+                # Igual que el dataset: la primera mano detectada
+                f = landmarks_to_features([(p.x, p.y) for p in result.multi_hand_landmarks[0].landmark])
+                stage_ms['features'].append((time.perf_counter() - t2) * 1000.0)
+                if f is not None:
+                    feats.append(f)
+            if args.max_frames and len(feats) >= args.max_frames:
+                break
+    finally:
+        frames.close()
+    return np.asarray(feats, dtype=np.float32).reshape(-1, 42)
+
+
+def summarize(per_clip: List[dict], classes: List[str]) -> dict:
+    """Precisión por seña (frame y clip) y confusión a partir de los resultados por clip."""
+    confusion: Dict[str, Dict[str, int]] = {}
+    per_sign: Dict[str, dict] = {}
+    for clip in per_clip:
+        true = clip['slug']
+        s = per_sign.setdefault(true, {'frames': 0, 'correctFrames': 0, 'clips': 0, 'correctClips': 0})
+        s['clips'] += 1
+        s['correctClips'] += int(clip['clipPrediction'] == true)
+        for p in clip['predictions']:
+            pred = classes[p]
+            s['frames'] += 1
+            s['correctFrames'] += int(pred == true)
+            row = confusion.setdefault(true, {})
+            row[pred] = row.get(pred, 0) + 1
+    for s in per_sign.values():
+        s['frameAccuracy'] = round(s['correctFrames'] / s['frames'], 4) if s['frames'] else None
+        s['clipAccuracy'] = round(s['correctClips'] / s['clips'], 4)
+    frames = sum(s['frames'] for s in per_sign.values())
+    clips = sum(s['clips'] for s in per_sign.values())
+    errors = sorted(((n, t, p) for t, row in confusion.items() for p, n in row.items() if p != t), reverse=True)
+    return {
+        'frameAccuracy': round(sum(s['correctFrames'] for s in per_sign.values()) / frames, 4) if frames else 0.0,
+        'clipAccuracy': round(sum(s['correctClips'] for s in per_sign.values()) / clips, 4) if clips else 0.0,
+        'perSign': per_sign,
+        'confusion': confusion,
+        'topConfusions': [{'true': t, 'pred': p, 'frames': n} for n, t, p in errors[:20]],
+    }
+
+
+def main(argv=None):
+    from prepare_and_upload_videos import build_title, iter_video_files, slugify
+    from tflite_bench import append_report, print_table
+
+    ap = argparse.ArgumentParser(description='Reproduce el corpus de videos con un modelo exportado y mide latencia y precisión.')
+    ap.add_argument('--media-dir', type=Path, required=True, help='Carpeta raíz con subcarpetas LSM_*_Web')
+    ap.add_argument('--workdir', type=Path, default=Path('tools/work'), help='Directorio de trabajo (models/, reports/)')
+    ap.add_argument('--model', help='Hash (o prefijo) del modelo en <workdir>/models/ (default: el último)')
+    ap.add_argument('--batch-size', type=int, default=32, help='Frames por invocación del intérprete')
+    ap.add_argument('--step', type=int, default=2, help='Procesa 1 de cada N frames (2 = igual que la extracción)')
+    ap.add_argument('--max-frames', type=int, default=0, help='Frames con mano por clip (0 = todo el clip)')
+    ap.add_argument('--decode-backend', choices=BACKENDS, default='auto', help='Backend de decodificación')
+    ap.add_argument('--decode-width', type=int, default=DEFAULT_WIDTH, help='Ancho de decodificación (0 = original)')
+    ap.add_argument('--min-accuracy', type=float, help='Precisión top-1 mínima por clip para aprobar el modelo')
+    ap.add_argument('--min-fps', type=float, help='Frames/s mínimos extremo a extremo para aprobar el modelo')
+    args = ap.parse_args(argv)
+
+    model_dir = resolve_model_dir(args.workdir, args.model)
+    if model_dir is None:
+        ap.error(f'Modelo no encontrado en {args.workdir / "models"}: {args.model or "latest"}')
+    require('mediapipe', 'tensorflow', 'numpy')
+    import mediapipe as mp
+
+    classes = json.loads((model_dir / LABELS_FILE).read_text(encoding='utf-8'))
+    class_idx = {c: i for i, c in enumerate(classes)}
+    clf = BatchedClassifier((model_dir / MODEL_FILE).read_bytes(), args.batch_size)
+    if clf.num_features != 42:
+        ap.error(f'El modelo espera {clf.num_features} features; la reproducción solo cubre el MLP de landmarks (42)')
+
+    stage_ms: Dict[str, List[float]] = {'decode': [], 'landmarks': [], 'features': [], 'inferenceBatch': [], 'inferencePerFrame': []}
+    per_clip: List[dict] = []
+    skipped = 0
+    undecodable = []
+    frames_total = 0
+    t_start = time.perf_counter()
+    with mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=2) as hands:
+        for _, f in iter_video_files(args.media_dir):
+            slug = slugify(build_title(f.name))
+            if slug not in class_idx:
+                skipped += 1
+                continue
+            decoded_before = len(stage_ms['decode'])
+            try:
+                X = replay_clip(f, hands, args, stage_ms)
+            except subprocess.CalledProcessError as e:
+                # Clip dañado: se cuenta aparte y no entra en la precisión
+                undecodable.append(str(f))
+                print(f'AVISO: {f}: no se pudo decodificar ({(e.stderr or "").strip() or f"exit {e.returncode}"})', file=sys.stderr)
+                continue
+            finally:
+                frames_total += len(stage_ms['decode']) - decoded_before
+            preds = clf.predict(X, stage_ms)
+            vote = classes[int(np.bincount(preds, minlength=len(classes)).argmax())] if len(preds) else None
+            per_clip.append({'slug': slug, 'file': str(f), 'frames': int(len(preds)), 'predictions': preds.tolist(),
+                             'clipPrediction': vote})
+            print(f"{slug}: {len(preds)} frames con mano, clip -> {vote}")
+    elapsed = time.perf_counter() - t_start
+
+    summary = summarize(per_clip, classes)
+    hand_frames = sum(c['frames'] for c in per_clip)
+    latency = {k: percentiles(v) for k, v in stage_ms.items()}
+    fps = frames_total / elapsed if elapsed else 0.0
+
+    failures = []
+    if args.min_accuracy is not None and summary['clipAccuracy'] < args.min_accuracy:
+        failures.append(f"precisión por clip {summary['clipAccuracy']:.4f} < {args.min_accuracy}")
+    if args.min_fps is not None and fps < args.min_fps:
+        failures.append(f'{fps:.1f} frames/s < {args.min_fps}')
+
+    verdict = {
+        'hash': model_dir.name,
+        'clips': len(per_clip),
+        'clipsWithoutClass': skipped,
+        'clipsUndecodable': len(undecodable),
+        'framesDecoded': frames_total,
+        'framesWithHand': hand_frames,
+        'fps': round(fps, 2),
+        'frameAccuracy': summary['frameAccuracy'],
+        'clipAccuracy': summary['clipAccuracy'],
+        'decodeBackend': args.decode_backend,
+        'decodeWidth': args.decode_width,
+        'batchSize': args.batch_size,
+        'minAccuracy': args.min_accuracy,
+        'minFps': args.min_fps,
+        'passed': not failures,
+        'createdAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+    }
+    report = {**verdict, 'latencyMs': latency, **{k: summary[k] for k in ('perSign', 'confusion', 'topConfusions')},
+              'clipsDetail': [{k: c[k] for k in ('slug', 'file', 'frames', 'clipPrediction')} for c in per_clip],
+              'undecodableFiles': undecodable}
+    out = args.workdir / 'reports' / f'replay-{model_dir.name}.json'
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding='utf-8')
+    (model_dir / REPLAY_FILE).write_text(json.dumps(verdict, ensure_ascii=False, indent=2), encoding='utf-8')
+    append_report(args.workdir, 'replay', verdict)
+
+    print('\nLatencia por etapa (ms):')
+    print_table([{'stage': k, **v} for k, v in latency.items()], ['stage', 'p50', 'p90', 'p99', 'n'])
+    print(f"\n{frames_total} frames en {elapsed:.1f} s -> {fps:.1f} frames/s; "
+          f"precisión top-1: frame {summary['frameAccuracy']:.4f}, clip {summary['clipAccuracy']:.4f} "
+          f"({len(per_clip)} clips, {skipped} sin clase en el modelo, {len(undecodable)} sin decodificar)")
+    for c in summary['topConfusions'][:10]:
+        print(f"  {c['true']} -> {c['pred']}: {c['frames']} frames")
+    print(f'Informe: {out}')
+    if failures:
+        for msg in failures:
+            print(f'ERROR: el modelo no pasa el umbral: {msg}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+signlearn_tools.py
+
+Punto de entrada único de las herramientas de tools/.
+
+  build          Construcción incremental del modelo de landmarks como grafo:
+                 media -> landmarks -> dataset -> model -> quantized -> upload
+                 (+ letters-coco / letters-pickle en paralelo si se indican sus datasets).
+                 Solo se reejecutan los nodos obsoletos; las salidas viven en
+                 <workdir>/cache/<nodo>/<clave>/ y cada modelo en <workdir>/models/<hash>/.
+  videos         prepare_and_upload_videos.py
+  landmarks      extract_landmarks_and_train.py
+  coco           train_letters_from_coco.py
+  pickle         train_letters_from_pickle.py
+  letters-landmarks  train_letters_landmarks.py
+  distill        distill_letters.py
+  sweep          arch_sweep.py
+  upload         upload_artifacts.py
+  snapshot       catalog_snapshot.py
+  dedupe         dedupe.py
+  image-variants image_variants.py
+  decode-bench   video_decode.py
+  replay         replay_bench.py
+  io-demo        adaptive_io.py
+  mirror         mirror.py
+  augment-bench  landmark_augment.py
+  inspect-pickle inspect_pickle.py
+  check-startup  check_startup.py
+
+Uso:
+  python tools/signlearn_tools.py build --media-dir /ruta/LSM --targets quantized
+  python tools/signlearn_tools.py build --service_account sa.json --storage_bucket b --targets upload --jobs 3
+  python tools/signlearn_tools.py coco --data-dir ... --epochs 10
+"""
+import argparse
+import importlib
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+import adaptive_io
+import backends
+from artifacts import LABELS_FILE, MODEL_FILE, sha256_file, store_model
+from backends import is_local, open_backend
+from deps import require, EXTRACT, FIREBASE, TRAIN
+from pipeline import Node, run_graph
+
+TOOLS_DIR = Path(__file__).resolve().parent
+
+# subcomando -> módulo con main(argv)
+SUBTOOLS = {
+    'videos': 'prepare_and_upload_videos',
+    'landmarks': 'extract_landmarks_and_train',
+    'coco': 'train_letters_from_coco',
+    'pickle': 'train_letters_from_pickle',
+    'letters-landmarks': 'train_letters_landmarks',
+    'distill': 'distill_letters',
+    'sweep': 'arch_sweep',
+    'upload': 'upload_artifacts',
+    'snapshot': 'catalog_snapshot',
+    'dedupe': 'dedupe',
+    'image-variants': 'image_variants',
+    'decode-bench': 'video_decode',
+    'replay': 'replay_bench',
+    'io-demo': 'adaptive_io',
+    'mirror': 'mirror',
+    'augment-bench': 'landmark_augment',
+    'inspect-pickle': 'inspect_pickle',
+    'check-startup': 'check_startup',
+}
+
+
+class BuildContext:
+    """Estado compartido entre nodos: argumentos y backends de Storage/metadatos creados bajo demanda."""
+
+    def __init__(self, args):
+        self.args = args
+        self.workdir = Path(args.workdir)
+        self.cache_dir = self.workdir / 'cache'
+        self._clients = None
+        self._media = None
+
+    def clients(self):
+        """(storage, meta) de backends.py: Firebase o un espejo local (--backend local:<dir>)."""
+        if self._clients is None:
+            from extract_landmarks_and_train import init_firebase
+            self._clients = open_backend(self.args.backend,
+                                         lambda: init_firebase(self.args.service_account, self.args.storage_bucket)[1:])
+        return self._clients
+
+    def media_items(self) -> List[dict]:
+        """Listado de media con un hash de contenido por elemento (barato: sin descargar)."""
+        if self._media is not None:
+            return self._media
+        if self.args.media_dir:
+            from prepare_and_upload_videos import build_title, iter_image_files, iter_video_files, slugify
+            base = Path(self.args.media_dir)
+            items = []
+            for kind, it in (('video', iter_video_files(base)), ('image', iter_image_files(base))):
+                for category, f in it:
+                    st = f.stat()
+                    items.append({
+                        'slug': slugify(build_title(f.name)), 'type': kind, 'category': category,
+                        'path': str(f), 'version': f'{st.st_size}-{st.st_mtime_ns}',
+                    })
+        else:
+            from extract_landmarks_and_train import list_media
+            storage, meta = self.clients()
+            items = list_media(meta)
+            md5 = {}
+            for prefix in sorted({it['storagePath'].split('/', 1)[0] + '/' for it in items}):
+                for obj in storage.list(prefix):
+                    md5[obj.path] = obj.md5
+            for it in items:
+                it['version'] = md5.get(it['storagePath'])
+        self._media = sorted(items, key=lambda it: (it['type'], it['slug'], it.get('path') or it.get('storagePath')))
+        return self._media
+
+
+def build_nodes(ctx: BuildContext) -> List[Node]:
+    args = ctx.args
+    blobs_dir = ctx.cache_dir / '_blobs'
+    per_file_dir = ctx.cache_dir / '_landmarks'
+
+    def run_media(out: Path, deps: Dict[str, Path]):
+        index = []
+        missing = []
+        for it in ctx.media_items():
+            if 'path' in it:
+                local = Path(it['path'])
+            elif is_local(args.backend):
+                # Espejo local: se lee el archivo en su sitio, sin copiarlo a _blobs
+                local = ctx.clients()[0].fetch(it['storagePath'])
+            else:
+                local = blobs_dir / (it['version'] or it['slug']).replace('/', '_') / it['storagePath'].split('/')[-1]
+                if not local.exists():
+                    missing.append((it['storagePath'], local))
+            index.append({'slug': it['slug'], 'type': it['type'], 'file': str(local), 'version': it['version']})
+        if missing:
+            # Descargas en paralelo con concurrencia adaptativa (AIMD + reintentos ante 429/503)
+            import concurrent.futures
+            storage, _ = ctx.clients()
+            storage_io = adaptive_io.storage_limiter(args)
+
+            def download(item):
+                path, local = item
+                storage_io.call(storage.fetch, path, local.parent, nbytes=lambda p: p.stat().st_size)
+                return path, local
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=args.max_inflight) as ex:
+                for path, local in ex.map(download, missing):
+                    print(f"Descargado: {path} -> {local}  [{storage_io.status()}]")
+        (out / 'index.json').write_text(json.dumps(index, ensure_ascii=False, indent=1), encoding='utf-8')
+
+    def run_landmarks(out: Path, deps: Dict[str, Path]):
+        from extract_landmarks_and_train import extract_landmarks_from_image, extract_landmarks_from_video, landmarks_to_features
+        from video_decode import resolve_backend
+        backend = resolve_backend(args.decode_backend)
+        index = json.loads((deps['media'] / 'index.json').read_text(encoding='utf-8'))
+        per_file_dir.mkdir(parents=True, exist_ok=True)
+        with open(out / 'landmarks.jsonl', 'w', encoding='utf-8') as w:
+            for it in index:
+                # Caché por archivo: solo se extraen los medios nuevos o modificados
+                cached = per_file_dir / f"{sha256_file(Path(it['file']))[:24]}-{args.max_frames}-{backend}{args.decode_width}.json"
+                if cached.exists():
+                    feats = json.loads(cached.read_text(encoding='utf-8'))
+                else:
+                    if it['type'] == 'image':
+                        hands = [h['landmarks'] for h in extract_landmarks_from_image(Path(it['file']))]
+                    else:
+                        frames = extract_landmarks_from_video(Path(it['file']), max_frames=args.max_frames, backend=backend,
+                                                              width=args.decode_width or None)
+                        hands = [pf[0]['landmarks'] for pf in frames if pf]
+                    feats = [f.tolist() for f in (landmarks_to_features(h) for h in hands) if f is not None]
+                    cached.write_text(json.dumps(feats), encoding='utf-8')
+                w.write(json.dumps({'slug': it['slug'], 'features': feats}, ensure_ascii=False) + '\n')
+
+    def run_dataset(out: Path, deps: Dict[str, Path]):
+        import numpy as np
+        X, y = [], []
+        with open(deps['landmarks'] / 'landmarks.jsonl', encoding='utf-8') as f:
+            for line in f:
+                rec = json.loads(line)
+                for feats in rec['features']:
+                    X.append(feats)
+                    y.append(rec['slug'])
+        np.save(out / 'X.npy', np.array(X, dtype=np.float32))
+        np.save(out / 'y.npy', np.array(y))
+        print(f'Dataset: {len(y)} muestras, {len(set(y))} clases')
+
+    def run_model(out: Path, deps: Dict[str, Path]):
+        import numpy as np
+        from extract_landmarks_and_train import train_and_export
+        X = list(np.load(deps['dataset'] / 'X.npy'))
+        y = [str(v) for v in np.load(deps['dataset'] / 'y.npy')]
+        res = train_and_export(X, y, ctx.workdir, args.min_per_class)
+        if res is None:
+            raise RuntimeError('No hay suficientes muestras por clase para entrenar')
+        model, model_dir = res
+        model.save(out / 'model.keras')
+        (out / 'artifact.json').write_text(json.dumps({'hash': model_dir.name}), encoding='utf-8')
+
+    def run_quantized(out: Path, deps: Dict[str, Path]):
+        import tensorflow as tf
+        src = json.loads((deps['model'] / 'artifact.json').read_text(encoding='utf-8'))['hash']
+        classes = json.loads((ctx.workdir / 'models' / src / LABELS_FILE).read_text(encoding='utf-8'))
+        model = tf.keras.models.load_model(deps['model'] / 'model.keras')
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        # Cuantización de rango dinámico: pesos int8, activaciones float
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        model_dir = store_model(ctx.workdir, converter.convert(), classes, meta={'source': 'landmarks', 'quantized': 'dynamic-range', 'from': src})
+        print(f'Modelo cuantizado: {model_dir / MODEL_FILE}')
+        (out / 'artifact.json').write_text(json.dumps({'hash': model_dir.name}), encoding='utf-8')
+
+    def run_upload(out: Path, deps: Dict[str, Path]):
+        from upload_artifacts import main as upload_main
+        digest = json.loads((deps['quantized'] / 'artifact.json').read_text(encoding='utf-8'))['hash']
+        creds = ['--service_account', args.service_account, '--storage_bucket', args.storage_bucket] if args.service_account else []
+        upload_main(['--backend', args.backend, *creds, '--workdir', str(ctx.workdir), '--model', digest])
+        (out / 'uploaded.json').write_text(json.dumps({'hash': digest}), encoding='utf-8')
+
+    def letters_node(name: str, script: str, data_flag: str, data_path: str) -> Node:
+        def fingerprint():
+            p = Path(data_path)
+            files = [p] if p.is_file() else sorted(q for q in p.rglob('*') if q.is_file())
+            return [(q.relative_to(p).as_posix() if q != p else q.name, q.stat().st_size, q.stat().st_mtime_ns) for q in files]
+
+        def run(out: Path, deps: Dict[str, Path]):
+            # Subproceso: TensorFlow aislado y en paralelo real con el resto del grafo
+            subprocess.run([sys.executable, str(TOOLS_DIR / script), data_flag, data_path,
+                            '--epochs', str(args.epochs), '--workdir', str(out)], check=True)
+            latest = json.loads((out / 'models' / 'latest.json').read_text(encoding='utf-8'))['hash']
+            src = out / 'models' / latest
+            meta = json.loads((src / 'meta.json').read_text(encoding='utf-8'))
+            model_dir = store_model(ctx.workdir, (src / MODEL_FILE).read_bytes(),
+                                    json.loads((src / LABELS_FILE).read_text(encoding='utf-8')),
+                                    meta={k: v for k, v in meta.items() if k not in ('hash', 'createdAt', 'sizeBytes', 'numClasses')})
+            (out / 'artifact.json').write_text(json.dumps({'hash': model_dir.name}), encoding='utf-8')
+
+        return Node(name, run, params={'epochs': args.epochs, 'data': data_path}, fingerprint=fingerprint)
+
+    nodes = [
+        Node('media', run_media, params={'source': args.media_dir or (args.backend if is_local(args.backend) else args.storage_bucket)}, fingerprint=lambda: [
+            (it['slug'], it['type'], it['version']) for it in ctx.media_items()]),
+        Node('landmarks', run_landmarks, deps=['media'],
+             params={'max_frames': args.max_frames, 'decode_backend': args.decode_backend, 'decode_width': args.decode_width}),
+        Node('dataset', run_dataset, deps=['landmarks']),
+        Node('model', run_model, deps=['dataset'], params={'min_per_class': args.min_per_class}),
+        Node('quantized', run_quantized, deps=['model']),
+        Node('upload', run_upload, deps=['quantized'], params={'bucket': args.backend if is_local(args.backend) else args.storage_bucket}),
+    ]
+    if args.coco_dir:
+        nodes.append(letters_node('letters-coco', 'train_letters_from_coco.py', '--data-dir', args.coco_dir))
+    if args.pickle:
+        nodes.append(letters_node('letters-pickle', 'train_letters_from_pickle.py', '--pickle', args.pickle))
+    return nodes
+
+
+def cmd_build(args):
+    targets = args.targets or ['quantized'] + [n for n, v in (('letters-coco', args.coco_dir), ('letters-pickle', args.pickle)) if v]
+    has_gcs = bool(args.service_account and args.storage_bucket)
+    if 'upload' in targets and not (has_gcs or is_local(args.backend)):
+        sys.exit('ERROR: el nodo upload requiere --service_account y --storage_bucket (o --backend local:<dir>)')
+    if not args.media_dir and not (has_gcs or is_local(args.backend)):
+        sys.exit('ERROR: indica --media-dir, --backend local:<dir> o --service_account/--storage_bucket como origen de media')
+    require([] if args.media_dir or is_local(args.backend) else FIREBASE, [] if args.dry_run else EXTRACT + TRAIN)
+    ctx = BuildContext(args)
+    outputs = run_graph(build_nodes(ctx), ctx.cache_dir, targets, jobs=args.jobs, force=args.force, dry_run=args.dry_run)
+    for name in targets:
+        if name in outputs:
+            print(f'{name}: {outputs[name]}')
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in SUBTOOLS:
+        # Reenvía el resto de argumentos a la herramienta original (importada solo ahora)
+        return importlib.import_module(SUBTOOLS[argv[0]]).main(argv[1:])
+
+    ap = argparse.ArgumentParser(description='Herramientas SignLearn: ' + ', '.join(['build', *SUBTOOLS]))
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    for name, module in SUBTOOLS.items():
+        sub.add_parser(name, help=f'{module}.py (ver `{name} --help`)')
+    b = sub.add_parser('build', help='Construcción incremental del grafo de artefactos')
+    b.add_argument('--targets', nargs='*', help='Nodos objetivo (default: quantized + letters-* configurados)')
+    b.add_argument('--workdir', default='tools/work', help='Directorio de trabajo')
+    b.add_argument('--media-dir', help='Carpeta local con subcarpetas LSM_*_Web (en lugar de Firebase)')
+    backends.add_arguments(b)
+    b.add_argument('--service_account', help='Ruta al JSON de service account')
+    b.add_argument('--storage_bucket', help='Bucket de Storage')
+    b.add_argument('--coco-dir', help='Dataset COCO para el nodo letters-coco')
+    b.add_argument('--pickle', help='Pickle para el nodo letters-pickle')
+    b.add_argument('--epochs', type=int, default=10, help='Épocas de los nodos letters-*')
+    b.add_argument('--max-frames', type=int, default=32, help='Frames máximos por video en la extracción')
+    b.add_argument('--decode-backend', choices=['auto', 'ffmpeg', 'opencv'], default='auto', help='Backend de decodificación de video')
+    b.add_argument('--decode-width', type=int, default=480, help='Ancho de decodificación de los videos (0 = original)')
+    b.add_argument('--min_per_class', type=int, default=5, help='Mínimas muestras por clase para entrenar')
+    b.add_argument('--jobs', type=int, default=2, help='Nodos independientes en paralelo')
+    adaptive_io.add_arguments(b, default_max=16)
+    b.add_argument('--force', nargs='*', default=[], help='Nodos a reejecutar aunque estén en caché')
+    b.add_argument('--dry-run', action='store_true', help='Solo muestra qué nodos están en caché u obsoletos')
+    args = ap.parse_args(argv)
+    if args.cmd == 'build':
+        return cmd_build(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+# Las herramientas de tools/ son scripts planos que se importan entre sí por nombre
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,136 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from adaptive_io import AdaptiveLimiter, ThrottledError
+from backends import LocalMetadata
+
+
+class FakeClock:
+    """Reloj manual: sleep() lo adelanta sin esperar."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def _flaky(failures, code=429):
+    """Función que falla `failures` veces con `code` y luego devuelve 'ok'."""
+    state = {'calls': 0}
+
+    def fn():
+        state['calls'] += 1
+        if state['calls'] <= failures:
+            raise ThrottledError(code)
+        return 'ok'
+    return fn, state
+
+
+def test_throttle_halves_limit_once_per_window_and_retries():
+    clock = FakeClock()
+    limiter = AdaptiveLimiter('t', initial=8, maximum=16, window=60.0, backoff_base=0.5, clock=clock, sleep=clock.sleep)
+    fn, state = _flaky(3)
+    assert limiter.call(fn) == 'ok'
+    assert state['calls'] == 4
+    assert limiter.retried == 3 and limiter.throttled == 3
+    # Backoff exponencial con jitter: cada espera está por debajo de base * 2^intento
+    assert len(clock.slept) == 3 and all(0 <= t <= 0.5 * 2 ** i for i, t in enumerate(clock.slept))
+    # Una ráfaga de 429 dentro de la misma ventana solo reduce una vez
+    assert int(limiter.limit) == 4
+
+
+def test_server_errors_retry_without_reducing_limit():
+    limiter = AdaptiveLimiter('t', initial=8, backoff_base=0.001)
+    fn, _ = _flaky(2, code=500)
+    assert limiter.call(fn) == 'ok'
+    assert limiter.retried == 2 and limiter.throttled == 0 and int(limiter.limit) == 8
+
+
+def test_non_retryable_and_exhausted_errors_raise():
+    limiter = AdaptiveLimiter('t', retries=2, backoff_base=0.001)
+    fn, state = _flaky(10, code=404)
+    with pytest.raises(ThrottledError):
+        limiter.call(fn)
+    assert state['calls'] == 1
+    fn, state = _flaky(10)
+    with pytest.raises(ThrottledError):
+        limiter.call(fn)
+    assert state['calls'] == 3
+    assert limiter.in_flight == 0
+
+
+def test_fixed_mode_ignores_throttling():
+    limiter = AdaptiveLimiter('t', initial=6, maximum=6, adaptive=False)
+    limiter.on_throttle()
+    assert int(limiter.limit) == 6
+
+
+def _window(limiter, clock, mb_per_request: float):
+    """Una ventana de 1 s con el límite lleno dos veces; cada petición tarda 0.5 s."""
+    for _ in range(2):
+        n = int(limiter.limit)
+        for _ in range(n):
+            limiter.acquire()
+        clock.now += 0.5
+        for _ in range(n):
+            limiter.release(mb_per_request)
+
+
+def test_limit_recovers_after_backoff():
+    # Enlace sin saturar: el rendimiento crece con la concurrencia, así que el límite vuelve a subir
+    # de uno en uno después de reducirse a la mitad, hasta el máximo
+    clock = FakeClock()
+    limiter = AdaptiveLimiter('t', initial=8, maximum=16, window=1.0, probe_every=1, clock=clock, sleep=clock.sleep)
+    limiter.on_throttle()
+    assert int(limiter.limit) == 4
+    trace = []
+    for _ in range(14):
+        _window(limiter, clock, 1.0)
+        trace.append(int(limiter.limit))
+    assert trace == list(range(5, 17)) + [16, 16]
+    assert limiter.in_flight == 0
+
+
+def test_useless_increase_is_undone():
+    # Enlace saturado: el mismo rendimiento con más concurrencia, así que la subida se deshace
+    clock = FakeClock()
+    limiter = AdaptiveLimiter('t', initial=4, maximum=16, window=1.0, probe_every=2, clock=clock, sleep=clock.sleep)
+    trace = []
+    for _ in range(6):
+        _window(limiter, clock, 8.0 / (2 * int(limiter.limit)))
+        trace.append(int(limiter.limit))
+    assert trace == [5, 4, 4, 4, 5, 4]
+
+
+def test_extraction_continues_after_failed_items(tmp_path, capsys):
+    from extract_landmarks_and_train import build_dataset, load_cursor, save_cursor
+
+    mirror = tmp_path / 'mirror'
+    meta = LocalMetadata(mirror)
+    for i in range(3):
+        # Documentos cuyo archivo no está en el espejo: cada descarga falla
+        meta.set_doc('videos', f'v{i}', {'title': f'Seña {i}', 'storagePath': f'videos/x/v{i}.mp4'})
+    workdir = tmp_path / 'work'
+    workdir.mkdir()
+    save_cursor(workdir, {'videos': '2000-01-01T00:00:00+00:00'})
+    np.save(workdir / 'X.npy', np.zeros((1, 42), dtype=np.float32))
+    np.save(workdir / 'y.npy', np.array(['seña_0']))
+    np.save(workdir / 'src.npy', np.array(['videos/v0']))
+    args = SimpleNamespace(backend=f'local:{mirror}', service_account=None, storage_bucket=None, since_last_sync=True,
+                           page_size=300, max_inflight=2, no_adaptive=False, decode_backend='auto', decode_width=480)
+
+    X, y = build_dataset(args, Path(workdir))
+    err = capsys.readouterr().err
+    assert err.count('ERROR: videos/x/') == 3
+    # Las muestras previas se conservan y el cursor no avanza
+    assert len(X) == 1
+    assert load_cursor(workdir) == {'videos': '2000-01-01T00:00:00+00:00'}
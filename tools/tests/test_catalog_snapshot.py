@@ -0,0 +1,41 @@
+from catalog_snapshot import decode_snapshot, read_manifest, verify_snapshot, write_snapshot
+
+
+def _video(i, **kw):
+    return {'id': f'v{i:03d}', 'title': f'Seña {i}', 'category': 'saludos', 'storagePath': f'videos/saludos/v{i:03d}.mp4',
+            'sizeBytes': 1000 + i, **kw}
+
+
+def test_rebuild_drops_ids_missing_from_manifest(tmp_path):
+    out = tmp_path / 'snapshot.json.gz'
+    videos = [_video(i) for i in range(10)]
+    _, v1, changed = write_snapshot(videos, [], out)
+    assert changed
+
+    kept = videos[:5] + videos[7:]
+    _, v2, changed = write_snapshot(kept, [], out)
+    snapshot, _ = decode_snapshot(out.read_bytes())
+    assert changed and v2 != v1
+    assert [e['id'] for e in snapshot['videos']] == [v['id'] for v in kept]
+    assert verify_snapshot(out.read_bytes(), kept, []) == []
+
+
+def test_same_manifest_keeps_version(tmp_path):
+    out = tmp_path / 'snapshot.json.gz'
+    videos = [_video(i) for i in range(3)]
+    _, v1, _ = write_snapshot(videos, [], out)
+    _, v2, changed = write_snapshot(list(reversed(videos)), [], out)
+    assert v1 == v2 and not changed
+
+
+def test_verify_reports_both_directions(tmp_path):
+    out = tmp_path / 'snapshot.json.gz'
+    videos = [_video(i) for i in range(4)]
+    write_snapshot(videos, [], out)
+    errors = verify_snapshot(out.read_bytes(), videos[1:] + [_video(9)], [])
+    assert any('v000' in e and 'no está en el manifest' in e for e in errors)
+    assert any('v009' in e and 'falta en el snapshot' in e for e in errors)
+
+
+def test_read_manifest_missing_file(tmp_path):
+    assert read_manifest(tmp_path / 'nope.jsonl') == []
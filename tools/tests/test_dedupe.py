@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from dedupe import analyze, find_near_duplicates, find_slug_collisions, paths_to_skip
+
+
+def test_near_duplicates_only_within_a_group_and_skip_radius():
+    hashes = {'a/hola.jpg': 0b1111_0000, 'a/hola_2.jpg': 0b1111_0001, 'b/hola.jpg': 0b1111_0001,
+              'a/adios.jpg': 0b1111_0110, 'c/gato.jpg': 0xFF00FF}
+    group = {p: p.split('/')[0] for p in hashes}
+    pairs, similar = find_near_duplicates(hashes, 3, 1, group.get)
+    # Casi idéntico en la misma categoría: duplicado aunque el nombre (slug) sea otro
+    assert pairs == [('a/hola.jpg', 'a/hola_2.jpg', 1)]
+    # Otra categoría, o la misma pero fuera del radio estricto: solo se informa
+    assert similar == [('a/hola.jpg', 'b/hola.jpg', 1), ('a/hola.jpg', 'a/adios.jpg', 2)]
+
+
+def test_skip_drops_only_near_identical_in_same_category(monkeypatch):
+    import dedupe
+    fake = {'x/hola.jpg': 0, 'x/hola_copia.png': 1, 'x/adios.jpg': 0b1111, 'y/saludo.jpg': 0}
+    monkeypatch.setattr(dedupe, 'compute_hashes', lambda items, cache, workers: {str(p): fake[str(p)] for _, p in items})
+    images = [(p.split('/')[0], Path(p)) for p in fake]
+    report = analyze([], images, lambda f: f.stem, perceptual=True, cache_path=Path('unused'), workers=1)
+    assert paths_to_skip(report) == {'x/hola_copia.png'}
+    assert report['similarMatches']['images'] == [('x/hola.jpg', 'x/adios.jpg', 4), ('x/hola.jpg', 'y/saludo.jpg', 0)]
+
+
+def test_slug_collisions():
+    assert find_slug_collisions([('hola', 'a'), ('hola', 'b'), ('adios', 'c')]) == {'hola': ['a', 'b']}
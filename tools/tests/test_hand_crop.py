@@ -0,0 +1,25 @@
+from PIL import Image
+
+from hand_crop import square_box, union_box
+
+
+def test_square_box_stays_inside_when_it_fits():
+    l, t, r, b = square_box((10, 10, 20, 30), 200, 200, margin=0.25)
+    assert r - l == b - t == 45
+    assert l >= 0 and t >= 0 and r <= 200 and b <= 200
+
+
+def test_square_box_pads_on_narrow_image():
+    # Imagen apaisada baja: el lado supera la altura y la caja sobresale centrada en vertical
+    l, t, r, b = square_box((100, 5, 60, 40), 400, 50, margin=0.25)
+    assert r - l == b - t == 90
+    assert t < 0 and b > 50
+    crop = Image.new('RGB', (400, 50), 'white').crop((l, t, r, b))
+    assert crop.size == (90, 90)
+    assert crop.getpixel((45, 0)) == (0, 0, 0)   # relleno
+    assert crop.getpixel((45, 45)) == (255, 255, 255)
+
+
+def test_union_box_ignores_empty_boxes():
+    assert union_box([[0, 0, 10, 10], [], [20, 5, 10, 10], [1, 1, 0, 3]]) == (0, 0, 30, 15)
+    assert union_box([]) is None
@@ -0,0 +1,81 @@
+import struct
+
+import pytest
+from PIL import Image, ImageCms, features
+
+from image_variants import make_variants, source_key, supported_formats, variant_stem
+
+# Colorantes sRGB adaptados a D50 (s15Fixed16 en el perfil)
+SRGB_RED, SRGB_GREEN, SRGB_BLUE = (0.4361, 0.2225, 0.0139), (0.3851, 0.7169, 0.0971), (0.1431, 0.0606, 0.7141)
+
+
+def _rgb_profile(red, green, blue) -> bytes:
+    """Perfil ICC v2 matriz/TRC mínimo (curvas lineales) con los colorantes dados."""
+    def xyz(v):
+        return b'XYZ \0\0\0\0' + b''.join(struct.pack('>i', round(c * 65536)) for c in v)
+    tags = [(b'wtpt', xyz((0.9642, 1.0, 0.8249))), (b'rXYZ', xyz(red)), (b'gXYZ', xyz(green)), (b'bXYZ', xyz(blue))]
+    tags += [(sig, b'curv\0\0\0\0\0\0\0\0') for sig in (b'rTRC', b'gTRC', b'bTRC')]
+    offset = 128 + 4 + 12 * len(tags)
+    table, data = b'', b''
+    for sig, body in tags:
+        table += sig + struct.pack('>II', offset + len(data), len(body))
+        data += body + b'\0' * (-len(body) % 4)
+    size = offset + len(data)
+    header = (struct.pack('>I', size) + b'\0' * 4 + struct.pack('>I', 0x02100000) + b'mntrRGB XYZ ' + b'\0' * 12
+              + b'acsp' + b'\0' * 24 + struct.pack('>iii', *(round(c * 65536) for c in (0.9642, 1.0, 0.8249))))
+    header += b'\0' * (128 - len(header))
+    return header + struct.pack('>I', len(tags)) + table + data
+
+
+@pytest.fixture
+def jpeg_with_icc(tmp_path):
+    icc = ImageCms.ImageCmsProfile(ImageCms.createProfile('sRGB')).tobytes()
+    exif = Image.Exif()
+    exif[0x0112] = 6   # rotada 90º
+    path = tmp_path / 'foto.jpg'
+    Image.new('RGB', (400, 200), 'red').save(path, 'JPEG', icc_profile=icc, exif=exif.tobytes())
+    return path
+
+
+@pytest.mark.parametrize('fmt', ['webp', 'avif'])
+def test_variants_have_no_metadata(jpeg_with_icc, tmp_path, fmt):
+    if not features.check(fmt):
+        pytest.skip(f'Pillow sin {fmt}')
+    variants = make_variants(jpeg_with_icc, tmp_path / 'out', 'cat/foto', [100, 1000], [fmt])
+    # Orientación aplicada al píxel y sin ampliar: 200x400 -> anchos 100 y 200
+    assert [(v['width'], v['height']) for v in variants] == [(100, 200), (200, 400)]
+    for v in variants:
+        with Image.open(v['path']) as im:
+            assert not im.info.get('icc_profile')
+            assert not im.info.get('exif')
+            assert not im.info.get('xmp')
+
+
+def test_source_key_changes_with_config(jpeg_with_icc):
+    assert source_key(jpeg_with_icc, [160], ['webp'], 80) != source_key(jpeg_with_icc, [160], ['webp'], 70)
+
+
+def test_supported_formats_keeps_webp():
+    assert supported_formats(['webp']) == (['webp'] if features.check('webp') else [])
+
+
+@pytest.mark.parametrize('fmt', ['webp', 'avif'])
+def test_variants_are_converted_to_srgb(tmp_path, fmt):
+    if not features.check(fmt):
+        pytest.skip(f'Pillow sin {fmt}')
+    # Perfil con los primarios rojo y verde intercambiados: el (255, 0, 0) del original es verde en sRGB
+    path = tmp_path / 'p3.png'
+    Image.new('RGB', (64, 64), (255, 0, 0)).save(path, 'PNG', icc_profile=_rgb_profile(SRGB_GREEN, SRGB_RED, SRGB_BLUE))
+    [v] = make_variants(path, tmp_path / 'out', 'p3', [64], [fmt])
+    with Image.open(v['path']) as im:
+        assert not im.info.get('icc_profile')
+        r, g, b = im.convert('RGB').getpixel((32, 32))
+    assert r < 20 and g > 235 and b < 20
+
+
+def test_variant_paths_differ_by_source_extension(tmp_path):
+    for name in ('foto.jpg', 'foto.png'):
+        Image.new('RGB', (32, 32), 'blue').save(tmp_path / name)
+    paths = [v['path'] for name in ('foto.jpg', 'foto.png')
+             for v in make_variants(tmp_path / name, tmp_path / 'out', variant_stem('cat/foto', tmp_path / name), [32], ['webp'])]
+    assert len(set(paths)) == 2
@@ -0,0 +1,44 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import extract_landmarks_and_train as elt
+from backends import LocalMetadata, LocalStorage
+
+
+def _fake_video_landmarks(path, **kwargs):
+    # Un frame con una mano cuyo punto 1 codifica el contenido del archivo (feats[2])
+    value = float(Path(path).read_text(encoding='utf-8'))
+    return [[{'landmarks': [(0.0, 0.0), (value, 0.0)] + [(1.0, 0.0)] * 19, 'handedness': 'Right'}]]
+
+
+def _put(mirror, tmp_path, doc_id, slug, value, updated):
+    src = tmp_path / f'{doc_id}.txt'
+    src.write_text(str(value), encoding='utf-8')
+    LocalStorage(mirror).upload_file(src, f'videos/{doc_id}.mp4')
+    LocalMetadata(mirror).set_doc('videos', doc_id, {'slug': slug, 'storagePath': f'videos/{doc_id}.mp4',
+                                                     'updatedAt': updated}, touch=False)
+
+
+def _samples(X, y):
+    return sorted((label, round(float(x[2]), 3)) for x, label in zip(X, y))
+
+
+def test_incremental_merge_replaces_by_document_and_drops_deleted(tmp_path, monkeypatch):
+    monkeypatch.setattr(elt, 'extract_landmarks_from_video', _fake_video_landmarks)
+    mirror, workdir = tmp_path / 'mirror', tmp_path / 'work'
+    workdir.mkdir()
+    args = SimpleNamespace(backend=f'local:{mirror}', service_account=None, storage_bucket=None, since_last_sync=True,
+                           page_size=300, max_inflight=2, no_adaptive=False, decode_backend='auto', decode_width=480)
+    # Dos documentos con el mismo slug y un tercero que luego se borra
+    _put(mirror, tmp_path, 'v1', 'hola', 1, '2024-01-01T00:00:00+00:00')
+    _put(mirror, tmp_path, 'v2', 'hola', 2, '2024-01-01T00:00:00+00:00')
+    _put(mirror, tmp_path, 'v3', 'adios', 3, '2024-01-01T00:00:00+00:00')
+    X, y = elt.build_dataset(args, workdir)
+    assert _samples(X, y) == [('adios', 3.0), ('hola', 1.0), ('hola', 2.0)]
+
+    _put(mirror, tmp_path, 'v1', 'hola', 5, '2024-02-01T00:00:00+00:00')
+    meta = LocalMetadata(mirror)
+    meta.replace_collection('videos', [(d, data) for d, data in meta.iter_docs('videos') if d != 'v3'])
+    X, y = elt.build_dataset(args, workdir)
+    # v2 no cambió y conserva su muestra aunque comparte slug con v1; v3 desaparece
+    assert _samples(X, y) == [('hola', 2.0), ('hola', 5.0)]
@@ -0,0 +1,55 @@
+import io
+import pickle
+
+import pytest
+from PIL import Image
+
+from inspect_pickle import Inspector, print_report
+
+
+def _png(w=30, h=20) -> bytes:
+    b = io.BytesIO()
+    Image.new('RGB', (w, h)).save(b, 'PNG')
+    return b.getvalue()
+
+
+def _inspect(tmp_path, obj, protocol):
+    path = tmp_path / 'data.pickle'
+    path.write_bytes(pickle.dumps(obj, protocol=protocol))
+    insp = Inspector()
+    with open(path, 'rb') as f:
+        insp.run(f)
+    return insp, str(path)
+
+
+@pytest.mark.parametrize('protocol', [2, 4, 5])
+def test_tuple_root(tmp_path, capsys, protocol):
+    # Formato habitual (X, y): la raíz es la tupla, no la primera lista
+    insp, path = _inspect(tmp_path, ([_png() for _ in range(5)], list('ABCDE')), protocol)
+    assert insp.root.type == 'tuple' and insp.root.count == 2
+    assert insp.root.stats[(1, 'list', 'n')] == 2
+    assert insp.image_sizes == {'30x20': 5}
+    print_report(path, insp)
+    out = capsys.readouterr().out
+    assert 'Tipo raíz: tuple con 2 elementos' in out
+    assert "list[5]('A', 'B', 'C', 'D', …)" in out
+
+
+def test_dict_root_preview_pairs(tmp_path, capsys):
+    insp, path = _inspect(tmp_path, {'images': [_png(8, 8)], 'labels': ['a']}, 4)
+    assert insp.root.type == 'dict' and insp.root.keys == ['images', 'labels']
+    print_report(path, insp, sample=2)
+    assert "'labels': list[1]('a')" in capsys.readouterr().out
+
+
+def test_scalar_root(tmp_path, capsys):
+    insp, path = _inspect(tmp_path, b'x' * 100, 4)
+    print_report(path, insp)
+    assert 'Objeto raíz: <bytes 100 B>' in capsys.readouterr().out
+
+
+def test_truncated_pickle_raises(tmp_path):
+    path = tmp_path / 'cut.pickle'
+    path.write_bytes(pickle.dumps([1, 2, 3], protocol=4)[:-1])
+    with open(path, 'rb') as f, pytest.raises(ValueError):
+        Inspector().run(f)
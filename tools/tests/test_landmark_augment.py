@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from landmark_augment import DEFAULTS, MIDDLE_MCP, WRIST, augment_features, augment_landmarks, batch_rng, parse_augment
+
+
+def _normalized(n, t=None, seed=0):
+    rng = np.random.default_rng(seed)
+    shape = (n, 21, 2) if t is None else (n, t, 21, 2)
+    pts = rng.normal(0, 0.5, shape).astype(np.float32)
+    pts -= pts[..., WRIST:WRIST + 1, :]
+    return pts / np.linalg.norm(pts[..., MIDDLE_MCP, :], axis=-1)[..., None, None]
+
+
+@pytest.mark.parametrize('t', [None, 8])
+def test_output_stays_normalized(t):
+    # Muñeca en el origen y muñeca->dedo medio = 1, como lo que produce landmarks_to_features en la app
+    out = augment_landmarks(_normalized(256, t), np.random.default_rng(1), **{**DEFAULTS, 'shear': 0.3, 'jitter': 0.1})
+    assert np.abs(out[..., WRIST, :]).max() == 0.0
+    assert np.allclose(np.linalg.norm(out[..., MIDDLE_MCP, :], axis=-1), 1.0, atol=1e-4)
+
+
+def test_batch_rng_is_reproducible_and_differs_per_batch():
+    X = _normalized(32).reshape(32, 42)
+    a = augment_features(X, batch_rng(42, 3), **DEFAULTS)
+    assert np.array_equal(a, augment_features(X, batch_rng(42, 3), **DEFAULTS))
+    assert not np.array_equal(a, augment_features(X, batch_rng(42, 4), **DEFAULTS))
+
+
+def test_scale_is_not_an_option():
+    with pytest.raises(ValueError):
+        parse_augment('scale=0.1')
@@ -0,0 +1,20 @@
+import numpy as np
+
+from extract_landmarks_and_train import stratified_split
+
+
+def test_stratified_split_keeps_every_class_in_train():
+    y = np.repeat(np.arange(4), [1, 2, 5, 10])
+    train_idx, test_idx = stratified_split(y, 0.2)
+    assert train_idx.dtype == test_idx.dtype == np.int64
+    assert set(y[train_idx]) == {0, 1, 2, 3}
+    assert 0 not in set(y[test_idx])
+    assert sorted(np.concatenate([train_idx, test_idx]).tolist()) == list(range(len(y)))
+
+
+def test_stratified_split_singletons_give_empty_integer_test():
+    X = np.zeros((3, 42), dtype=np.float32)
+    y = np.array([0, 1, 2])
+    train_idx, test_idx = stratified_split(y, 0.2)
+    assert len(test_idx) == 0 and test_idx.dtype == np.int64
+    assert X[test_idx].shape == (0, 42)
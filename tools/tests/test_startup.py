@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+from check_startup import BUDGET_MS, CLIS, check, heavy_modules, loaded_modules
+
+# El tiempo depende de la carga de la máquina: en CI el presupuesto es holgado y configurable.
+# Lo estricto es que --help no cargue dependencias pesadas.
+CI_BUDGET_MS = float(os.environ.get('STARTUP_BUDGET_MS', 5 * BUDGET_MS))
+
+
+@pytest.mark.parametrize('script', CLIS)
+def test_cli_help_imports_no_heavy_modules(script):
+    assert heavy_modules(loaded_modules(script)) == []
+
+
+@pytest.mark.parametrize('script', CLIS)
+def test_cli_help_within_budget(script):
+    ms, status = check(script, CI_BUDGET_MS)
+    assert status == 'OK', f'{script}: {status} ({ms:.1f} ms)'
@@ -0,0 +1,28 @@
+from pathlib import Path
+
+import prepare_and_upload_videos as puv
+
+
+def _captured_cmd(monkeypatch, tmp_path, ext):
+    calls = []
+    monkeypatch.setattr(puv.subprocess, 'run', lambda cmd, **kw: calls.append(cmd))
+    puv.transcode_ffmpeg(Path('in.mov'), tmp_path, poster=tmp_path / f'p.{ext}', sprite=tmp_path / f's.{ext}')
+    return calls[0]
+
+
+def _args_before(cmd, path):
+    i = cmd.index(str(path))
+    return cmd[i - 4:i]
+
+
+def test_webp_stills_use_libwebp_quality(monkeypatch, tmp_path):
+    cmd = _captured_cmd(monkeypatch, tmp_path, 'webp')
+    for name in ('p.webp', 's.webp'):
+        assert _args_before(cmd, tmp_path / name) == ['-c:v', 'libwebp', '-quality', '80']
+    assert '-q:v' not in cmd
+
+
+def test_jpeg_stills_use_mjpeg_qscale(monkeypatch, tmp_path):
+    cmd = _captured_cmd(monkeypatch, tmp_path, 'jpg')
+    for name in ('p.jpg', 's.jpg'):
+        assert _args_before(cmd, tmp_path / name) == ['-c:v', 'mjpeg', '-q:v', '3']
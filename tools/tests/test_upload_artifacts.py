@@ -0,0 +1,27 @@
+import pytest
+
+import upload_artifacts
+from artifacts import LABELS_FILE, MODEL_FILE
+from backends import LocalStorage
+
+
+def test_unknown_model_is_an_error_not_the_loose_workdir(tmp_path, capsys):
+    work = tmp_path / 'work'
+    (work / 'models' / 'abc123').mkdir(parents=True)
+    for name in (MODEL_FILE, LABELS_FILE):
+        (work / name).write_text('suelto', encoding='utf-8')
+    with pytest.raises(SystemExit) as exc:
+        upload_artifacts.main(['--backend', f'local:{tmp_path / "dest"}', '--workdir', str(work), '--model', 'zzz'])
+    assert exc.value.code == 2
+    assert 'zzz' in capsys.readouterr().err
+    assert not (tmp_path / 'dest').exists()
+
+
+def test_without_model_falls_back_to_loose_workdir(tmp_path):
+    work = tmp_path / 'work'
+    work.mkdir()
+    for name in (MODEL_FILE, LABELS_FILE):
+        (work / name).write_text('suelto', encoding='utf-8')
+    upload_artifacts.main(['--backend', f'local:{tmp_path / "dest"}', '--workdir', str(work)])
+    dest = LocalStorage(tmp_path / 'dest')
+    assert all(dest.object_path(f'models/{name}').read_text(encoding='utf-8') == 'suelto' for name in (MODEL_FILE, LABELS_FILE))
@@ -0,0 +1,76 @@
+import os
+import stat
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from video_decode import iter_frames_ffmpeg, target_size
+
+FRAME = 4 * 2 * 3   # 4x2 RGB
+
+
+def _fake_tools(tmp_path, monkeypatch, nbytes: int, code: int, noise: int = 0):
+    """ffprobe/ffmpeg de prueba en el PATH: un video 4x2 del que ffmpeg escribe `nbytes` y sale con `code`.
+
+    Como un ffmpeg anterior a 5.1, rechaza -fps_mode; antes de los frames escribe `noise` bytes en stderr.
+    """
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    scripts = {
+        'ffprobe': 'print(\'{"streams": [{"width": 4, "height": 2}]}\')',
+        'ffmpeg': ('import sys\n'
+                   'if "-fps_mode" in sys.argv: sys.exit("Unrecognized option \'fps_mode\'")\n'
+                   f'sys.stderr.write("x" * {noise}); sys.stderr.flush()\n'
+                   f'sys.stdout.buffer.write(bytes({nbytes})); sys.stdout.flush()\n'
+                   f'if {code}: sys.stderr.write("moov atom not found")\nsys.exit({code})'),
+    }
+    for name, body in scripts.items():
+        p = bin_dir / name
+        p.write_text(f'#!{sys.executable}\n{body}\n')
+        p.chmod(p.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_full_decode_yields_every_frame(tmp_path, monkeypatch):
+    _fake_tools(tmp_path, monkeypatch, 3 * FRAME, 0)
+    assert sum(1 for _ in iter_frames_ffmpeg(Path('clip.mp4'), width=None)) == 3
+
+
+def test_failed_decode_raises(tmp_path, monkeypatch):
+    _fake_tools(tmp_path, monkeypatch, 2 * FRAME, 1)
+    with pytest.raises(subprocess.CalledProcessError) as e:
+        list(iter_frames_ffmpeg(Path('clip.mp4'), width=None))
+    assert 'moov atom' in e.value.stderr
+
+
+def test_truncated_frame_raises(tmp_path, monkeypatch):
+    _fake_tools(tmp_path, monkeypatch, 2 * FRAME + 5, 0)
+    with pytest.raises(subprocess.CalledProcessError):
+        list(iter_frames_ffmpeg(Path('clip.mp4'), width=None))
+
+
+def test_early_stop_does_not_raise(tmp_path, monkeypatch):
+    _fake_tools(tmp_path, monkeypatch, 3 * FRAME, 1)
+    frames = iter_frames_ffmpeg(Path('clip.mp4'), width=None)
+    next(frames)
+    frames.close()
+
+
+def test_verbose_stderr_does_not_block(tmp_path, monkeypatch):
+    # Más de lo que cabe en el buffer de un pipe: si nadie lo vacía, ffmpeg se bloquea antes de los frames
+    _fake_tools(tmp_path, monkeypatch, 3 * FRAME, 0, noise=1 << 20)
+    counted = []
+    t = threading.Thread(target=lambda: counted.append(sum(1 for _ in iter_frames_ffmpeg(Path('clip.mp4'), width=None))),
+                         daemon=True)
+    t.start()
+    t.join(timeout=30)
+    assert counted == [3]
+
+
+def test_target_size_even_and_no_upscale():
+    assert target_size(1281, 721, None) == (1280, 720)
+    assert target_size(1280, 720, 480) == (480, 270)
+    assert target_size(320, 240, 480) == (320, 240)
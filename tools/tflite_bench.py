@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+tflite_bench.py
+
+Medición local de modelos TFLite exportados (tamaño y latencia por inferencia en CPU con
+tf.lite.Interpreter) y tabla comparativa de variantes entrenadas.
+"""
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def make_interpreter(model_content: bytes, num_threads: int = 1):
+    import tensorflow as tf
+    interp = tf.lite.Interpreter(model_content=model_content, num_threads=num_threads)
+    interp.allocate_tensors()
+    return interp
+
+
+def tflite_latency_ms(model_content: bytes, runs: int = 100, warmup: int = 10, num_threads: int = 1) -> Dict[str, float]:
+    """Latencia de una inferencia (batch 1) con entrada aleatoria: p50/p90/media en ms."""
+    interp = make_interpreter(model_content, num_threads=num_threads)
+    inp = interp.get_input_details()[0]
+    x = np.random.random_sample(inp['shape']).astype(inp['dtype'])
+    times = []
+    for i in range(warmup + runs):
+        t0 = time.perf_counter()
+        interp.set_tensor(inp['index'], x)
+        interp.invoke()
+        if i >= warmup:
+            times.append((time.perf_counter() - t0) * 1000.0)
+    arr = np.array(times)
+    return {
+        'p50': float(np.percentile(arr, 50)),
+        'p90': float(np.percentile(arr, 90)),
+        'mean': float(arr.mean()),
+    }
+
+
+def tflite_predict(model_content: bytes, X: np.ndarray, batch_size: int = 64) -> np.ndarray:
+    """Salidas del modelo para X (N, ...) por lotes de tamaño fijo (el último se rellena con ceros)."""
+    interp = make_interpreter(model_content)
+    inp = interp.get_input_details()[0]
+    interp.resize_tensor_input(inp['index'], [batch_size, *X.shape[1:]])
+    interp.allocate_tensors()
+    out_index = interp.get_output_details()[0]['index']
+    batch = np.zeros((batch_size, *X.shape[1:]), dtype=inp['dtype'])
+    outs = []
+    for start in range(0, len(X), batch_size):
+        chunk = X[start:start + batch_size]
+        batch[:len(chunk)] = chunk
+        batch[len(chunk):] = 0
+        interp.set_tensor(inp['index'], batch)
+        interp.invoke()
+        outs.append(interp.get_tensor(out_index)[:len(chunk)].copy())
+    return np.concatenate(outs) if outs else np.zeros((0,))
+
+
+def describe_model(model_content: bytes, **extra) -> dict:
+    lat = tflite_latency_ms(model_content)
+    return {'sizeKB': round(len(model_content) / 1024.0, 1), 'latencyMsP50': round(lat['p50'], 3),
+            'latencyMsP90': round(lat['p90'], 3), **extra}
+
+
+def append_report(workdir: Path, name: str, row: dict) -> Path:
+    out = Path(workdir) / 'reports' / f'{name}.jsonl'
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with out.open('a', encoding='utf-8') as w:
+        w.write(json.dumps(row, ensure_ascii=False) + '\n')
+    return out
+
+
+def print_table(rows: List[dict], columns: Optional[List[str]] = None):
+    if not rows:
+        return
+    columns = columns or list(rows[0].keys())
+    widths = {c: max(len(c), *(len(_fmt(r.get(c))) for r in rows)) for c in columns}
+    print('  '.join(c.ljust(widths[c]) for c in columns))
+    for r in rows:
+        print('  '.join(_fmt(r.get(c)).ljust(widths[c]) for c in columns))
+
+
+def _fmt(v) -> str:
+    if isinstance(v, float):
+        return f'{v:.4g}'
+    return '' if v is None else str(v)
@@ -6,26 +6,39 @@ Entrena un clasificador de letras/gestos estáticos a partir de un dataset en fo
 (producido por Roboflow). Asume splits en carpetas: train/, valid/, test/ cada una con
 "_annotations.coco.json" y las imágenes referenciadas por "file_name".
 
-Exporta TFLite y labels.json a tools/work/.
+Exporta TFLite y labels.json a tools/work/models/<hash>/.
+
+Con --crop-hands cada imagen se recorta a la mano (bbox de la anotación COCO; MediaPipe para las
+imágenes sin bbox y el dataset en carpetas) y el recorte se guarda en caché, lo que permite entradas de 96-128 px.
+--compare-sizes entrena una variante por tamaño e imprime precisión vs tamaño vs latencia TFLite.
 
 Uso:
   python tools/train_letters_from_coco.py --data-dir tools/work/Lengua\ de\ Senas\ Mexicana.v5i.coco --epochs 10 --img-size 160
+  python tools/train_letters_from_coco.py --data-dir ... --crop-hands --compare-sizes 96,128,160
 
 Dependencias: tensorflow, pillow, numpy
 """
+from __future__ import annotations
+
 import argparse
 import json
 import os
-from typing import List, Tuple, Optional, Set
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Tuple, Optional, Set
 
 import numpy as np
 from PIL import Image
-import tensorflow as tf
-from tensorflow.keras import layers, models
-from tensorflow.keras import applications
 
+from artifacts import store_model
+from deps import require
+from hand_crop import HandCropper, union_box
+
+if TYPE_CHECKING:
+    import tensorflow as tf
 
-def load_coco_split(json_path: str, images_base: str, allowed: Optional[Set[str]] = None) -> Tuple[List[Image.Image], List[str]]:
+
+def load_coco_split(json_path: str, images_base: str, allowed: Optional[Set[str]] = None,
+                    cropper: Optional[HandCropper] = None) -> Tuple[List[Image.Image], List[str]]:
     with open(json_path, 'r') as f:
         coco = json.load(f)
     # categories
@@ -36,14 +49,18 @@ def load_coco_split(json_path: str, images_base: str, allowed: Optional[Set[str]
     anns = coco.get('annotations', [])
     # construir etiqueta por imagen: usar la categoría mayoritaria o primera
     img_to_cats: dict[int, List[int]] = {}
+    img_to_boxes: dict[tuple, List[List[float]]] = {}
     for ann in anns:
         img_id = ann.get('image_id')
         cat_id = ann.get('category_id')
         if img_id is None or cat_id is None:
             continue
         img_to_cats.setdefault(img_id, []).append(cat_id)
+        if ann.get('bbox'):
+            img_to_boxes.setdefault((img_id, cat_id), []).append(ann['bbox'])
     X: List[Image.Image] = []
     y: List[str] = []
+    skipped = 0
     for img_id, meta in images.items():
         file_name = meta.get('file_name')
         if not file_name:
@@ -74,20 +91,34 @@ def load_coco_split(json_path: str, images_base: str, allowed: Optional[Set[str]
         if allowed is not None and label not in allowed:
             continue
         try:
-            pil = Image.open(path).convert('RGB')
-        except Exception:
+            if cropper is not None:
+                box = union_box(img_to_boxes.get((img_id, cats[0]), [])) if cats else None
+                pil = cropper.crop(f'{path}|{os.path.getmtime(path)}|{box}', lambda: Image.open(path).convert('RGB'), box)
+            else:
+                pil = Image.open(path).convert('RGB')
+        except Exception as e:
+            skipped += 1
+            if skipped == 1:
+                print(f'AVISO: no se pudo leer/recortar {path}: {e}')
+            continue
+        if pil is None:
+            skipped += 1
             continue
         X.append(pil)
         y.append(label)
+    if skipped:
+        print(f'AVISO: {skipped} imágenes omitidas en {json_path}')
     return X, y
 
 
-def load_folder_split(split_dir: str, img_size: int, allowed: Optional[Set[str]] = None) -> Tuple[List[Image.Image], List[str]]:
+def load_folder_split(split_dir: str, img_size: int, allowed: Optional[Set[str]] = None,
+                      cropper: Optional[HandCropper] = None) -> Tuple[List[Image.Image], List[str]]:
     """Carga dataset con estructura folder/class_name/*.jpg.
-    split_dir debe contener subcarpetas por clase.
+    split_dir debe contener subcarpetas por clase. Con `cropper`, la mano se localiza con MediaPipe.
     """
     X: List[Image.Image] = []
     y: List[str] = []
+    skipped = 0
     if not os.path.isdir(split_dir):
         return X, y
     for class_name in sorted(os.listdir(split_dir)):
@@ -102,20 +133,34 @@ def load_folder_split(split_dir: str, img_size: int, allowed: Optional[Set[str]]
             if not os.path.isfile(fp):
                 continue
             try:
-                im = Image.open(fp).convert('RGB')
+                if cropper is not None:
+                    im = cropper.crop(f'{fp}|{os.path.getmtime(fp)}', lambda: Image.open(fp).convert('RGB'))
+                else:
+                    im = Image.open(fp).convert('RGB')
+                if im is None:
+                    skipped += 1
+                    continue
                 X.append(im)
                 y.append(label)
-            except Exception:
-                continue
+            except Exception as e:
+                skipped += 1
+                if skipped == 1:
+                    print(f'AVISO: no se pudo leer/recortar {fp}: {e}')
+    if skipped:
+        print(f'AVISO: {skipped} imágenes omitidas en {split_dir}')
     return X, y
 
 
-def build_dataset(images: List[Image.Image], labels: List[str], img_size: int) -> Tuple[np.ndarray, np.ndarray, List[str]]:
-    uniq = sorted(set(labels))
+def build_dataset(images: List[Image.Image], labels: List[str], img_size: int,
+                  classes: Optional[List[str]] = None) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    # `classes` fija el orden de etiquetas (el de train) al construir valid
+    uniq = classes if classes is not None else sorted(set(labels))
     label_to_idx = {c: i for i, c in enumerate(uniq)}
     X = []
     y_idx = []
     for img, lab in zip(images, labels):
+        if lab not in label_to_idx:
+            continue
         im = img.resize((img_size, img_size), Image.BILINEAR)
         arr = np.asarray(im, dtype=np.float32) / 255.0
         X.append(arr)
@@ -125,13 +170,18 @@ def build_dataset(images: List[Image.Image], labels: List[str], img_size: int) -
     return X, y_arr, uniq
 
 
-def build_model(img_size: int, num_classes: int) -> tf.keras.Model:
+def build_model(img_size: int, num_classes: int, alpha: float = 1.0) -> tf.keras.Model:
+    import tensorflow as tf
+    from tensorflow.keras import layers, models
+    from tensorflow.keras import applications
+
     inputs = layers.Input(shape=(img_size, img_size, 3))
     x = layers.Rescaling(1.0/255)(inputs)
     x = layers.RandomFlip("horizontal")(x)
     x = layers.RandomRotation(0.1)(x)
     x = layers.RandomZoom(0.1)(x)
-    base = applications.MobileNetV2(include_top=False, weights='imagenet', input_shape=(img_size, img_size, 3), pooling='avg')
+    # alpha escala el ancho de todas las capas (pesos imagenet publicados para 0.35/0.5/0.75/1.0/1.3/1.4)
+    base = applications.MobileNetV2(include_top=False, weights='imagenet', input_shape=(img_size, img_size, 3), pooling='avg', alpha=alpha)
     base.trainable = False
     x = base(x)
     x = layers.Dropout(0.3)(x)
@@ -141,22 +191,63 @@ def build_model(img_size: int, num_classes: int) -> tf.keras.Model:
     return model
 
 
-def export_tflite(model: tf.keras.Model, out_path: str):
+def to_tflite(model: tf.keras.Model) -> bytes:
+    import tensorflow as tf
+
     converter = tf.lite.TFLiteConverter.from_keras_model(model)
-    tflite_model = converter.convert()
+    return converter.convert()
+
+
+def export_tflite(model: tf.keras.Model, out_path: str):
     with open(out_path, 'wb') as f:
-        f.write(tflite_model)
+        f.write(to_tflite(model))
+
 
+def train_and_evaluate(X_train_pil, y_train, X_val_pil, y_val, img_size: int, args):
+    import tensorflow as tf
+
+    X_train, y_train_arr, classes = build_dataset(X_train_pil, y_train, img_size)
+    X_val, y_val_arr, _ = build_dataset(X_val_pil, y_val, img_size, classes)
+
+    model = build_model(img_size, num_classes=len(classes), alpha=args.alpha)
+    model.fit(X_train, y_train_arr, validation_data=(X_val, y_val_arr), epochs=args.epochs, batch_size=32, verbose=2)
 
-def main():
+    if args.fine_tune:
+        print('Activando fine-tuning...')
+        # localizar capa base dentro del modelo (MobileNetV2)
+        for layer in model.layers:
+            if isinstance(layer, tf.keras.Model) and layer.name.startswith('mobilenetv2'):
+                layer.trainable = True
+        model.compile(optimizer=tf.keras.optimizers.Adam(1e-4), loss='sparse_categorical_crossentropy', metrics=['accuracy'])
+        model.fit(X_train, y_train_arr, validation_data=(X_val, y_val_arr), epochs=max(4, args.epochs//3), batch_size=32, verbose=2)
+
+    val_loss, val_acc = model.evaluate(X_val, y_val_arr, verbose=0)
+    print(f"Validación ({img_size}px) -> loss: {val_loss:.4f}, acc: {val_acc:.4f}")
+    return model, classes, float(val_acc)
+
+
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument('--data-dir', required=True, help='Directorio del dataset COCO (con train/valid/test)')
     ap.add_argument('--extra-folder-dataset', type=str, default=None, help='Dataset adicional en carpetas (train/valid/test con clases en subcarpetas)')
     ap.add_argument('--epochs', type=int, default=12)
     ap.add_argument('--img-size', type=int, default=224)
+    ap.add_argument('--alpha', type=float, default=1.0, help='Multiplicador de ancho de MobileNetV2 (0.35, 0.5, 0.75, 1.0)')
     ap.add_argument('--fine-tune', action='store_true', help='Descongela la base y hace fine-tuning con LR menor')
     ap.add_argument('--allow-classes', type=str, default='A,B,C,D,E,F,G,H,I,L,M,N,O,P,R,S,T,U,V,W,Y,0,1,2,3,4,5,6,7,8,9', help='Lista de clases permitidas separadas por coma')
-    args = ap.parse_args()
+    ap.add_argument('--workdir', type=Path, default=Path('tools/work'), help='Directorio de trabajo; el modelo se guarda en <workdir>/models/<hash>/')
+    ap.add_argument('--crop-hands', action='store_true', help='Recorta la mano (bbox COCO o MediaPipe) y guarda los recortes en caché')
+    ap.add_argument('--crop-margin', type=float, default=0.25, help='Margen alrededor de la caja de la mano (fracción del lado)')
+    ap.add_argument('--compare-sizes', type=str, default='', help='Tamaños de entrada a comparar, p.ej. 96,128,160 (entrena una variante por tamaño)')
+    args = ap.parse_args(argv)
+    # Las imágenes COCO sin bbox también caen en MediaPipe
+    require('tensorflow', *(['mediapipe'] if args.crop_hands else []))
+
+    sizes = [int(s) for s in args.compare_sizes.split(',') if s.strip()] or [args.img_size]
+    cropper = None
+    if args.crop_hands:
+        # Los recortes se guardan al mayor tamaño pedido; build_dataset reduce al resto
+        cropper = HandCropper(max(sizes), cache_dir=args.workdir / 'cache' / 'crops', margin=args.crop_margin)
 
     # Cargar split train y valid
     train_json = os.path.join(args.data_dir, 'train', '_annotations.coco.json')
@@ -166,52 +257,44 @@ def main():
     valid_imgs_base = os.path.join(args.data_dir, 'valid')
 
     allowed = set([c.strip().upper() for c in args.allow_classes.split(',') if c.strip()])
-    X_train_pil, y_train = load_coco_split(train_json, train_imgs_base, allowed)
-    X_val_pil, y_val = load_coco_split(valid_json, valid_imgs_base, allowed)
+    X_train_pil, y_train = load_coco_split(train_json, train_imgs_base, allowed, cropper)
+    X_val_pil, y_val = load_coco_split(valid_json, valid_imgs_base, allowed, cropper)
 
     # Merge con dataset adicional en carpetas si se proporciona
     if args.extra_folder_dataset:
         extra_train = os.path.join(args.extra_folder_dataset, 'train')
         extra_valid = os.path.join(args.extra_folder_dataset, 'valid')
-        X_train_extra, y_train_extra = load_folder_split(extra_train, args.img_size, allowed)
-        X_val_extra, y_val_extra = load_folder_split(extra_valid, args.img_size, allowed)
+        X_train_extra, y_train_extra = load_folder_split(extra_train, args.img_size, allowed, cropper)
+        X_val_extra, y_val_extra = load_folder_split(extra_valid, args.img_size, allowed, cropper)
         X_train_pil.extend(X_train_extra)
         y_train.extend(y_train_extra)
         X_val_pil.extend(X_val_extra)
         y_val.extend(y_val_extra)
 
+    if cropper is not None:
+        print(cropper.summary())
+        cropper.close()
+
     if not X_train_pil or not X_val_pil:
         raise RuntimeError('No se encontraron imágenes/labels en COCO. Verifica que las imágenes existen junto a los JSON.')
 
-    X_train, y_train_arr, classes = build_dataset(X_train_pil, y_train, args.img_size)
-    X_val, y_val_arr, _ = build_dataset(X_val_pil, y_val, args.img_size)
-
-    model = build_model(args.img_size, num_classes=len(classes))
-    model.fit(X_train, y_train_arr, validation_data=(X_val, y_val_arr), epochs=args.epochs, batch_size=32, verbose=2)
-
-    if args.fine_tune:
-        print('Activando fine-tuning...')
-        # localizar capa base dentro del modelo (MobileNetV2)
-        for layer in model.layers:
-            if isinstance(layer, tf.keras.Model) and layer.name.startswith('mobilenetv2'):
-                layer.trainable = True
-        model.compile(optimizer=tf.keras.optimizers.Adam(1e-4), loss='sparse_categorical_crossentropy', metrics=['accuracy'])
-        model.fit(X_train, y_train_arr, validation_data=(X_val, y_val_arr), epochs=max(4, args.epochs//3), batch_size=32, verbose=2)
-
-    val_loss, val_acc = model.evaluate(X_val, y_val_arr, verbose=0)
-    print(f"Validación -> loss: {val_loss:.4f}, acc: {val_acc:.4f}")
+    from tflite_bench import append_report, describe_model, print_table
 
-    out_dir = os.path.join('tools', 'work')
-    os.makedirs(out_dir, exist_ok=True)
-    model_path = os.path.join(out_dir, 'gesture_frame_mlp.tflite')
-    labels_path = os.path.join(out_dir, 'labels.json')
+    rows = []
+    for img_size in sizes:
+        model, classes, val_acc = train_and_evaluate(X_train_pil, y_train, X_val_pil, y_val, img_size, args)
+        tflite_model = to_tflite(model)
+        row = describe_model(tflite_model, source='coco', imgSize=img_size, alpha=args.alpha, cropHands=args.crop_hands, valAccuracy=round(val_acc, 4))
+        out_dir = store_model(args.workdir, tflite_model, classes, meta=row)
+        row['hash'] = out_dir.name
+        rows.append(row)
+        append_report(args.workdir, 'letters', row)
 
-    export_tflite(model, model_path)
-    with open(labels_path, 'w') as f:
-        json.dump(classes, f, ensure_ascii=False, indent=2)
+        print(f"Modelo TFLite exportado: {out_dir / 'gesture_frame_mlp.tflite'}")
+        print(f"Labels guardadas: {out_dir / 'labels.json'}")
 
-    print(f"Modelo TFLite exportado: {model_path}")
-    print(f"Labels guardadas: {labels_path}")
+    print('\nPrecisión vs tamaño de entrada vs latencia (CPU, 1 hilo):')
+    print_table(rows, ['imgSize', 'cropHands', 'valAccuracy', 'sizeKB', 'latencyMsP50', 'latencyMsP90', 'hash'])
 
 
 if __name__ == '__main__':
@@ -3,7 +3,9 @@
 train_letters_from_pickle.py
 
 Entrena un clasificador de letras (estáticas) desde un archivo .pickle con imágenes y etiquetas.
-Exporta el modelo a TFLite y labels.json en tools/work/.
+Exporta el modelo a TFLite y labels.json en tools/work/models/<hash>/.
+Con --crop-hands la mano se localiza una sola vez con MediaPipe y el recorte queda en caché;
+--compare-sizes entrena una variante por tamaño e imprime precisión vs tamaño vs latencia TFLite.
 
 Requisitos (instalar en tu entorno Python):
 - tensorflow>=2.12
@@ -13,6 +15,7 @@ Requisitos (instalar en tu entorno Python):
 
 Uso:
   python tools/train_letters_from_pickle.py --pickle ABECEDARIOIMAGENES.pickle --epochs 10 --img-size 160
+  python tools/train_letters_from_pickle.py --pickle ABECEDARIOIMAGENES.pickle --crop-hands --compare-sizes 96,128
 
 El pickle debe contener una estructura como:
   {
@@ -21,17 +24,25 @@ El pickle debe contener una estructura como:
   }
 Las imágenes se normalizan y se redimensionan a tamaño cuadrado. Las etiquetas se normalizan a una sola letra mayúscula o dígito.
 """
+from __future__ import annotations
+
 import argparse
-import json
+import hashlib
 import os
+from pathlib import Path
 import pickle
-from typing import List, Tuple
+from typing import TYPE_CHECKING, List, Tuple
 import io
 
 import numpy as np
 from PIL import Image
-import tensorflow as tf
-from tensorflow.keras import layers, models
+
+from artifacts import store_model
+from deps import require
+from hand_crop import HandCropper
+
+if TYPE_CHECKING:
+    import tensorflow as tf
 
 
 def normalize_label(raw: str) -> str | None:
@@ -143,14 +154,16 @@ def build_dataset(images: List[Image.Image], labels: List[str], img_size: int) -
     return X, y, uniq
 
 
-def build_model(img_size: int, num_classes: int) -> tf.keras.Model:
-    # modelo pequeño de CNN para rapidez
+def build_model(img_size: int, num_classes: int, width: float = 1.0) -> tf.keras.Model:
+    from tensorflow.keras import layers, models
+
+    # modelo pequeño de CNN para rapidez; `width` escala los filtros 32/64/128
     inputs = layers.Input(shape=(img_size, img_size, 3))
-    x = layers.Conv2D(32, 3, activation='relu')(inputs)
+    x = layers.Conv2D(max(4, int(32 * width)), 3, activation='relu')(inputs)
     x = layers.MaxPooling2D()(x)
-    x = layers.Conv2D(64, 3, activation='relu')(x)
+    x = layers.Conv2D(max(4, int(64 * width)), 3, activation='relu')(x)
     x = layers.MaxPooling2D()(x)
-    x = layers.Conv2D(128, 3, activation='relu')(x)
+    x = layers.Conv2D(max(4, int(128 * width)), 3, activation='relu')(x)
     x = layers.GlobalAveragePooling2D()(x)
     x = layers.Dropout(0.2)(x)
     outputs = layers.Dense(num_classes, activation='softmax')(x)
@@ -159,20 +172,33 @@ def build_model(img_size: int, num_classes: int) -> tf.keras.Model:
     return model
 
 
-def export_tflite(model: tf.keras.Model, out_path: str):
+def to_tflite(model: tf.keras.Model) -> bytes:
+    import tensorflow as tf
+
     converter = tf.lite.TFLiteConverter.from_keras_model(model)
-    tflite_model = converter.convert()
+    return converter.convert()
+
+
+def export_tflite(model: tf.keras.Model, out_path: str):
     with open(out_path, 'wb') as f:
-        f.write(tflite_model)
+        f.write(to_tflite(model))
 
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument('--pickle', required=True, help='Ruta al archivo .pickle con imágenes y labels')
     ap.add_argument('--epochs', type=int, default=10)
     ap.add_argument('--img-size', type=int, default=160)
     ap.add_argument('--images-dir', type=str, default='', help='Directorio base para rutas que vengan sin path en el pickle')
-    args = ap.parse_args()
+    ap.add_argument('--workdir', type=Path, default=Path('tools/work'), help='Directorio de trabajo; el modelo se guarda en <workdir>/models/<hash>/')
+    ap.add_argument('--crop-hands', action='store_true', help='Recorta la mano con MediaPipe y guarda los recortes en caché')
+    ap.add_argument('--crop-margin', type=float, default=0.25, help='Margen alrededor de la caja de la mano (fracción del lado)')
+    ap.add_argument('--compare-sizes', type=str, default='', help='Tamaños de entrada a comparar, p.ej. 96,128,160 (entrena una variante por tamaño)')
+    ap.add_argument('--seed', type=int, default=42, help='Semilla del split train/val')
+    ap.add_argument('--width', type=float, default=1.0, help='Multiplicador de filtros del CNN (1.0 = 32/64/128)')
+    args = ap.parse_args(argv)
+    require('tensorflow', *(['mediapipe'] if args.crop_hands else []))
+    sizes = [int(s) for s in args.compare_sizes.split(',') if s.strip()] or [args.img_size]
 
     images, labels = load_pickle(args.pickle)
     # Si las labels provienen de nombres como " 5.png" sin ruta, intentar cargar desde images-dir
@@ -204,31 +230,50 @@ def main():
                     pass
         if fixed_images:
             images, labels = fixed_images, fixed_labels
-    X, y, classes = build_dataset(images, labels, args.img_size)
+    if args.crop_hands:
+        # Los recortes se guardan al mayor tamaño pedido; build_dataset reduce al resto
+        cropper = HandCropper(max(sizes), cache_dir=args.workdir / 'cache' / 'crops', margin=args.crop_margin)
+        cropped_images, cropped_labels = [], []
+        for img, lab in zip(images, labels):
+            key = hashlib.sha1(img.tobytes()).hexdigest() + f'|{img.size}'
+            crop = cropper.crop(key, lambda: img)
+            if crop is not None:
+                cropped_images.append(crop)
+                cropped_labels.append(lab)
+        print(cropper.summary())
+        cropper.close()
+        images, labels = cropped_images, cropped_labels
 
-    # split train/val
-    n = len(X)
-    idx = np.arange(n)
-    np.random.shuffle(idx)
+    # split train/val (el mismo para todos los tamaños comparados)
+    n = len(images)
+    idx = np.random.RandomState(args.seed).permutation(n)
     split = int(0.8 * n)
     train_idx, val_idx = idx[:split], idx[split:]
-    X_train, y_train = X[train_idx], y[train_idx]
-    X_val, y_val = X[val_idx], y[val_idx]
 
-    model = build_model(args.img_size, num_classes=len(classes))
-    model.fit(X_train, y_train, validation_data=(X_val, y_val), epochs=args.epochs, batch_size=32)
+    from tflite_bench import append_report, describe_model, print_table
+
+    rows = []
+    for img_size in sizes:
+        X, y, classes = build_dataset(images, labels, img_size)
+        X_train, y_train = X[train_idx], y[train_idx]
+        X_val, y_val = X[val_idx], y[val_idx]
+
+        model = build_model(img_size, num_classes=len(classes), width=args.width)
+        model.fit(X_train, y_train, validation_data=(X_val, y_val), epochs=args.epochs, batch_size=32)
+        _, val_acc = model.evaluate(X_val, y_val, verbose=0)
 
-    out_dir = os.path.join('tools', 'work')
-    os.makedirs(out_dir, exist_ok=True)
-    model_path = os.path.join(out_dir, 'gesture_frame_mlp.tflite')
-    labels_path = os.path.join(out_dir, 'labels.json')
+        tflite_model = to_tflite(model)
+        row = describe_model(tflite_model, source='pickle', imgSize=img_size, width=args.width, cropHands=args.crop_hands, valAccuracy=round(float(val_acc), 4))
+        out_dir = store_model(args.workdir, tflite_model, classes, meta=row)
+        row['hash'] = out_dir.name
+        rows.append(row)
+        append_report(args.workdir, 'letters', row)
 
-    export_tflite(model, model_path)
-    with open(labels_path, 'w') as f:
-        json.dump(classes, f)
+        print(f"Modelo TFLite exportado: {out_dir / 'gesture_frame_mlp.tflite'}")
+        print(f"Labels guardadas: {out_dir / 'labels.json'}")
 
-    print(f"Modelo TFLite exportado: {model_path}")
-    print(f"Labels guardadas: {labels_path}")
+    print('\nPrecisión vs tamaño de entrada vs latencia (CPU, 1 hilo):')
+    print_table(rows, ['imgSize', 'cropHands', 'valAccuracy', 'sizeKB', 'latencyMsP50', 'latencyMsP90', 'hash'])
 
 
 if __name__ == '__main__':
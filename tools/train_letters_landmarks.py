@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+train_letters_landmarks.py
+
+Alternativa ligera a los CNN de letras: pasa los mismos datasets (COCO, carpetas y/o pickle)
+por MediaPipe Hands para obtener los 42 features de landmarks (landmarks_to_features) y entrena
+el MLP de extract_landmarks_and_train.py. Exporta TFLite + labels.json en tools/work/models/<hash>/
+con entrada vectorial, la rama classify(FloatArray) de GestureClassifier.
+
+La extracción se hace por lotes en procesos paralelos (una instancia de Hands por proceso) y cada
+imagen se cachea por hash de contenido, así que reentrenar no vuelve a ejecutar MediaPipe.
+Al final imprime precisión/tamaño/latencia frente a los CNN registrados en reports/letters.jsonl.
+
+Uso:
+  python tools/train_letters_landmarks.py --coco-dir tools/work/Lengua\\ de\\ Senas\\ Mexicana.v5i.coco
+  python tools/train_letters_landmarks.py --pickle ABECEDARIOIMAGENES.pickle --compare-model 3f2a9c
+
+Dependencias: mediapipe, tensorflow, pillow, numpy
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from artifacts import MODEL_FILE, resolve_model_dir, store_model
+from deps import require
+from landmark_augment import parse_augment
+
+_hands = None
+
+
+def _init_worker():
+    global _hands
+    import mediapipe as mp
+    _hands = mp.solutions.hands.Hands(static_image_mode=True, max_num_hands=1)
+
+
+def _extract_batch(batch: List[np.ndarray]) -> List[Optional[List[float]]]:
+    from extract_landmarks_and_train import landmarks_to_features
+    out = []
+    for rgb in batch:
+        result = _hands.process(rgb)
+        feats = None
+        if result.multi_hand_landmarks:
+            points = [(p.x, p.y) for p in result.multi_hand_landmarks[0].landmark]
+            f = landmarks_to_features(points)
+            feats = None if f is None else [float(v) for v in f]
+        out.append(feats)
+    return out
+
+
+def extract_features(images, cache_dir: Path, workers: int, batch_size: int = 32) -> List[Optional[List[float]]]:
+    """Features de landmarks por imagen (None si no se detecta mano), con caché por contenido."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    feats: List[Optional[List[float]]] = [None] * len(images)
+    todo: List[Tuple[int, Path]] = []
+    for i, img in enumerate(images):
+        path = cache_dir / (hashlib.sha1(img.tobytes()).hexdigest() + f'-{img.width}x{img.height}.json')
+        if path.exists():
+            feats[i] = json.loads(path.read_text(encoding='utf-8'))
+        else:
+            todo.append((i, path))
+    print(f'Landmarks: {len(images) - len(todo)} en caché, {len(todo)} por extraer')
+    if not todo:
+        return feats
+
+    batches = [todo[k:k + batch_size] for k in range(0, len(todo), batch_size)]
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as ex:
+        futures = {ex.submit(_extract_batch, [np.asarray(images[i].convert('RGB')) for i, _ in b]): b for b in batches}
+        for fut in concurrent.futures.as_completed(futures):
+            for (i, path), f in zip(futures[fut], fut.result()):
+                feats[i] = f
+                path.write_text(json.dumps(f), encoding='utf-8')
+    return feats
+
+
+def load_letter_images(args, split: str):
+    """Imágenes PIL + etiquetas del split (train/valid) de todos los datasets indicados."""
+    from train_letters_from_coco import load_coco_split, load_folder_split
+    allowed = set([c.strip().upper() for c in args.allow_classes.split(',') if c.strip()])
+    images, labels = [], []
+    if args.coco_dir:
+        base = os.path.join(args.coco_dir, split)
+        X, y = load_coco_split(os.path.join(base, '_annotations.coco.json'), base, allowed)
+        images += X
+        labels += y
+    if args.folder_dataset:
+        X, y = load_folder_split(os.path.join(args.folder_dataset, split), 0, allowed)
+        images += X
+        labels += y
+    return images, labels
+
+
+def load_all_letter_images(args):
+    """(train_imgs, train_labels, val_imgs, val_labels) de COCO + carpetas + pickle (split 80/20 con --seed)."""
+    train_imgs, train_labels = load_letter_images(args, 'train')
+    val_imgs, val_labels = load_letter_images(args, 'valid')
+    if args.pickle:
+        from train_letters_from_pickle import load_pickle
+        images, labels = load_pickle(args.pickle)
+        idx = np.random.RandomState(args.seed).permutation(len(images))
+        split = int(0.8 * len(images))
+        train_imgs += [images[i] for i in idx[:split]]
+        train_labels += [labels[i] for i in idx[:split]]
+        val_imgs += [images[i] for i in idx[split:]]
+        val_labels += [labels[i] for i in idx[split:]]
+    return train_imgs, train_labels, val_imgs, val_labels
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Entrena el MLP de landmarks sobre los datasets de letras.')
+    ap.add_argument('--coco-dir', help='Dataset COCO (train/valid con _annotations.coco.json)')
+    ap.add_argument('--folder-dataset', help='Dataset en carpetas (train/valid/<clase>/*.jpg)')
+    ap.add_argument('--pickle', help='Pickle de imágenes y labels (split 80/20)')
+    ap.add_argument('--allow-classes', type=str, default='A,B,C,D,E,F,G,H,I,L,M,N,O,P,R,S,T,U,V,W,Y,0,1,2,3,4,5,6,7,8,9', help='Lista de clases permitidas separadas por coma')
+    ap.add_argument('--epochs', type=int, default=100, help='Épocas máximas (early stopping)')
+    ap.add_argument('--augment', nargs='?', const='default', default='none',
+                    help="Aumento de landmarks por lote (landmark_augment.py): 'default' o clave=valor,...")
+    ap.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1), help='Procesos de extracción con MediaPipe')
+    ap.add_argument('--seed', type=int, default=42, help='Semilla del split train/val del pickle')
+    ap.add_argument('--compare-model', help='Hash de un modelo CNN en <workdir>/models/ a medir en la comparación')
+    ap.add_argument('--workdir', type=Path, default=Path('tools/work'), help='Directorio de trabajo; el modelo se guarda en <workdir>/models/<hash>/')
+    args = ap.parse_args(argv)
+    if not (args.coco_dir or args.folder_dataset or args.pickle):
+        ap.error('Indica al menos --coco-dir, --folder-dataset o --pickle')
+    try:
+        augment = parse_augment(args.augment)
+    except ValueError as e:
+        ap.error(str(e))
+    require('mediapipe', 'tensorflow', 'PIL')
+
+    train_imgs, train_labels, val_imgs, val_labels = load_all_letter_images(args)
+
+    cache_dir = args.workdir / 'cache' / 'letter_landmarks'
+    train_feats = extract_features(train_imgs, cache_dir, args.workers)
+    val_feats = extract_features(val_imgs, cache_dir, args.workers)
+
+    classes = sorted(set(train_labels))
+    class_to_idx = {c: i for i, c in enumerate(classes)}
+
+    def to_arrays(feats, labels):
+        pairs = [(f, class_to_idx[lab]) for f, lab in zip(feats, labels) if f is not None and lab in class_to_idx]
+        if not pairs:
+            return np.zeros((0, 42), dtype=np.float32), np.zeros((0,), dtype=np.int32)
+        return np.array([p[0] for p in pairs], dtype=np.float32), np.array([p[1] for p in pairs], dtype=np.int32)
+
+    X_train, y_train = to_arrays(train_feats, train_labels)
+    X_val, y_val = to_arrays(val_feats, val_labels)
+    print(f'Con mano detectada: train {len(X_train)}/{len(train_feats)}, valid {len(X_val)}/{len(val_feats)}')
+    if not len(X_train) or not len(X_val):
+        raise RuntimeError('MediaPipe no detectó manos suficientes para entrenar/validar')
+
+    import tensorflow as tf
+    from extract_landmarks_and_train import fit_mlp, stratified_split
+    from tflite_bench import append_report, describe_model, print_table
+
+    # El split valid se reserva para la comparación; el early stopping usa una parte de train
+    fit_idx, stop_idx = stratified_split(y_train, 0.15)
+    model = fit_mlp(X_train[fit_idx], y_train[fit_idx], X_train[stop_idx], y_train[stop_idx], len(classes), epochs=args.epochs,
+                    augment=augment)
+    _, val_acc = model.evaluate(X_val, y_val, verbose=0)
+    # Las imágenes sin mano detectada cuentan como fallo: precisión comparable con la del CNN
+    val_acc_all = float(val_acc) * len(X_val) / max(1, len(val_feats))
+    print(f'Validación -> acc (con mano): {val_acc:.4f}, acc (todas las imágenes): {val_acc_all:.4f}')
+
+    tflite_model = tf.lite.TFLiteConverter.from_keras_model(model).convert()
+    row = describe_model(tflite_model, source='letters-landmarks', imgSize=None, cropHands=None,
+                         valAccuracy=round(val_acc_all, 4), handDetectedRate=round(len(X_val) / max(1, len(val_feats)), 4))
+    out_dir = store_model(args.workdir, tflite_model, classes, meta=row)
+    row['hash'] = out_dir.name
+    append_report(args.workdir, 'letters', row)
+    print(f'Modelo TFLite exportado: {out_dir / MODEL_FILE}')
+
+    # Comparación con los CNN: filas registradas por los trainers de imagen y/o un modelo concreto
+    rows = [row]
+    report = args.workdir / 'reports' / 'letters.jsonl'
+    if report.exists():
+        seen = {row['hash']}
+        for line in report.read_text(encoding='utf-8').splitlines():
+            r = json.loads(line)
+            if r.get('source') in ('coco', 'pickle') and r.get('hash') not in seen:
+                seen.add(r.get('hash'))
+                rows.append(r)
+    if args.compare_model:
+        ref = resolve_model_dir(args.workdir, args.compare_model)
+        if ref is None:
+            print(f'Modelo no encontrado: {args.compare_model}')
+        else:
+            meta = json.loads((ref / 'meta.json').read_text(encoding='utf-8'))
+            rows.append(describe_model((ref / MODEL_FILE).read_bytes(), source=meta.get('source'), imgSize=meta.get('imgSize'),
+                                       valAccuracy=meta.get('valAccuracy'), hash=ref.name))
+    print('\nLandmarks MLP vs CNN (CPU, 1 hilo; la latencia del MLP no incluye MediaPipe):')
+    print_table(rows, ['source', 'imgSize', 'valAccuracy', 'sizeKB', 'latencyMsP50', 'latencyMsP90', 'hash'])
+
+
+if __name__ == '__main__':
+    main()
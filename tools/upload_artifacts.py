@@ -1,35 +1,71 @@
 import argparse
+import json
+import sys
 from pathlib import Path
-from google.cloud import storage
-from google.oauth2 import service_account
 
+import backends
+from artifacts import LABELS_FILE, MODEL_FILE, resolve_model_dir
+from backends import is_local, open_backend
+from deps import require, STORAGE
 
-def upload_file(bucket, local_path: Path, remote_path: str):
-    blob = bucket.blob(remote_path)
-    blob.upload_from_filename(str(local_path))
-    print(f"Subido: {local_path} -> gs://{bucket.name}/{remote_path}")
 
+def upload_file(storage, local_path: Path, remote_path: str):
+    storage.upload_file(local_path, remote_path)
+    print(f"Subido: {local_path} -> {storage.describe(remote_path)}")
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--service_account', required=True)
-    parser.add_argument('--storage_bucket', required=True)
-    parser.add_argument('--workdir', default='tools/work')
-    args = parser.parse_args()
 
-    creds = service_account.Credentials.from_service_account_file(args.service_account)
+def storage_client(service_account_path: str, bucket_name: str):
+    from google.cloud import storage
+    from google.oauth2 import service_account
+
+    creds = service_account.Credentials.from_service_account_file(service_account_path)
     client = storage.Client(project=creds.project_id, credentials=creds)
-    bucket = client.bucket(args.storage_bucket)
+    return None, client.bucket(bucket_name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    backends.add_arguments(parser)
+    parser.add_argument('--service_account', help='Obligatorio con --backend gcs')
+    parser.add_argument('--storage_bucket', help='Obligatorio con --backend gcs')
+    parser.add_argument('--workdir', default='tools/work')
+    parser.add_argument('--model', help='Hash (o prefijo) del modelo en <workdir>/models/ (default: el último publicado)')
+    parser.add_argument('--require-replay', action='store_true', help='Solo sube si replay_bench.py aprobó este modelo (models/<hash>/replay.json)')
+    args = parser.parse_args(argv)
+    if not is_local(args.backend) and not (args.service_account and args.storage_bucket):
+        parser.error('--service_account y --storage_bucket son obligatorios con --backend gcs')
 
     workdir = Path(args.workdir)
-    tflite = workdir / 'gesture_frame_mlp.tflite'
-    labels = workdir / 'labels.json'
+    model_dir = resolve_model_dir(workdir, args.model)
+    if model_dir is None:
+        if args.model:
+            parser.error(f'Modelo no encontrado (o prefijo ambiguo) en {workdir / "models"}: {args.model}')
+        # Compatibilidad: sin --model ni modelos publicados, artefactos sueltos en el workdir
+        model_dir = workdir
+    tflite = model_dir / MODEL_FILE
+    labels = model_dir / LABELS_FILE
 
     if not tflite.exists() or not labels.exists():
-        raise FileNotFoundError("Faltan artefactos: gesture_frame_mlp.tflite o labels.json en workdir")
+        raise FileNotFoundError(f"Faltan artefactos: {MODEL_FILE} o {LABELS_FILE} en {model_dir}")
+
+    if args.require_replay:
+        replay = model_dir / 'replay.json'
+        verdict = json.loads(replay.read_text(encoding='utf-8')) if replay.exists() else None
+        if not verdict or not verdict.get('passed'):
+            reason = 'sin reproducción' if verdict is None else f"precisión clip {verdict.get('clipAccuracy')}, {verdict.get('fps')} frames/s"
+            print(f"ERROR: {model_dir.name} no aprobó replay_bench.py ({reason}); no se sube", file=sys.stderr)
+            sys.exit(1)
+        print(f"Replay aprobado: precisión clip {verdict['clipAccuracy']}, {verdict['fps']} frames/s")
+
+    require([] if is_local(args.backend) else STORAGE)
+    storage, _ = open_backend(args.backend, lambda: storage_client(args.service_account, args.storage_bucket))
 
-    upload_file(bucket, tflite, 'models/gesture_frame_mlp.tflite')
-    upload_file(bucket, labels, 'models/labels.json')
+    # Copia versionada por hash y la ruta estable que consume la app
+    if model_dir != workdir:
+        upload_file(storage, tflite, f'models/{model_dir.name}/{MODEL_FILE}')
+        upload_file(storage, labels, f'models/{model_dir.name}/{LABELS_FILE}')
+    upload_file(storage, tflite, f'models/{MODEL_FILE}')
+    upload_file(storage, labels, f'models/{LABELS_FILE}')
 
 
 if __name__ == '__main__':
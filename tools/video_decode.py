@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+video_decode.py
+
+Backends de decodificación de video para la extracción de landmarks (extract_landmarks_and_train.py).
+
+- ffmpeg: un proceso ffmpeg por video que submuestrea, escala al ancho pedido y convierte a RGB
+  dentro del decodificador (select + scale + format=rgb24) y escribe rawvideo por un pipe. Cada
+  frame se lee con readinto() sobre el mismo buffer NumPy, sin reservar memoria por frame. Si
+  ffmpeg termina con error o deja un frame a medias se lanza CalledProcessError (con su stderr).
+  stderr va a un archivo temporal (un pipe sin leer bloquearía a ffmpeg si se llena) y se usa
+  `-vsync passthrough`, que también entienden las versiones anteriores a 5.1 (sin -fps_mode).
+- opencv: cv2.VideoCapture como hasta ahora (fallback si no hay ffmpeg en el PATH), reutilizando
+  también los buffers de lectura, redimensionado y conversión BGR->RGB.
+
+MediaPipe Hands reduce internamente la imagen a unos cientos de píxeles, así que decodificar a
+resolución completa solo añade coste. Los frames entregados son vistas de un buffer reutilizado:
+el consumidor debe copiarlos si los necesita más allá de la siguiente iteración.
+
+Uso (benchmark de ambos backends sobre clips locales):
+  python tools/video_decode.py /ruta/LSM/LSM_Abecedario_Web/*.mp4 --width 480 --with-hands
+"""
+import argparse
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from deps import require
+
+BACKENDS = ['auto', 'ffmpeg', 'opencv']
+DEFAULT_WIDTH = 480
+
+
+def resolve_backend(backend: str) -> str:
+    if backend == 'auto':
+        return 'ffmpeg' if shutil.which('ffmpeg') and shutil.which('ffprobe') else 'opencv'
+    return backend
+
+
+def probe_size(path: Path) -> Tuple[int, int]:
+    """(ancho, alto) de presentación del primer stream de video, aplicando la rotación de los metadatos."""
+    out = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries',
+         'stream=width,height:stream_tags=rotate:stream_side_data=rotation', '-of', 'json', str(path)],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    stream = json.loads(out)['streams'][0]
+    rotation = stream.get('tags', {}).get('rotate')
+    for sd in stream.get('side_data_list', []):
+        rotation = sd.get('rotation', rotation)
+    w, h = int(stream['width']), int(stream['height'])
+    # ffmpeg aplica la rotación al decodificar, así que el tamaño de salida va girado
+    if rotation is not None and abs(int(float(rotation))) % 180 == 90:
+        w, h = h, w
+    return w, h
+
+
+def target_size(src_w: int, src_h: int, width: Optional[int]) -> Tuple[int, int]:
+    """Tamaño de salida conservando aspecto, con dimensiones pares y sin ampliar."""
+    if not width or width >= src_w:
+        return src_w - src_w % 2, src_h - src_h % 2
+    h = round(src_h * width / src_w)
+    return width - width % 2, max(2, h - h % 2)
+
+
+def iter_frames_ffmpeg(path: Path, width: Optional[int] = DEFAULT_WIDTH, step: int = 2) -> Iterator[np.ndarray]:
+    """Frames RGB (alto, ancho, 3) uint8 de 1 de cada `step` frames, sobre un único buffer reutilizado."""
+    w, h = target_size(*probe_size(path), width)
+    vf = f"select='not(mod(n\\,{step}))',scale={w}:{h}:flags=area,format=rgb24"
+    cmd = ['ffmpeg', '-v', 'error', '-nostdin', '-i', str(path), '-an', '-vf', vf,
+           '-vsync', 'passthrough', '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-']
+    # stderr a un archivo: se lee al final para explicar un código de salida distinto de 0
+    errfile = tempfile.TemporaryFile()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errfile, bufsize=0)
+    buf = np.empty((h, w, 3), dtype=np.uint8)
+    view = memoryview(buf).cast('B')
+    finished = False
+    try:
+        while True:
+            got = 0
+            while got < len(view):
+                n = proc.stdout.readinto(view[got:])
+                if not n:
+                    break
+                got += n
+            if got < len(view):
+                finished = True
+                break
+            yield buf
+        proc.wait()
+        errfile.seek(0)
+        # Las últimas líneas bastan para explicar el fallo; un video muy dañado puede repetir miles
+        err = errfile.read().decode('utf-8', 'replace').strip()[-4000:]
+        if proc.returncode != 0 or got:
+            # Decodificación fallida o truncada: no entregar en silencio un video más corto
+            raise subprocess.CalledProcessError(proc.returncode or 1, cmd, stderr=err or f'frame incompleto ({got} bytes)')
+    finally:
+        # El consumidor puede cortar antes (max_frames): no dejar ffmpeg escribiendo en un pipe huérfano
+        proc.stdout.close()
+        if not finished and proc.poll() is None:
+            proc.kill()
+        proc.wait()
+        errfile.close()
+
+
+def iter_frames_opencv(path: Path, width: Optional[int] = DEFAULT_WIDTH, step: int = 2) -> Iterator[np.ndarray]:
+    """Igual que iter_frames_ffmpeg pero con cv2.VideoCapture (decodifica a resolución completa)."""
+    import cv2
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        return
+    frame = small = rgb = None
+    index = 0
+    try:
+        while True:
+            ok, frame = cap.read(frame)
+            if not ok:
+                break
+            index += 1
+            if (index - 1) % step:
+                continue
+            if small is None:
+                w, h = target_size(frame.shape[1], frame.shape[0], width)
+                small = np.empty((h, w, 3), dtype=np.uint8) if (w, h) != (frame.shape[1], frame.shape[0]) else None
+                rgb = np.empty((h, w, 3), dtype=np.uint8)
+            src = frame
+            if small is not None:
+                cv2.resize(frame, (small.shape[1], small.shape[0]), dst=small, interpolation=cv2.INTER_AREA)
+                src = small
+            elif src.shape != rgb.shape:
+                src = src[:rgb.shape[0], :rgb.shape[1]]
+            cv2.cvtColor(src, cv2.COLOR_BGR2RGB, dst=rgb)
+            yield rgb
+    finally:
+        cap.release()
+
+
+def iter_frames(path: Path, backend: str = 'auto', width: Optional[int] = DEFAULT_WIDTH, step: int = 2) -> Iterator[np.ndarray]:
+    if resolve_backend(backend) == 'ffmpeg':
+        return iter_frames_ffmpeg(path, width, step)
+    return iter_frames_opencv(path, width, step)
+
+
+def bench(paths: List[Path], backend: str, width: Optional[int], with_hands: bool) -> dict:
+    """Frames/s de decodificación (y opcionalmente de decodificación + MediaPipe Hands) para un backend."""
+    hands = None
+    if with_hands:
+        import mediapipe as mp
+        hands = mp.solutions.hands.Hands(static_image_mode=False, max_num_hands=2)
+    frames = 0
+    size = None
+    t0 = time.perf_counter()
+    for p in paths:
+        for rgb in iter_frames(p, backend, width):
+            frames += 1
+            size = f'{rgb.shape[1]}x{rgb.shape[0]}'
+            if hands is not None:
+                hands.process(rgb)
+    elapsed = time.perf_counter() - t0
+    if hands is not None:
+        hands.close()
+    return {'backend': backend, 'size': size, 'frames': frames, 'seconds': round(elapsed, 2),
+            'fps': round(frames / elapsed, 1) if elapsed else None}
+
+
+def main(argv=None):
+    from tflite_bench import print_table
+
+    ap = argparse.ArgumentParser(description='Compara los backends de decodificación (frames/s) sobre clips locales.')
+    ap.add_argument('videos', nargs='+', type=Path, help='Clips de video (p.ej. los MP4 720p del catálogo)')
+    ap.add_argument('--width', type=int, default=DEFAULT_WIDTH, help='Ancho de decodificación del backend reducido (0 = original)')
+    ap.add_argument('--with-hands', action='store_true', help='Incluye MediaPipe Hands en la medición (extremo a extremo)')
+    args = ap.parse_args(argv)
+    require('cv2', 'numpy', *(['mediapipe'] if args.with_hands else []))
+
+    rows = []
+    if resolve_backend('auto') == 'ffmpeg':
+        rows.append(bench(args.videos, 'ffmpeg', args.width or None, args.with_hands))
+    else:
+        print('AVISO: ffmpeg/ffprobe no están en el PATH; solo se mide OpenCV')
+    rows.append(bench(args.videos, 'opencv', args.width or None, args.with_hands))
+    # Referencia: el camino anterior (OpenCV a resolución completa)
+    rows.append({**bench(args.videos, 'opencv', None, args.with_hands), 'backend': 'opencv (original)'})
+    print_table(rows, ['backend', 'size', 'frames', 'seconds', 'fps'])
+
+
+if __name__ == '__main__':
+    main()